@@ -1,22 +1,129 @@
-import yaml
+import argparse
+import hashlib
 import json
+import re
+import struct
 from pathlib import Path
 
+DATABASE = Path(__file__).parent
+
 INPUT_YAML = (
-    Path("bluetooth_sig")
+    DATABASE
+    / "bluetooth_sig"
     / "assigned_numbers"
     / "company_identifiers"
     / "company_identifiers.yaml"
 )
 
 OUTPUT_JSON = (
-    Path("bluetooth_sig")
+    DATABASE
+    / "bluetooth_sig"
     / "assigned_numbers"
     / "company_identifiers"
     / "company_ids.json"
 )
 
-def main():
+MANUF_OLD = DATABASE / "manuf_old.txt"
+MANUF_RING = DATABASE / "manuf_ring_mast4r.txt"
+
+OUTPUT_LOOKUP = DATABASE / "nsm_lookup.bin"
+
+# Binary lookup layout (little endian):
+#   header   magic, version, sha256 of SOURCES, width mask, table counts / offsets
+#   oui      sorted u64 keys (width << 48 | prefix), then u32 string offsets
+#   company  sorted u32 company ids, then u32 string offsets
+#   strings  u16 length + utf-8 bytes, deduplicated
+# Keys and offsets are separate contiguous arrays so readers can bisect a
+# memoryview cast of the mapped file directly.
+LOOKUP_MAGIC = b"NSMLKUP\x00"
+LOOKUP_VERSION = 2
+HEADER = struct.Struct("<8sI32sHxxIIIIII")
+
+SOURCES = (MANUF_OLD, MANUF_RING, INPUT_YAML)
+
+SIG = DATABASE / "bluetooth_sig"
+SIG_UUIDS = SIG / "assigned_numbers" / "uuids"
+SIG_APPEARANCE = SIG / "assigned_numbers" / "core" / "appearance_values.yaml"
+SIG_GSS = SIG / "gss"
+
+OUTPUT_SIG = DATABASE / "nsm_sig.json"
+
+# Compiled SIG index (json, every table a flat hash keyed the way the
+# scanner sees the value):
+#   services         "180f" -> name, service + member + sdo uuids
+#   characteristics  "2a19" -> name
+#   appearance       "961"  -> "Category: Subcategory" (full 16 bit value)
+#   formats          "2a19" -> [[field, bytes, signed, scale, decimals, unknown]]
+#                    only characteristics made of fixed size integer fields
+SIG_VERSION = 1
+SIG_SERVICE_TABLES = ("service_uuids.yaml", "member_uuids.yaml", "sdo_uuids.yaml")
+
+# "Represented values: M = 1, d = -2, b = 0" --> value = raw * M * 10^d * 2^b
+SCALE = re.compile(r"M\s*=\s*(-?\d+),\s*d\s*=\s*(-?\d+),\s*b\s*=\s*(-?\d+)")
+UNKNOWN = re.compile(r"A value of (0x[0-9A-Fa-f]+) represents [\"']value is not known")
+INTEGER = re.compile(r"(u|s)int(8|16|24|32|48)")
+
+
+def normalize_mac(mac):
+    return mac.replace(":", "").replace("-", "").replace(".", "").upper()
+
+
+def parse_wireshark(path, index):
+    """manuf_old.txt -> prefix / long name (24, 28 and 36 bit blocks)"""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+
+            parts = line.rstrip("\n").split("\t")
+            prefix = parts[0].strip()
+            width = None
+
+            if "/" in prefix:
+                prefix, bits = prefix.split("/")
+                width = int(bits) // 4
+
+            prefix = normalize_mac(prefix)
+            width = width or len(prefix)
+            vendor = (parts[2].strip() if len(parts) > 2 else "") or (
+                parts[1].strip() if len(parts) > 1 else ""
+            )
+
+            if vendor:
+                index.setdefault(prefix[:width], vendor)
+
+
+def parse_ring(path, index):
+    """manuf_ring_mast4r.txt -> only fills prefixes wireshark does not know"""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) < 2 or not parts[1].strip():
+                continue
+
+            index.setdefault(normalize_mac(parts[0].split("/")[0]), parts[1].strip())
+
+
+def load_oui():
+    """Both manuf files merged into one prefix -> vendor dict"""
+    index = {}
+    parse_wireshark(MANUF_OLD, index)
+    parse_ring(MANUF_RING, index)
+    return index
+
+
+def load_company_ids():
+    """company_identifiers.yaml -> {int id: company}"""
+    try:
+        import yaml
+    except ImportError:
+        # No PyYAML, fall back to the last generated json
+        with open(OUTPUT_JSON, "r", encoding="utf-8") as f:
+            return {int(key): value["company"] for key, value in json.load(f).items()}
+
     if not INPUT_YAML.exists():
         raise FileNotFoundError(f"Missing {INPUT_YAML}")
 
@@ -41,19 +148,282 @@ def main():
             continue
 
         value_int = int(value, 16) if isinstance(value, str) else int(value)
+        company_ids[value_int] = name
+
+    return company_ids
+
+
+def source_hash():
+    """sha256 over every input the lookup file is compiled from"""
+    digest = hashlib.sha256()
+
+    for path in SOURCES:
+        digest.update(path.name.encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+
+    return digest.digest()
+
+
+def read_header(path=OUTPUT_LOOKUP):
+    """Header fields of a compiled lookup file, None if missing / foreign"""
+    try:
+        with open(path, "rb") as f:
+            raw = f.read(HEADER.size)
+    except FileNotFoundError:
+        return None
+
+    if len(raw) < HEADER.size:
+        return None
+
+    fields = HEADER.unpack(raw)
+    if fields[0] != LOOKUP_MAGIC or fields[1] != LOOKUP_VERSION:
+        return None
+
+    keys = ("magic", "version", "hash", "widths", "oui_count", "oui_offset",
+            "company_count", "company_offset", "strings_offset", "strings_size")
+    return dict(zip(keys, fields))
+
+
+def build_lookup(output=OUTPUT_LOOKUP, verbose=True):
+    """Compile both manuf files + company identifiers into one binary file"""
+    digest = source_hash()
+    oui = load_oui()
+    companies = load_company_ids()
+
+    strings = bytearray()
+    offsets = {}
+
+    def intern(text):
+        if text not in offsets:
+            raw = text.encode("utf-8")[:0xFFFF]
+            offsets[text] = len(strings)
+            strings.extend(struct.pack("<H", len(raw)))
+            strings.extend(raw)
+        return offsets[text]
+
+    oui_rows = sorted(
+        ((len(prefix) << 48) | int(prefix, 16), intern(vendor))
+        for prefix, vendor in oui.items()
+        if prefix and len(prefix) <= 12 and all(c in "0123456789ABCDEF" for c in prefix)
+    )
+    company_rows = sorted(
+        (company_id, intern(name))
+        for company_id, name in companies.items()
+        if 0 <= company_id <= 0xFFFF
+    )
+
+    widths = 0
+    for key, _ in oui_rows:
+        widths |= 1 << (key >> 48)
+
+    oui_offset = (HEADER.size + 7) & ~7
+    company_offset = oui_offset + len(oui_rows) * 12
+    strings_offset = company_offset + len(company_rows) * 8
+
+    body = bytearray(oui_offset - HEADER.size)
+    body.extend(struct.pack(f"<{len(oui_rows)}Q", *(key for key, _ in oui_rows)))
+    body.extend(struct.pack(f"<{len(oui_rows)}I", *(string for _, string in oui_rows)))
+    body.extend(struct.pack(f"<{len(company_rows)}I", *(key for key, _ in company_rows)))
+    body.extend(struct.pack(f"<{len(company_rows)}I", *(string for _, string in company_rows)))
+
+    header = HEADER.pack(
+        LOOKUP_MAGIC, LOOKUP_VERSION, digest, widths,
+        len(oui_rows), oui_offset,
+        len(company_rows), company_offset,
+        strings_offset, len(strings),
+    )
+
+    # Write next to the target and swap, readers never see a half written file
+    tmp = Path(str(output) + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(body)
+        f.write(strings)
+    tmp.replace(output)
 
-        company_ids[str(value_int)] = {
-            "hex": f"0x{value_int:04X}",
-            "company": name
-        }
+    if verbose:
+        print(f"[+] Compiled {len(oui_rows)} OUI prefixes + {len(company_rows)} company ids")
+        print(f"[+] Output → {output} ({strings_offset + len(strings)} bytes)")
+
+    return output
+
+
+def is_stale(path=OUTPUT_LOOKUP):
+    header = read_header(path)
+    return header is None or header["hash"] != source_hash()
+
+
+def sig_sources():
+    """Every SIG yaml file the decoder index is compiled from"""
+    return (
+        [SIG_UUIDS / name for name in SIG_SERVICE_TABLES]
+        + [SIG_UUIDS / "characteristic_uuids.yaml", SIG_APPEARANCE]
+        + sorted(SIG_GSS.glob("*.yaml"))
+    )
+
+
+def sig_hash():
+    digest = hashlib.sha256()
+
+    for path in sig_sources():
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+
+    return digest.hexdigest()
+
+
+def short_uuid(value):
+    return f"{int(value):04x}"
+
+
+def parse_format(structure):
+    """gss structure -> decoder rows, None when a field is not a plain integer"""
+    rows = []
+
+    for field in structure or []:
+        kind = INTEGER.fullmatch(str(field.get("type", "")).strip())
+        if not kind:
+            return None
+
+        description = field.get("description") or ""
+        scale, decimals = 1, 0
+
+        represented = SCALE.search(description)
+        if represented:
+            m, d, b = (int(x) for x in represented.groups())
+            scale, decimals = m * 10.0 ** d * 2.0 ** b, max(0, -d)
+
+        unknown = UNKNOWN.search(description)
+
+        rows.append([
+            field.get("field"), int(kind.group(2)) // 8, kind.group(1) == "s",
+            scale, decimals, int(unknown.group(1), 16) if unknown else None,
+        ])
+
+    return rows or None
+
+
+def build_sig(output=OUTPUT_SIG, verbose=True):
+    """Compile the SIG uuid / appearance / characteristic yaml into one json index"""
+    import yaml
+
+    def load(path, key):
+        with open(path, "r", encoding="utf-8") as f:
+            return yaml.safe_load(f).get(key) or []
+
+    services = {}
+    for name in SIG_SERVICE_TABLES:
+        for entry in load(SIG_UUIDS / name, "uuids"):
+            services.setdefault(short_uuid(entry["uuid"]), entry["name"])
+
+    characteristics, ids = {}, {}
+    for entry in load(SIG_UUIDS / "characteristic_uuids.yaml", "uuids"):
+        characteristics[short_uuid(entry["uuid"])] = entry["name"]
+        if entry.get("id"):
+            ids[entry["id"]] = short_uuid(entry["uuid"])
+
+    appearance = {}
+    for category in load(SIG_APPEARANCE, "appearance_values"):
+        appearance[str(category["category"] << 6)] = category["name"]
+        for sub in category.get("subcategory") or []:
+            appearance[str(category["category"] << 6 | sub["value"])] = f"{category['name']}: {sub['name']}"
+
+    formats = {}
+    for path in sorted(SIG_GSS.glob("*.yaml")):
+        with open(path, "r", encoding="utf-8") as f:
+            characteristic = (yaml.safe_load(f) or {}).get("characteristic") or {}
+
+        uuid = ids.get(characteristic.get("identifier"))
+        rows = parse_format(characteristic.get("structure"))
+        if uuid and rows:
+            formats[uuid] = rows
+
+    index = {
+        "version": SIG_VERSION, "hash": sig_hash(),
+        "services": services, "characteristics": characteristics,
+        "appearance": appearance, "formats": formats,
+    }
+
+    tmp = Path(str(output) + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+    tmp.replace(output)
+
+    if verbose:
+        print(f"[+] Compiled {len(services)} service uuids, {len(characteristics)} characteristics, "
+              f"{len(appearance)} appearance values, {len(formats)} payload formats")
+        print(f"[+] Output → {output}")
+
+    return index
+
+
+def load_sig(path=OUTPUT_SIG, rebuild=True, verbose=False):
+    """Compiled SIG index, rebuilt first when the yaml changed (needs PyYAML)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        index = None
+
+    if not rebuild:
+        return index
+
+    fresh = index and index.get("version") == SIG_VERSION and index.get("hash") == sig_hash()
+    if fresh:
+        return index
+
+    try:
+        return build_sig(output=path, verbose=verbose)
+    except ImportError:
+        # No PyYAML, an outdated index beats none
+        return index
+
+
+def convert_company_ids():
+    company_ids = load_company_ids()
 
     OUTPUT_JSON.parent.mkdir(parents=True, exist_ok=True)
 
     with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(company_ids, f, indent=2, sort_keys=True)
+        json.dump(
+            {
+                str(value_int): {"hex": f"0x{value_int:04X}", "company": name}
+                for value_int, name in company_ids.items()
+            },
+            f, indent=2, sort_keys=True,
+        )
 
     print(f"[+] Generated {len(company_ids)} company identifiers")
     print(f"[+] Output → {OUTPUT_JSON}")
 
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the NSM lookup databases")
+    parser.add_argument("--json", action="store_true", help="Only regenerate company_ids.json")
+    parser.add_argument("--lookup", action="store_true", help="Only compile nsm_lookup.bin")
+    parser.add_argument("--sig", action="store_true", help="Only compile nsm_sig.json")
+    parser.add_argument("--force", action="store_true", help="Rebuild nsm_lookup.bin / nsm_sig.json even if up to date")
+    args = parser.parse_args()
+
+    both = not args.json and not args.lookup and not args.sig
+
+    if args.json or both:
+        convert_company_ids()
+
+    if args.lookup or both:
+        if args.force or is_stale():
+            build_lookup()
+        else:
+            print(f"[+] {OUTPUT_LOOKUP} is up to date")
+
+    if args.sig or both:
+        if args.force:
+            build_sig()
+        else:
+            load_sig(verbose=True)
+
+
 if __name__ == "__main__":
     main()
@@ -33,6 +33,7 @@ class BLEScanner {
         this.allDevices = new Set();
         this.signalHistory = new Map();
         this.kalmanFilters = new Map();
+        this.feed = null;
         this.canvas = document.getElementById('radar-canvas');
         this.ctx = this.canvas.getContext('2d');
 
@@ -217,44 +218,81 @@ class BLEScanner {
         return isMoving;
     }
 
-    async update() {
-        const data = await this.fetchDevices();
+    upsertDevice(mac, info) {
         const now = Date.now() / 1000;
+        const uptime = info.up_time || 0;
+        const rssi = info.rssi || -100;
+
+        // Scanner side engine when it is running, otherwise this tab's own filter
+        const server = 'is_moving' in info;
+        const distanceInfo = this.calculateDistance(server ? info.rssi_filtered : rssi);
+        const isMoving = server ? info.is_moving : this.detectMovement(mac, rssi);
+
+        const manufacturer = info.manuf || 'Unknown';
+
+        this.devices.set(mac, {
+            mac,
+            name: info.name || 'Unknown Device',
+            manufacturer,
+            vendor: info.vendor || 'Unknown',
+            rssi,
+            // SIG names decoded by the scanner, raw UUIDs when none are known
+            uuid: info.services && info.services.length ? info.services.join(', ') : (Array.isArray(info.uuid) ? info.uuid.join(', ') : (info.uuid || 'None')),
+            appearance: info.appearance || '',
+            serviceData: info.service_data ? Object.entries(info.service_data).map(([field, value]) => `${field}: ${value === null ? 'unknown' : value}`).join(', ') : '',
+            uptime,
+            age: now - uptime,
+            isMoving,
+            ...distanceInfo
+        });
+    }
+
+    expireDevice(mac) {
+        // Gone quiet on the scanner side - drop its filter state too
+        this.devices.delete(mac);
+        this.kalmanFilters.delete(mac);
+        this.signalHistory.delete(mac);
+    }
 
-        // Track all devices
+    applySnapshot(data) {
+        // Full map - first event of a stream, or every poll without EventSource
         Object.keys(data).forEach(mac => this.allDevices.add(mac));
 
-        // Clear and rebuild active devices
         this.devices.clear();
 
         for (const [mac, info] of Object.entries(data)) {
-            const uptime = info.up_time || 0;
-
-            if (this.isAlive(uptime)) {
-                const rssi = info.rssi || -100;
-                const distanceInfo = this.calculateDistance(rssi);
-                const isMoving = this.detectMovement(mac, rssi);
-
-                const manufacturer = info.manuf || 'Unknown';
-
-                this.devices.set(mac, {
-                    mac,
-                    name: info.name || 'Unknown Device',
-                    manufacturer,
-                    vendor: info.vendor || 'Unknown',
-                    rssi,
-                    uuid: Array.isArray(info.uuid) ? info.uuid.join(', ') : (info.uuid || 'None'),
-                    uptime,
-                    age: now - uptime,
-                    isMoving,
-                    ...distanceInfo
-                });
+            if (this.isAlive(info.up_time || 0)) {
+                this.upsertDevice(mac, info);
             }
         }
 
         this.render();
     }
 
+    applyDelta(delta) {
+        // Only what changed since the last batch, applied to the existing Map in place
+        for (const [mac, info] of Object.entries(delta.upsert)) {
+            this.allDevices.add(mac);
+            this.upsertDevice(mac, info);
+        }
+
+        delta.expire.forEach(mac => this.expireDevice(mac));
+
+        this.render();
+    }
+
+    async update() {
+        this.applySnapshot(await this.fetchDevices());
+    }
+
+    connect() {
+        // EventSource reconnects on its own and sends Last-Event-ID, the server replays what we missed
+        this.feed = new EventSource('/api/stream');
+        this.feed.addEventListener('snapshot', (e) => this.applySnapshot(JSON.parse(e.data)));
+        this.feed.addEventListener('delta', (e) => this.applyDelta(JSON.parse(e.data)));
+        this.feed.onerror = () => console.error('Stream error, reconnecting');
+    }
+
     render() {
         this.updateStats();
         this.renderRadar();
@@ -452,6 +490,7 @@ class BLEScanner {
     renderTable() {
         const tbody = document.getElementById('table-body');
         let devices = Array.from(this.devices.values());
+        const now = Date.now() / 1000;
 
         // Filter by search
         if (this.tableSearchTerm) {
@@ -481,8 +520,8 @@ class BLEScanner {
                     <td>${this.escape(d.vendor)}</td>
                     <td>${d.rssi} dBm</td>
                     <td><span class="distance-badge ${d.range}">${d.meters}</span></td>
-                    <td>${d.age.toFixed(1)}s ago</td>
-                    <td class="uuid-list">${d.uuid}</td>
+                    <td>${(now - d.uptime).toFixed(1)}s ago</td>
+                    <td class="uuid-list">${this.escape(d.uuid)}${d.appearance ? `<br>${this.escape(d.appearance)}` : ''}${d.serviceData ? `<br>${this.escape(d.serviceData)}` : ''}</td>
                 </tr>
             `;
         }).join('');
@@ -495,6 +534,11 @@ class BLEScanner {
     }
 
     start() {
+        if (window.EventSource) {
+            this.connect();
+            return;
+        }
+
         this.update();
         setInterval(() => this.update(), this.UPDATE_INTERVAL);
     }
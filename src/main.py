@@ -11,9 +11,7 @@ console = Console()
 import argparse
 
 
-# NSM MODULES
-from nsm_mesh_finder import BLE_Sniffer
-from nsm_database import DataBase
+# NSM MODULES  -->  imported once the arguments are parsed, --help stays instant
 
 
 
@@ -32,6 +30,38 @@ class Main_Menu():
     parser.add_argument("-wv", action="store_true", help="BLE Wardriivng with command output")
 
     parser.add_argument("-s", help="Server IP for led lights")
+    parser.add_argument("--cache-size", type=int, default=4096, help="Max devices kept in the enrichment cache")
+    parser.add_argument("--cache-ttl", type=float, default=300, help="Seconds before a cached vendor lookup is redone")
+    parser.add_argument("--stream", action="store_true", help="Continuous callback driven scanning instead of 5 second cycles")
+    parser.add_argument("--adapters", help="Comma separated HCI controllers to scan with at once, e.g. hci0,hci1")
+    parser.add_argument("--backend", choices=["bleak", "fake", "synthetic", "replay"], default="bleak", help="Scanner backend, everything but bleak needs no hardware")
+    parser.add_argument("--sim-devices", type=int, default=1000, help="Synthetic backend: live device population")
+    parser.add_argument("--sim-rate", type=float, default=1.0, help="Synthetic backend: advertisements per device per second")
+    parser.add_argument("--sim-churn", type=float, default=0.01, help="Synthetic backend: fraction of devices replaced per second")
+    parser.add_argument("--sim-rotate", type=float, default=0, help="Synthetic backend: seconds between private address rotations (0 = never)")
+    parser.add_argument("--replay", help="Replay backend: recorded .jsonl session or a --db sqlite database")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="Replay backend: 1 real time, 0 as fast as possible")
+    parser.add_argument("--record", help="Record every advertisement to this .jsonl file for later replay")
+    parser.add_argument("--live-ttl", type=float, default=60, help="Seconds unheard before a device leaves the live map (0 = never)")
+    parser.add_argument("--live-max", type=int, default=20_000, help="Max devices in the live map, least recently heard evicted first (0 = unbounded)")
+    parser.add_argument("--history-bucket", type=float, default=10, help="Seconds per min/max/mean RSSI bucket in the sighting log (0 = no log)")
+    parser.add_argument("--lookup-socket", help="Resolve vendors through a running `nsm_lookup.py serve` on this Unix socket")
+    parser.add_argument("--workers", type=int, default=0, help="Enrichment processes for the staged pipeline, plus one writer process (0 = single process)")
+    parser.add_argument("--db", choices=["jsonl", "sqlite"], default="jsonl", help="Wardriving storage backend")
+    parser.add_argument("--view-rows", type=int, default=20, help="-wv: devices shown in the terminal window")
+    parser.add_argument("--view-sort", choices=["rssi", "recent"], default="rssi", help="-wv: strongest or most recently heard devices first")
+    parser.add_argument("--view-fps", type=float, default=2, help="-wv: max terminal redraws per second, unchanged frames are skipped")
+    parser.add_argument("--view-interval", type=float, default=10, help="-wv: seconds between totals lines")
+    parser.add_argument("--speak-every", type=float, default=60, help="Seconds between spoken device count announcements, a colour change is spoken sooner")
+    parser.add_argument("--tracker-window", type=float, default=120, help="Seconds per window of the tracker follower detector (Tile, AirTag / Find My)")
+    parser.add_argument("--tracker-windows", type=int, default=4, help="Alert when the same tracker is heard in more than this many distinct windows")
+    parser.add_argument("--tracker-span", type=int, default=30, help="Windows looked back when counting a tracker's windows")
+    parser.add_argument("--tracker-cooldown", type=float, default=900, help="Seconds before the same tracker alerts again")
+    parser.add_argument("--tracker-max", type=int, default=2048, help="Trackers remembered at once, least recently heard forgotten first")
+    parser.add_argument("--profile", action="store_true", help="cProfile one scan cycle every --profile-every + tracemalloc growth, dumps in database/profiles, /debug/profile on demand")
+    parser.add_argument("--profile-every", type=int, default=12, help="Scan cycles between profiles (0 = only on /debug/profile)")
+    parser.add_argument("--profile-keep", type=int, default=5, help="Profile dumps kept on disk, oldest removed first")
+    parser.add_argument("--profile-top", type=int, default=25, help="Functions / allocation sites per profile report")
 
 
 
@@ -42,10 +72,26 @@ class Main_Menu():
     war       = args.w
     war_v     = args.wv
     server_ip = args.s
-
-
-    if  war or war_v: 
-        BLE_Sniffer.main(war_drive=war, print=war_v, server_ip=server_ip); exit()
+    cache     = {"cache_size": args.cache_size, "cache_ttl": args.cache_ttl}
+    live      = {"live_ttl": args.live_ttl, "live_max": args.live_max, "history_bucket": args.history_bucket}
+    storage   = args.db
+    stream    = args.stream
+    adapters  = [adapter.strip() for adapter in args.adapters.split(",") if adapter.strip()] if args.adapters else None
+    backend   = args.backend
+    record    = args.record
+    lookup    = args.lookup_socket
+    workers   = max(0, args.workers)
+    options   = {"devices": args.sim_devices, "rate": args.sim_rate, "churn": args.sim_churn, "rotate": args.sim_rotate} if backend == "synthetic" else {}
+    options   = {"replay": args.replay, "speed": args.replay_speed} if backend == "replay" else options
+    view      = {"rows": max(1, args.view_rows), "sort": args.view_sort, "fps": max(0.1, args.view_fps), "interval": max(1, args.view_interval)}
+    trackers  = {"window": max(1, args.tracker_window), "threshold": max(1, args.tracker_windows), "span": max(args.tracker_span, args.tracker_windows + 1), "cooldown": max(0, args.tracker_cooldown), "max_trackers": max(1, args.tracker_max)}
+    profile   = {"every": max(0, args.profile_every), "keep": max(1, args.profile_keep), "top": max(1, args.profile_top)} if args.profile else None
+
+
+    # SPAWNED PIPELINE PROCESSES IMPORT THIS FILE AS __mp_main__ --> only the real entry point scans
+    if  (war or war_v) and __name__ == "__main__": 
+        from nsm_mesh_finder import BLE_Sniffer
+        BLE_Sniffer.main(war_drive=war, print=war_v, server_ip=server_ip, storage=storage, stream=stream, adapters=adapters, backend=backend, backend_options=options, record=record, lookup_socket=lookup, workers=workers, profile=profile, view=view, trackers=trackers, speak_every=max(0, args.speak_every), **cache, **live); exit()
 
 
 
@@ -0,0 +1,118 @@
+# THIS MODULE WILL DISPATCH ALERTS (LEDS, TEXT TO SPEECH) OFF THE SCAN LOOP
+
+
+
+# UI IMPORTS
+from rich.console import Console
+console = Console()
+
+
+# ETC IMPORTS
+import threading, time
+from collections import deque
+
+
+
+
+class Alert_Sink():
+    """One worker thread per sink --> bounded queue, latest wins when coalescing, timeout + retry"""
+
+
+
+    def __init__(self, name: str, handler, maxsize: int = 8, coalesce: bool = True, retries: int = 2, backoff: float = 0.5):
+        """handler(payload) runs on the worker thread, never on the scanner"""
+
+
+        self.name     = name
+        self.handler  = handler
+        self.retries  = retries
+        self.backoff  = backoff
+
+        # COALESCING --> a queue of one, every new alert replaces the one still waiting
+        self.queue    = deque(maxlen=1 if coalesce else maxsize)
+        self.ready    = threading.Condition()
+
+        self.sent     = 0
+        self.failed   = 0
+        self.dropped  = 0
+
+        threading.Thread(target=self._worker, name=f"alert-{name}", daemon=True).start()
+
+
+    def submit(self, payload) -> None:
+        """Never blocks --> when full the oldest pending alert is dropped"""
+
+
+        with self.ready:
+
+            if len(self.queue) == self.queue.maxlen: self.dropped += 1
+
+            self.queue.append(payload)
+            self.ready.notify()
+
+
+    def _worker(self) -> None:
+        """Deliver pending alerts one at a time"""
+
+
+        while True:
+
+            with self.ready:
+                while not self.queue: self.ready.wait()
+                payload = self.queue.popleft()
+
+
+            for attempt in range(self.retries + 1):
+
+                try:
+                    self.handler(payload); self.sent += 1
+                    break
+
+                except Exception as e:
+
+                    if attempt == self.retries:
+                        self.failed += 1
+                        console.print(f"[bold red][-] Alert {self.name} failed:[bold yellow] {e}")
+
+                    else: time.sleep(self.backoff * 2 ** attempt)
+
+
+
+class Alert_Dispatcher():
+    """Named sinks --> the scan loop only ever calls dispatch()"""
+
+
+    sinks = {}
+    lock  = threading.Lock()
+
+
+
+    @classmethod
+    def register(cls, name: str, handler, **kwargs) -> Alert_Sink:
+        """Create the sink once, later calls return the same one"""
+
+
+        with cls.lock:
+
+            if name not in cls.sinks: cls.sinks[name] = Alert_Sink(name=name, handler=handler, **kwargs)
+
+            return cls.sinks[name]
+
+
+    @classmethod
+    def dispatch(cls, name: str, payload) -> bool:
+        """Hand an alert to its sink --> False if the sink was never registered"""
+
+
+        sink = cls.sinks.get(name)
+        if not sink: return False
+
+        sink.submit(payload)
+        return True
+
+
+    @classmethod
+    def stats(cls) -> dict:
+        """Per sink counters"""
+
+        return {name: {"sent": sink.sent, "failed": sink.failed, "dropped": sink.dropped, "pending": len(sink.queue)} for name, sink in cls.sinks.items()}
@@ -0,0 +1,687 @@
+# THIS MODULE WILL HOLD MICRO BENCHMARKS FOR THE HOT PATHS  -->  python nsm_benchmark.py vendor
+
+
+
+# UI IMPORTS
+from rich.console import Console
+console = Console()
+
+
+# ETC IMPORTS
+import argparse, json, os, random, resource, signal, subprocess, sys, tempfile, threading, time, urllib.error, urllib.request
+from itertools import islice
+from pathlib import Path
+
+
+# NSM IMPORTS
+from nsm_database import Vendor_Index, Lookup_File, converter
+
+
+
+
+class Benchmark():
+    """This class will time the scanner hot paths"""
+
+
+
+    @staticmethod
+    def _rate(func, items: list) -> float:
+        """Run func over items --> calls per second"""
+
+
+        start = time.perf_counter()
+
+        for item in items: func(item)
+
+        elapsed = time.perf_counter() - start
+
+        return len(items) / elapsed if elapsed else float("inf")
+
+
+    @staticmethod
+    def _random_macs(count: int, prefixes: list) -> list:
+        """Known prefixes + random tail, 1 in 10 fully random"""
+
+
+        macs = []
+
+        for _ in range(count):
+
+            if random.random() < 0.1: raw = "".join(random.choice("0123456789ABCDEF") for _ in range(12))
+            else:
+                prefix = random.choice(prefixes)
+                raw    = prefix + "".join(random.choice("0123456789ABCDEF") for _ in range(12 - len(prefix)))
+
+            macs.append(":".join(raw[i:i+2] for i in range(0, 12, 2)))
+
+        return macs
+
+
+    @staticmethod
+    def _legacy_vendor(mac: str) -> str:
+        """The old _get_vendor + _get_vendor_new path: reparse the files on every call"""
+
+
+        # BENCHMARK ONLY --> `pip install manuf` for the full old path, the scanner never imports it
+        try:
+            import manuf
+            vendor = manuf.MacParser(str(converter.MANUF_OLD)).get_manuf_long(mac=mac)
+            if vendor: return vendor
+
+        except ImportError: pass
+
+
+        prefix = "".join(mac.split(":")[:3])
+
+        with open(converter.MANUF_RING, "r") as file:
+
+            for line in file:
+                parts = line.strip().split("\t")
+                if parts[0] == prefix: return parts[1]
+
+        return False
+
+
+    @classmethod
+    def vendor(cls, before: int = 20, after: int = 200_000) -> None:
+        """Vendor lookups per second --> legacy file parsing vs text index vs mmap file"""
+
+
+        start = time.perf_counter()
+        index = converter.load_oui()
+        parse = time.perf_counter() - start
+
+        Vendor_Index.index  = index
+        Vendor_Index.widths = tuple(sorted({len(key) for key in index}, reverse=True))
+
+        converter.build_lookup(verbose=False) if converter.is_stale() else None
+
+        start  = time.perf_counter()
+        mapped = Lookup_File(Lookup_File.path)
+        opened = time.perf_counter() - start
+
+        prefixes = [key for key in index if len(key) >= 6 and len(key) <= 9]
+        sample   = cls._random_macs(count=after, prefixes=prefixes)
+
+        old = cls._rate(func=cls._legacy_vendor, items=sample[:before])
+        new = cls._rate(func=Vendor_Index.lookup, items=sample)
+        mmp = cls._rate(func=mapped.vendor, items=sample)
+
+        console.print(f"[bold green][+] Startup:[bold yellow] text parse {parse:.3f}s  |  mmap open {opened * 1000:.3f}ms")
+        console.print(f"[bold green][+] Legacy:    [bold yellow] {old:,.1f} lookups/s")
+        console.print(f"[bold green][+] Text index:[bold yellow] {new:,.0f} lookups/s  (x{new / old:,.0f})")
+        console.print(f"[bold green][+] Mmap file: [bold yellow] {mmp:,.0f} lookups/s  (x{mmp / old:,.0f})")
+
+
+    @classmethod
+    def lookup(cls, batch: int = 500, cycles: int = 20) -> None:
+        """One scan cycle's MACs --> per MAC calls vs one batch, in process and through the lookup service"""
+
+
+        from nsm_lookup import Lookup_Server, Lookup_Client
+        from nsm_scanners import Synthetic_Scanner
+
+        path = Path(tempfile.gettempdir()) / f"nsm_lookup_bench_{os.getpid()}.sock"
+        threading.Thread(target=Lookup_Server.serve, kwargs={"path": path, "verbose": False}, daemon=True).start()
+
+        while not path.exists(): time.sleep(0.01)
+
+        client   = Lookup_Client(path=path, fallback=False)
+        prefixes = [oui.replace(":", "") for oui in Synthetic_Scanner.ouis]
+        rounds   = [cls._random_macs(count=batch, prefixes=prefixes) for _ in range(cycles)]
+
+
+        def timed(func) -> float:
+            start = time.perf_counter()
+            for macs in rounds: func(macs)
+            return (time.perf_counter() - start) / cycles * 1000
+
+        rows = (
+            ("in process, per MAC", lambda macs: [Vendor_Index.lookup(mac) for mac in macs]),
+            ("in process, batch",   lambda macs: Vendor_Index.lookup_many(macs, remote=False)),
+            ("service, per MAC",    lambda macs: [client.vendors([mac]) for mac in macs]),
+            ("service, batch",      client.vendors),
+        )
+
+        same = all(client.vendors(macs) == Vendor_Index.lookup_many(macs, remote=False) for macs in rounds)
+
+        for label, func in rows: console.print(f"[bold green][+] {label:<20}[bold yellow] {timed(func):8.3f} ms per {batch} MAC cycle")
+        console.print(f"[bold green][+] Service answers match in process:[bold yellow] {same}")
+
+        Lookup_Server.stop(); client.close()
+
+
+    @staticmethod
+    def _legacy_motion(filters: dict, histories: dict, mac: str, rssi: float) -> bool:
+        """gui/app.js detectMovement ported line for line --> one device per call"""
+
+
+        x, P = filters.get(mac, (None, 1))
+
+        if x is None: x = rssi
+        else:
+            P_pred = P + 0.008; K = P_pred / (P_pred + 4)
+            x = x + K * (rssi - x); P = (1 - K) * P_pred
+
+        filters[mac] = (x, P)
+
+        history = histories.setdefault(mac, [])
+        history.append(x)
+        if len(history) > 15: history.pop(0)
+        if len(history) < 8: return False
+
+        mean    = sum(history) / len(history)
+        std     = (sum((value - mean) ** 2 for value in history) / len(history)) ** 0.5
+        recent  = history[-5:]
+        change  = sum(abs(recent[i] - recent[i - 1]) for i in range(1, len(recent))) / (len(recent) - 1)
+
+        return std > 3 or change > 1.5
+
+
+    @classmethod
+    def motion(cls, devices: int = 10_000, cycles: int = 60) -> None:
+        """Kalman + variance + rate of change for every device --> numpy engine vs the per device loop"""
+
+
+        from nsm_motion import Motion_Engine
+        from nsm_device import Device
+
+        engine = Motion_Engine()
+
+        if not engine.enabled: console.print("[bold red][-] numpy is not installed"); return
+
+
+        macs    = [f"{i >> 16 & 0xFF:02X}:{i >> 8 & 0xFF:02X}:{i & 0xFF:02X}:00:00:00" for i in range(devices)]
+        base    = [random.uniform(-90, -40) for _ in macs]
+        walkers = set(random.sample(range(devices), devices // 10))
+        records = {mac: Device(addr=mac, rssi=-60, manuf=False, vendor=False, name=False, uuid=False, up_time=0.0) for mac in macs}
+
+        filters, histories = {}, {}
+        old = new = 0.0; agree = checked = 0
+
+
+        for cycle in range(cycles):
+
+            # 1 IN 10 DEVICES IS WALKING --> drifting RSSI, the rest only jitter
+            samples = [base[i] + random.gauss(0, 2) + (cycle * 0.8 if i in walkers else 0) for i in range(devices)]
+
+            start = time.perf_counter()
+            legacy = [cls._legacy_motion(filters, histories, mac, rssi) for mac, rssi in zip(macs, samples)]
+            old += time.perf_counter() - start
+
+            start = time.perf_counter()
+            engine.pending = dict(zip(macs, samples)); engine.update(records)
+            new += time.perf_counter() - start
+
+            agree += sum(records[mac].is_moving == moving for mac, moving in zip(macs, legacy)); checked += devices
+
+
+        console.print(f"[bold green][+] Per device loop:[bold yellow] {old / cycles * 1000:8.2f} ms/cycle ({devices:,} devices)")
+        console.print(f"[bold green][+] Numpy engine:   [bold yellow] {new / cycles * 1000:8.2f} ms/cycle (x{old / new:,.1f}), is_moving agrees on {agree / checked:.2%}")
+        console.print(f"[bold green][+] Moving now:     [bold yellow] {sum(record.is_moving for record in records.values()):,} of {devices:,} ({len(walkers):,} walking)")
+
+
+    @staticmethod
+    def _traced_without(filename: str) -> int:
+        """Bytes tracemalloc holds right now, minus allocations made in `filename`"""
+
+        import tracemalloc
+
+        return sum(stat.size for stat in tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, f"*{filename}")]).statistics("filename"))
+
+
+    @classmethod
+    def records(cls, devices: int = 10_000, rounds: int = 3) -> None:
+        """Memory + serialisation of live_map / war_drive --> old fresh dict per advertisement vs Device records"""
+
+
+        import json, tracemalloc
+        from nsm_mesh_finder import BLE_Sniffer
+        from nsm_scanners import Synthetic_Scanner
+        from nsm_database import Enrichment_Cache
+        from nsm_device import Device
+
+        Vendor_Index.load(verbose=False)
+
+        scanner = Synthetic_Scanner(devices=devices, rate=1.0, churn=0.0, seed=7)
+        chunks  = [scanner.emit(devices) for _ in range(rounds)]
+
+
+        # OLD SHAPE --> new 7 key dict per advertisement in live_map, a dict copy per new MAC in war_drive
+        Enrichment_Cache.configure(size=devices * 2)
+        tracemalloc.start()
+
+        live, drive = {}, {}
+
+        for chunk in chunks:
+            for device, adv in chunk:
+
+                manuf, vendor, _ = Enrichment_Cache.resolve(mac=device.address, manufacturer_data=adv.manufacturer_data)
+                data = {"rssi": adv.rssi, "addr": device.address, "manuf": manuf, "vendor": vendor, "name": adv.local_name or False, "uuid": adv.service_uuids or False, "up_time": time.time()}
+
+                if device.address not in live: drive[len(drive) + 1] = dict(data)
+                live[device.address] = data
+
+        old = tracemalloc.get_traced_memory()[0]; old_own = cls._traced_without("nsm_database.py"); tracemalloc.stop()
+
+        start = time.perf_counter(); old_body = json.dumps(live); old_json = time.perf_counter() - start
+        del live, drive
+
+
+        # DEVICE RECORDS --> updated in place, shared strings
+        Enrichment_Cache.configure(size=devices * 2)
+        BLE_Sniffer._reset(live_max=devices * 2)
+        tracemalloc.start()
+
+        for chunk in chunks:
+            for device, adv in chunk: BLE_Sniffer._ingest(mac=device.address, adv=adv)
+
+        # PER PUBLISH BUFFERS (fingerprint / motion pending, latency arrivals) --> drained every second by publish(), not part of the records
+        held = tracemalloc.get_traced_memory()[0]
+        BLE_Sniffer.fingerprints.pending.clear(); BLE_Sniffer.motion.pending.clear(); BLE_Sniffer.latency.arrivals.clear()
+
+        new = tracemalloc.get_traced_memory()[0]; new_own = cls._traced_without("nsm_database.py"); tracemalloc.stop()
+
+        start = time.perf_counter(); new_body = Device.encode_map(BLE_Sniffer.live_map); new_json = time.perf_counter() - start
+
+
+        console.print(f"[bold green][+] Dict records:  [bold yellow] {old / 1e6:7.2f} MB per {devices:,} devices ({old_own / 1e6:5.2f} MB without the enrichment cache) | json.dumps {old_json * 1000:7.1f} ms ({len(old_body) / 1e6:.2f} MB)")
+        console.print(f"[bold green][+] Device records:[bold yellow] {new / 1e6:7.2f} MB per {devices:,} devices ({new_own / 1e6:5.2f} MB without the enrichment cache) | encode_map {new_json * 1000:7.1f} ms ({len(new_body) / 1e6:.2f} MB)")
+        console.print(f"[bold green][+] Publish buffers:[bold yellow] {(held - new) / 1e6:6.2f} MB for one second of {devices:,} devices, released by every publish")
+        console.print(f"[bold green][+] Saved:         [bold yellow] {(old - new) / devices:,.0f} bytes per device ({(old_own - new_own) / devices:,.0f} outside the cache), serialisation x{old_json / new_json:.1f}")
+
+
+    @staticmethod
+    def _importtime(args: list) -> tuple:
+        """Fresh interpreter with -X importtime --> (import ms, wall ms, [(ms, top level module)])"""
+
+
+        start  = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=Path(__file__).parent, capture_output=True, text=True)
+        wall   = (time.perf_counter() - start) * 1000
+
+        top = []
+
+        # "import time: self | cumulative | name" --> nested imports are indented past the first space
+        for line in result.stderr.splitlines():
+
+            if not line.startswith("import time:") or "cumulative" in line: continue
+
+            _, cumulative, name = line.split("|", 2)
+            if not name.startswith("  "): top.append((int(cumulative) / 1000, name.strip()))
+
+        return sum(ms for ms, _ in top), wall, sorted(top, reverse=True)
+
+
+    @classmethod
+    def startup(cls, budget: float = 300, scanner_budget: float = 1500) -> bool:
+        """Cold start import cost of `main.py --help` and of the scanner modules --> False when over budget"""
+
+
+        ok = True
+
+        for label, args, limit in (("main.py --help", ["main.py", "--help"], budget), ("scanner start", ["-c", "import nsm_mesh_finder, nsm_server"], scanner_budget)):
+
+            imports, wall, top = cls._importtime(args)
+            passed = imports <= limit; ok &= passed
+
+            console.print(f"[bold green][+] {label:<15}[bold yellow] imports {imports:7.1f} ms | wall {wall:7.1f} ms | budget {limit:.0f} ms --> {'[bold green]OK' if passed else '[bold red]OVER'}")
+            console.print(f"[bold green]    heaviest:    [bold yellow] " + ", ".join(f"{name} {ms:.1f}" for ms, name in top[:6]))
+
+        return ok
+
+
+    @staticmethod
+    def _rss_mb() -> float:
+        """Resident memory right now --> MB"""
+
+
+        try:
+            with open("/proc/self/statm") as file: return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+        except OSError: return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+    @classmethod
+    def pipeline(cls, sizes: tuple = (1_000, 10_000, 50_000), seconds: int = 10, churn: float = 0.01, requests: int = 20) -> None:
+        """Synthetic load through ingest --> persistence --> /api/devices, one row per population size"""
+
+
+        from nsm_mesh_finder import BLE_Sniffer
+        from nsm_scanners import Synthetic_Scanner
+        from nsm_server import Web_Server
+        from nsm_storage import JSONL_Storage, Sighting_Log
+        from nsm_database import DataBase, Enrichment_Cache
+
+
+        server = Web_Server.create(address="127.0.0.1", port=0)
+        url    = f"http://127.0.0.1:{server.server_address[1]}/api/devices"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        tmp = Path(tempfile.mkdtemp(prefix="nsm_bench_"))
+        Vendor_Index.load()
+
+
+        for size in sizes:
+
+            BLE_Sniffer._reset(live_max=size * 2)
+            BLE_Sniffer.history = Sighting_Log(path=tmp / f"sightings_{size}.bin", verbose=False)
+            Enrichment_Cache.configure(size=size * 2)
+            DataBase.storage = JSONL_Storage(path=tmp / f"pipeline_{size}.jsonl", compact_interval=0, verbose=False)
+
+
+            # PRE GENERATED --> the generator is not what we are timing, one chunk per simulated second
+            scanner = Synthetic_Scanner(devices=size, rate=1.0, churn=churn)
+            chunks  = []
+
+            for _ in range(seconds): scanner.turnover(1.0); chunks.append(scanner.emit(size))
+
+
+            before = cls._rss_mb(); ingest = 0.0; persist = 0.0; publish = 0.0; total = 0
+
+            for chunk in chunks:
+
+                start = time.perf_counter()
+                for device, adv in chunk: BLE_Sniffer._ingest(mac=device.address, adv=adv)
+                ingest += time.perf_counter() - start; total += len(chunk)
+
+                start = time.perf_counter()
+                BLE_Sniffer.publish()
+                publish += time.perf_counter() - start
+
+                start = time.perf_counter()
+                DataBase.push_results(devices=BLE_Sniffer.war_drive, sightings=BLE_Sniffer.live_map, verbose=False)
+                persist += time.perf_counter() - start
+
+            after = cls._rss_mb()
+
+
+            # SAME SNAPSHOT EVERY TIME --> full body, gzip negotiated, then revalidation with the ETag
+            timings = {}
+
+            for label, headers in (("full", {}), ("gzip", {"Accept-Encoding": "gzip"}), ("304", {"If-None-Match": BLE_Sniffer.snapshot.etag})):
+
+                latencies = []; length = 0
+
+                for _ in range(requests):
+
+                    start = time.perf_counter()
+
+                    try:
+                        with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as response: length = len(response.read())
+                    except urllib.error.HTTPError as e: e.close(); length = 0
+
+                    latencies.append(time.perf_counter() - start)
+
+                latencies.sort()
+                timings[label] = f"{label} p50 {latencies[len(latencies) // 2] * 1000:.1f} ms ({length / 1e6:.2f} MB)"
+
+
+            console.print(f"[bold green][+] {size:>6} devices:[bold yellow] {total / ingest:>9,.0f} adv/s ingest | push {persist / seconds * 1000:7.1f} ms/cycle | "
+                          f"snapshot {publish / seconds * 1000:6.1f} ms/cycle | mem +{after - before:6.1f} MB ({len(BLE_Sniffer.live_map)} live, {BLE_Sniffer.live_map.evicted} evicted)")
+            console.print(f"[bold green][+] {'':>6} /api/devices:[bold yellow] {'  |  '.join(timings.values())}")
+
+
+        server.shutdown()
+
+
+
+    @staticmethod
+    def _interrupted(path: str, devices: int, workers: int) -> None:
+        """Runs in the child of `shutdown` --> scanner loop with an enrichment pool and a writer process until Ctrl-C, then the same close as BLE_Sniffer.main"""
+
+
+        from nsm_mesh_finder import BLE_Sniffer
+        from nsm_pipeline import Enrich_Pool, Persist_Writer, _enrich
+        from nsm_scanners import Synthetic_Scanner
+        from nsm_database import Enrichment_Cache
+
+
+        BLE_Sniffer._reset(live_max=devices * 2)
+        Vendor_Index.load(); Enrichment_Cache.configure(size=devices * 2)
+
+        pool    = Enrich_Pool(workers=workers)
+        writer  = Persist_Writer(backend="sqlite", path=path)
+        scanner = Synthetic_Scanner(devices=devices, rate=1.0, churn=0.05)
+
+        # EVERY WORKER UP BEFORE THE SIGNAL --> they are what used to die with a traceback
+        list(pool.pool.map(_enrich, [[]] * workers))
+        ready = False
+
+
+        try:
+
+            while True:
+
+                scanner.turnover(1.0)
+                for device, adv in scanner.emit(devices): BLE_Sniffer._ingest(mac=device.address, adv=adv)
+                writer.submit(BLE_Sniffer.war_drive, BLE_Sniffer.live_map)
+
+                if not ready: print("ready", flush=True); ready = True
+
+
+        except KeyboardInterrupt:
+
+            lost = writer.close(devices=BLE_Sniffer.war_drive, sightings=BLE_Sniffer.live_map)
+            pool.close()
+
+            macs = {device.addr for device in BLE_Sniffer.war_drive.values()} | set(BLE_Sniffer.live_map)
+            print(json.dumps({"macs": len(macs), "lost": lost}), flush=True)
+
+
+    @classmethod
+    def shutdown(cls, devices: int = 5_000, workers: int = 2, seconds: float = 5, wait: float = 60) -> bool:
+        """Ctrl-C on a --workers scanner --> exits within `wait`, no worker tracebacks, every MAC heard is a devices row"""
+
+
+        import sqlite3
+
+        path  = Path(tempfile.mkdtemp(prefix="nsm_bench_")) / "shutdown.sqlite3"
+        code  = f"from nsm_benchmark import Benchmark; Benchmark._interrupted(path={str(path)!r}, devices={devices}, workers={workers})"
+
+        # OWN SESSION --> SIGINT to its process group is what a terminal sends on Ctrl-C, writer and pool workers included
+        child = subprocess.Popen([sys.executable, "-c", code], cwd=Path(__file__).parent, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, start_new_session=True)
+
+        for line in child.stdout:
+            if line.strip() == "ready": break
+
+        time.sleep(seconds)
+        os.killpg(child.pid, signal.SIGINT)
+        start = time.perf_counter()
+
+
+        try: out, err = child.communicate(timeout=wait); hung = False
+        except subprocess.TimeoutExpired: os.killpg(child.pid, signal.SIGKILL); out, err = child.communicate(); hung = True
+
+        elapsed = time.perf_counter() - start
+        result  = next((json.loads(line) for line in reversed(out.splitlines()) if line.startswith("{")), {})
+
+        with sqlite3.connect(str(path)) as conn: rows = conn.execute("SELECT COUNT(*) FROM devices").fetchone()[0]
+
+
+        tracebacks = err.count("Traceback")
+        ok = not hung and child.returncode == 0 and not tracebacks and result.get("lost") == 0 and rows == result.get("macs")
+
+        console.print(f"[bold green][+] Ctrl-C, {workers} workers:[bold yellow] {'hung, killed' if hung else f'exited in {elapsed:.1f} s'} (code {child.returncode}) | "
+                      f"{rows:,} rows for {result.get('macs', 0):,} MACs heard | {tracebacks} tracebacks --> {'[bold green]OK' if ok else '[bold red]FAIL'}")
+
+        if not ok and err: console.print(err[-2000:])
+
+        return ok
+
+
+
+    @classmethod
+    def fingerprint(cls, sizes: tuple = (1_000, 10_000), seconds: int = 180, rotate: float = 60) -> None:
+        """Rotating private addresses on a simulated clock --> raw MACs vs estimated physical devices vs the real population, link cost"""
+
+
+        from nsm_fingerprint import Fingerprint_Engine
+        from nsm_scanners import Synthetic_Scanner
+        from nsm_device import Device
+
+
+        for size in sizes:
+
+            scanner = Synthetic_Scanner(devices=size, rate=1.0, churn=0.0, rotate=rotate)
+            engine  = Fingerprint_Engine(ttl=600)
+            records = {}
+            elapsed = 0.0; updates = 0
+
+            for second in range(seconds):
+
+                scanner.turnover(1.0)
+                chunk = scanner.emit(size)
+
+                for i, (device, adv) in enumerate(chunk):
+
+                    seen   = second + i / len(chunk)
+                    record = records.get(device.address)
+
+                    if record is None: record = records[device.address] = Device(addr=device.address, rssi=adv.rssi, manuf=False, vendor=False, name=False, uuid=False, up_time=seen)
+                    else: record.rssi = adv.rssi; record.up_time = seen
+
+                    if device.address not in engine.pending: engine.pending[device.address] = (adv, seen)
+
+                start = time.perf_counter()
+                updates += engine.update(records, now=second + 1)
+                elapsed += time.perf_counter() - start
+
+
+            # CLUSTERS STILL HEARD IN THE LAST MINUTE --> the population the scanner would report right now
+            live   = sum(cluster.last_seen >= seconds - 60 for cluster in engine.clusters.values())
+            stats  = engine.stats()
+
+            console.print(f"[bold green][+] {size:>6,} devices, {seconds}s, rotation every {rotate:.0f}s:[bold yellow] {len(records):,} MACs --> {live:,} estimated physical ({(live - size) / size:+.1%}), {stats['linked']:,} links, {stats['splits']:,} splits, {elapsed / updates * 1e6:.2f} us per device update")
+
+
+    @classmethod
+    def trackers(cls, size: int = 500, hours: float = 1, followers: int = 3, churn: float = 0.02) -> None:
+        """Simulated drive --> passing devices churn past, a few trackers ride along | followers found, passers flagged, trackers held, update cost"""
+
+
+        from nsm_fingerprint import Fingerprint_Engine
+        from nsm_trackers import Tracker_Detector
+        from nsm_scanners import Synthetic_Scanner, Fake_Device, Fake_Advertisement
+        from nsm_device import Device
+
+
+        scanner  = Synthetic_Scanner(devices=size, rate=1.0, churn=churn)
+        engine   = Fingerprint_Engine(ttl=60)
+        detector = Tracker_Detector()
+        records  = {}
+        elapsed  = 0.0; flagged = set()
+
+        # RIDING ALONG --> an AirTag away from its owner, a Tile, a Find My accessory, fixed addresses, heard most seconds
+        riders = [
+            (Fake_Device(address=f"DE:AD:BE:EF:00:{i:02X}"), Fake_Advertisement(rssi=-60 - i, **(
+                {"manufacturer_data": {76: bytes([0x12, 0x19, 0x10]) + bytes(24)}} if i % 3 == 0 else
+                {"service_uuids": ["0000fe9f-0000-1000-8000-00805f9b34fb"]}     if i % 3 == 1 else
+                {"service_data": {"0000fdc0-0000-1000-8000-00805f9b34fb": bytes(4)}})))
+            for i in range(followers)
+        ]
+
+
+        for second in range(int(hours * 3600)):
+
+            scanner.turnover(1.0)
+            chunk = scanner.emit(size) + [rider for rider in riders if random.random() < 0.8]
+
+            for i, (device, adv) in enumerate(chunk):
+
+                seen   = second + i / len(chunk)
+                record = records.get(device.address)
+
+                if record is None: record = records[device.address] = Device(addr=device.address, rssi=adv.rssi, manuf=False, vendor=False, name=False, uuid=False, up_time=seen)
+                else: record.rssi = adv.rssi; record.up_time = seen
+
+                if device.address not in engine.pending: engine.pending[device.address] = (adv, seen)
+
+
+            # SAME ORDER AS BLE_Sniffer.publish --> fingerprints first, the detector reads the map they consumed
+            pending = engine.pending
+            engine.update(records, now=second + 1)
+
+            start = time.perf_counter()
+            flagged.update(tracker.mac for tracker in detector.update(pending, records, now=second + 1))
+            elapsed += time.perf_counter() - start
+
+            # LIVE MAP EVICTION --> unheard for a minute
+            if second % 10 == 0:
+                stale = [mac for mac, record in records.items() if record.up_time < second - 60]
+                for mac in stale: del records[mac]
+                engine.release(stale)
+
+
+        riders = {device.address for device, _ in riders}
+        stats  = detector.stats()
+
+        console.print(f"[bold green][+] {size:,} passing devices, churn {churn:.0%}/s, {hours:g} h:[bold yellow] {len(riders & flagged)}/{len(riders)} followers found, {len(flagged - riders)} passers flagged, {stats['trackers']:,} trackers / {stats['aliases']:,} aliases held (cap {detector.max_trackers:,}), {stats['heard']:,} tracker sightings, {elapsed / max(stats['heard'], 1) * 1e6:.2f} us per sighting, 0 extra per advertisement")
+
+
+    @classmethod
+    def terminal(cls, sizes: tuple = (1_000, 10_000, 50_000), frames: int = 20) -> None:
+        """-wv terminal cost per population --> old 51 row tables printed for every device vs one fixed window frame"""
+
+
+        import io
+        from rich.live import Live
+        from rich.table import Table
+        from nsm_mesh_finder import Live_Map
+        from nsm_terminal import Terminal_View
+        from nsm_device import Device
+
+        out = Console(file=io.StringIO(), width=160, force_terminal=True)
+
+        for size in sizes:
+
+            live_map = Live_Map(ttl=0, max_size=0)
+            for i in range(size): live_map.heard(f"{i >> 16 & 0xFF:02X}:{i >> 8 & 0xFF:02X}:{i & 0xFF:02X}:00:00:00", Device(addr=f"{i:06X}", rssi=random.randint(-100, -30), manuf="Apple, Inc. | 10059aa7e29bac", vendor=False, name="JBL Flip 6", uuid=False, up_time=time.time()))
+
+
+            # OLD --> every new device was a row, every 51 rows the whole table went to the terminal again
+            start = time.perf_counter()
+
+            for first in range(0, size, 51):
+                table = Table(); [table.add_column(column) for column in ("#", "RSSI", "Mac", "Manufacturer", "Local_name", "UUID")]
+                for data in islice(live_map.values(), first, first + 51): table.add_row(f"{first}", f"{data.rssi}", data.addr, data.manuf, data.name, "False")
+                out.print(table); out.file.seek(0); out.file.truncate()
+
+            old = (time.perf_counter() - start) * 1000
+
+
+            # NEW --> one 20 row frame from the whole live map, Terminal_View draws at most --view-fps of these per second
+            view = Terminal_View(rows=20); view.live = Live(view.table([], 0, 0), console=out, auto_refresh=False)
+            sniffer = type("Sniffer", (), {"live_map": live_map, "seen": live_map, "updates": 0})
+
+            with view:
+
+                start = time.perf_counter()
+
+                for frame in range(frames):
+                    sniffer.updates = frame; view.refresh(sniffer); out.file.seek(0); out.file.truncate()
+
+                new = (time.perf_counter() - start) * 1000 / frames
+
+            console.print(f"[bold green][+] {size:>7,} devices:[bold yellow] every row {old:9.1f} ms total | window {new:6.2f} ms/frame")
+
+
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Micro benchmarks for the scanner hot paths")
+    parser.add_argument("bench", choices=["vendor", "pipeline", "motion", "records", "startup", "lookup", "terminal", "fingerprint", "trackers", "shutdown"], help="Which benchmark to run")
+    parser.add_argument("--sizes", default="1000,10000,50000", help="pipeline / terminal: comma separated device populations")
+    parser.add_argument("--seconds", type=int, default=10, help="pipeline: simulated seconds per population")
+    parser.add_argument("--churn", type=float, default=0.01, help="pipeline: fraction of devices replaced per second")
+    parser.add_argument("--budget", type=float, default=300, help="startup: max import ms for main.py --help")
+    parser.add_argument("--scanner-budget", type=float, default=1500, help="startup: max import ms for the scanner modules")
+
+    args = parser.parse_args()
+
+    if args.bench == "startup": sys.exit(0 if Benchmark.startup(budget=args.budget, scanner_budget=args.scanner_budget) else 1)
+    elif args.bench == "pipeline": Benchmark.pipeline(sizes=tuple(int(size) for size in args.sizes.split(",")), seconds=args.seconds, churn=args.churn)
+    elif args.bench == "shutdown": sys.exit(0 if Benchmark.shutdown() else 1)
+    elif args.bench == "terminal": Benchmark.terminal(sizes=tuple(int(size) for size in args.sizes.split(",")))
+    else: getattr(Benchmark, args.bench)()
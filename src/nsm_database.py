@@ -8,13 +8,588 @@ console = Console()
 
 
 # IMPORTS
-import manuf, json, os, threading
+import json, os, sys, threading, mmap, struct, bisect, time
+from collections import OrderedDict
 from pathlib import Path
-from mac_vendor_lookup import MacLookup #vendors = MacLookup().load_vendors()
 
 LOCK = threading.Lock()
 
 
+# NSM IMPORTS
+from nsm_storage import JSONL_Storage, SQLite_Storage
+from nsm_metrics import Metrics
+
+
+# DATABASE BUILD STEP  -->  database/converter.py
+sys.path.append(str(Path(__file__).parent.parent / "database"))
+import converter
+
+
+
+class Lookup_File():
+    """Memory mapped vendor / company tables compiled by database/converter.py"""
+
+
+    path = converter.OUTPUT_LOOKUP
+
+
+
+    def __init__(self, path: Path):
+        """Map the file, only the fixed size header is read"""
+
+
+        header = converter.read_header(path)
+        if not header: raise ValueError(f"{path} is not a lookup file")
+        if sys.byteorder != "little": raise ValueError("lookup file is little endian only")
+
+        self.file = open(path, "rb")
+        self.map  = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.oui_count      = header["oui_count"]
+        self.company_count  = header["company_count"]
+        self.strings_offset = header["strings_offset"]
+        self.strings        = {}
+
+        # SORTED KEY ARRAYS + PARALLEL STRING OFFSETS --> bisect runs in C straight on the mapping
+        view = memoryview(self.map)
+        oui, company = header["oui_offset"], header["company_offset"]
+
+        self.oui_keys      = view[oui: oui + self.oui_count * 8].cast("Q")
+        self.oui_strings   = view[oui + self.oui_count * 8: company].cast("I")
+        self.company_keys  = view[company: company + self.company_count * 4].cast("I")
+        self.company_names = view[company + self.company_count * 4: self.strings_offset].cast("I")
+
+        # LONGEST PREFIX FIRST --> /36 before /28 before /24
+        self.widths = tuple(width for width in range(12, 0, -1) if header["widths"] & (1 << width))
+
+
+    @classmethod
+    def open(cls, verbose=False):
+        """Rebuild when the sources changed, then mmap --> None if that is not possible"""
+
+
+        try:
+
+            if converter.is_stale(cls.path):
+                if verbose: console.print("[bold yellow][*] Lookup file missing or stale, rebuilding...")
+                converter.build_lookup(output=cls.path, verbose=verbose)
+
+            return cls(cls.path)
+
+
+        except Exception as e:
+            console.print(f"[bold red][-] Lookup file unavailable:[bold yellow] {e}")
+            return None
+
+
+    def _string(self, offset: int) -> str:
+        """String table offset --> str, decoded once"""
+
+
+        text = self.strings.get(offset)
+
+        if text is None:
+            start  = self.strings_offset + offset
+            length = struct.unpack_from("<H", self.map, start)[0]
+            text   = self.strings[offset] = self.map[start + 2: start + 2 + length].decode("utf-8")
+
+        return text
+
+
+    def _search(self, keys: memoryview, strings: memoryview, key: int) -> str:
+        """Binary search a sorted key array"""
+
+
+        i = bisect.bisect_left(keys, key)
+
+        if i < len(keys) and keys[i] == key: return self._string(strings[i])
+
+        return False
+
+
+    def vendor(self, mac: str) -> str:
+        """MAC --> Vendor"""
+
+
+        mac = converter.normalize_mac(mac)
+
+        try:
+
+            for width in self.widths:
+
+                if len(mac) < width: continue
+
+                vendor = self._search(self.oui_keys, self.oui_strings, (width << 48) | int(mac[:width], 16))
+                if vendor: return vendor
+
+
+        # NOT A MAC --> macOS hands out uuids
+        except ValueError: pass
+
+        return False
+
+
+    def vendors(self, macs: list) -> list:
+        """[MAC] --> [Vendor] | per batch, widths longer than an OUI only searched under OUIs that have such blocks, the rest once per prefix"""
+
+
+        keys, strings = self.oui_keys, self.oui_strings
+        blocks, searched, found, out = {}, {}, {}, []
+
+        for raw in macs:
+
+            vendor = found.get(raw)
+
+            if vendor is None:
+
+                mac, vendor = converter.normalize_mac(raw), False
+
+                try:
+
+                    oui = int(mac[:6], 16)
+
+                    for width in self.widths:
+
+                        if len(mac) < width: continue
+
+                        # MA-M / MA-S BLOCKS UNDER THIS OUI --> one range check per width and OUI, most OUIs have none
+                        if width > 6:
+
+                            shift = 4 * (width - 6)
+                            block = (width << 48) | (oui << shift)
+                            held  = blocks.get(block)
+
+                            if held is None:
+                                i    = bisect.bisect_left(keys, block)
+                                held = blocks[block] = i < len(keys) and keys[i] < block + (1 << shift)
+
+                            if not held: continue
+
+                            vendor = self._search(keys, strings, (width << 48) | int(mac[:width], 16))
+
+                        # OUI AND SHORTER --> shared by every MAC under it
+                        else:
+
+                            key    = (width << 48) | int(mac[:width], 16)
+                            vendor = searched.get(key)
+                            if vendor is None: vendor = searched[key] = self._search(keys, strings, key)
+
+                        if vendor: break
+
+                except ValueError: vendor = False
+
+                found[raw] = vendor
+
+            out.append(vendor)
+
+        return out
+
+
+    def company(self, company_id: int) -> str:
+        """Bluetooth SIG company id --> Company"""
+
+
+        return self._search(self.company_keys, self.company_names, int(company_id))
+
+
+    def companies(self) -> dict:
+        """Whole company table --> {int id: company}"""
+
+
+        data = {}
+
+        for company_id, string in zip(self.company_keys, self.company_names): data[company_id] = self._string(string)
+
+        return data
+
+
+
+class Vendor_Index():
+    """One merged OUI --> Vendor index shared by the whole process"""
+
+
+    mapped = None
+    index  = None
+    widths = ()
+    lock   = threading.Lock()
+
+    # LOOKUP_CLIENT (nsm_lookup.py) --> batches go to a shared lookup service instead of this process
+    remote = None
+
+
+
+    @classmethod
+    def load(cls, verbose=False) -> dict:
+        """mmap the compiled lookup file once, parse the text files only if that fails"""
+
+
+        if cls.mapped is not None or cls.index is not None: return cls.mapped or cls.index
+
+        with cls.lock:
+
+            if cls.mapped is not None or cls.index is not None: return cls.mapped or cls.index
+
+            cls.mapped = Lookup_File.open(verbose=verbose)
+
+            if cls.mapped:
+                if verbose: console.print(f"[bold green][+] Vendor index mapped:[bold yellow] {cls.mapped.oui_count} prefixes")
+                return cls.mapped
+
+
+            try:
+                index = converter.load_oui()
+
+            except FileNotFoundError as e:
+                console.print(f"[bold red][-] Failed to pull manuf.txt:[bold yellow] {e.filename} not Found!"); exit()
+
+
+            # LONGEST PREFIX FIRST --> /36 before /28 before /24
+            cls.widths = tuple(sorted({len(key) for key in index}, reverse=True))
+            cls.index  = index
+
+            if verbose: console.print(f"[bold green][+] Vendor index loaded:[bold yellow] {len(index)} prefixes")
+
+        return cls.index
+
+
+    @classmethod
+    def lookup(cls, mac: str, remote: bool = True) -> str:
+        """MAC --> Vendor | mmap binary search or constant number of dict hits, through the lookup service when one is configured"""
+
+
+        if remote and cls.remote: return cls.remote.vendors([mac])[0]
+
+        if cls.mapped is None and cls.index is None: cls.load()
+        if cls.mapped: return cls.mapped.vendor(mac)
+
+        mac = converter.normalize_mac(mac)
+
+        for width in cls.widths:
+
+            vendor = cls.index.get(mac[:width])
+            if vendor: return vendor
+
+        return False
+
+
+    @classmethod
+    def lookup_many(cls, macs: list, remote: bool = True) -> list:
+        """[MAC] --> [Vendor] in one call, through the lookup service when one is configured"""
+
+
+        if remote and cls.remote: return cls.remote.vendors(macs)
+
+        if cls.mapped is None and cls.index is None: cls.load()
+
+        # MAPPED --> same prefixes searched once per batch
+        if cls.mapped: return cls.mapped.vendors(macs)
+
+        lookup = cls.lookup
+        found  = {}
+
+        # SAME MAC TWICE IN A BATCH --> one lookup, the dict path is a few hits per MAC anyway
+        return [found[mac] if mac in found else found.setdefault(mac, lookup(mac, remote=False)) for mac in macs]
+
+
+
+class Enrichment_Cache():
+    """Bounded LRU / TTL cache of (MAC, manufacturer data) --> (manuf, vendor)"""
+
+
+    size    = 4096
+    ttl     = 300
+    cache   = OrderedDict()
+    hits    = 0
+    misses  = 0
+
+    # FILLED BY prefetch() --> still counted as a miss the first time resolve() reads them
+    pending = set()
+
+
+
+    @classmethod
+    def configure(cls, size: int = 4096, ttl: float = 300) -> None:
+        """Set the limits and start empty"""
+
+        cls.size = max(1, int(size)); cls.ttl = ttl
+        cls.cache = OrderedDict(); cls.hits = 0; cls.misses = 0; cls.pending = set()
+
+
+    @staticmethod
+    def _key(mac: str, manufacturer_data: dict) -> tuple:
+        return (mac, tuple(sorted(manufacturer_data.items()))) if manufacturer_data else (mac, ())
+
+
+    @classmethod
+    def missing(cls, items: list) -> dict:
+        """[(MAC, manufacturer data)] --> {cache key: (MAC, manufacturer data)} for everything not cached yet"""
+
+
+        now    = time.monotonic()
+        misses = {}
+
+        for mac, manufacturer_data in items:
+
+            key   = cls._key(mac, manufacturer_data)
+            entry = cls.cache.get(key)
+
+            if (entry is None or now >= entry[2]) and key not in misses: misses[key] = (mac, manufacturer_data)
+
+        return misses
+
+
+    @classmethod
+    def store(cls, misses: dict, results: list) -> None:
+        """missing() + their [(manuf, vendor)] --> cached, read as misses by the next resolve()"""
+
+
+        now = time.monotonic()
+
+        for key, (manuf, vendor) in zip(misses, results):
+            cls.cache[key] = (manuf, vendor, now + cls.ttl); cls.cache.move_to_end(key)
+
+        cls.pending = set(misses)
+
+        while len(cls.cache) > cls.size: cls.cache.popitem(last=False)
+
+
+    @staticmethod
+    @Metrics.timed("enrich")
+    def enrich(items: list) -> list:
+        """[(MAC, manufacturer data)] --> [(manuf, vendor)], one batch vendor lookup"""
+
+
+        vendors = Vendor_Index.lookup_many([mac for mac, _ in items])
+
+        return [(DataBase._get_manufacturers(manufacturer_hex=manufacturer_data, verbose=False), vendor) for (_, manufacturer_data), vendor in zip(items, vendors)]
+
+
+    @classmethod
+    def prefetch(cls, items: list) -> int:
+        """[(MAC, manufacturer data)] --> every miss resolved with one batch vendor lookup | returns how many"""
+
+
+        misses = cls.missing(items)
+        if misses: cls.store(misses, cls.enrich(list(misses.values())))
+
+        return len(misses)
+
+
+    @classmethod
+    def resolve(cls, mac: str, manufacturer_data: dict) -> tuple:
+        """--> (manuf, vendor, hit) | lookups only run on a miss"""
+
+
+        key = cls._key(mac, manufacturer_data)
+        now = time.monotonic()
+
+        entry = cls.cache.get(key)
+
+        if entry and now < entry[2]:
+
+            cls.cache.move_to_end(key)
+
+            if cls.pending and key in cls.pending:
+                cls.pending.discard(key); cls.misses += 1
+                return entry[0], entry[1], False
+
+            cls.hits += 1
+
+            return entry[0], entry[1], True
+
+
+        cls.misses += 1
+
+        manuf  = DataBase._get_manufacturers(manufacturer_hex=manufacturer_data, verbose=False)
+        vendor = DataBase._get_vendor_main(mac=mac, verbose=False)
+
+        cls.cache[key] = (manuf, vendor, now + cls.ttl); cls.cache.move_to_end(key)
+
+        # OLDEST FIRST --> memory stays flat no matter how long the drive is
+        while len(cls.cache) > cls.size: cls.cache.popitem(last=False)
+
+        return manuf, vendor, False
+
+
+    @classmethod
+    def stats(cls) -> dict:
+        """Hit / miss counters"""
+
+        total = cls.hits + cls.misses
+
+        return {"size": len(cls.cache), "limit": cls.size, "hits": cls.hits, "misses": cls.misses, "hit_ratio": round(cls.hits / total, 3) if total else 0.0}
+
+
+
+class Sig_Decoder():
+    """Bluetooth SIG tables compiled by database/converter.py --> service names, appearance and service data values"""
+
+
+    services        = None
+    characteristics = {}
+    appearances     = {}
+    formats         = {}
+    lock            = threading.Lock()
+
+    # PER UUID TUPLE --> the scanner hands in interned tuples, so this stays a few hundred entries
+    resolved        = {}
+    limit           = 4096
+
+    base            = "-0000-1000-8000-00805f9b34fb"
+
+    # BATTERY SERVICE DATA CARRIES THE BATTERY LEVEL CHARACTERISTIC
+    aliases         = {"180f": "2a19"}
+
+
+
+    @classmethod
+    def load(cls, verbose=False) -> bool:
+        """Compiled index once per process, rebuilt from the yaml when stale"""
+
+
+        if cls.services is not None: return bool(cls.services)
+
+        with cls.lock:
+
+            if cls.services is not None: return bool(cls.services)
+
+            try: index = converter.load_sig(verbose=verbose)
+            except Exception as e: index = None; console.print(f"[bold red][-] SIG index unavailable:[bold yellow] {e}")
+
+            index = index or {}
+
+            cls.characteristics = index.get("characteristics", {})
+            cls.appearances     = {int(value): name for value, name in index.get("appearance", {}).items()}
+            cls.formats         = index.get("formats", {})
+            cls.services        = index.get("services", {})
+
+            if verbose and cls.services: console.print(f"[bold green][+] SIG index loaded:[bold yellow] {len(cls.services)} services, {len(cls.formats)} payload formats")
+
+        return bool(cls.services)
+
+
+    @classmethod
+    def short(cls, uuid: str) -> str:
+        """128 bit SIG base uuid --> 4 hex digits, anything else lower cased"""
+
+
+        uuid = uuid.lower()
+
+        if len(uuid) == 36 and uuid.startswith("0000") and uuid.endswith(cls.base): return uuid[4:8]
+        if uuid.startswith("0x"): return uuid[2:].zfill(4)
+
+        return uuid
+
+
+    @classmethod
+    def name(cls, uuid: str) -> str:
+        """Service / member / characteristic uuid --> SIG name"""
+
+
+        if cls.services is None: cls.load()
+
+        uuid = cls.short(uuid)
+
+        return cls.services.get(uuid) or cls.characteristics.get(uuid) or False
+
+
+    @classmethod
+    def names(cls, uuids: tuple) -> tuple:
+        """Advertised service uuids --> names of the ones the SIG knows, cached per tuple"""
+
+
+        names = cls.resolved.get(uuids)
+        if names is not None: return names
+
+        names = tuple(name for name in map(cls.name, uuids) if name) if uuids else ()
+
+        if len(cls.resolved) < cls.limit: cls.resolved[uuids] = names
+
+        return names
+
+
+    @classmethod
+    def appearance(cls, value) -> str:
+        """16 bit appearance --> "Category: Subcategory", unknown subcategories fall back to the category"""
+
+
+        if value is None: return False
+        if cls.services is None: cls.load()
+
+        return cls.appearances.get(value) or cls.appearances.get(value & ~0x3F) or False
+
+
+    @classmethod
+    def payload(cls, uuid: str, data: bytes) -> dict:
+        """Service data for a characteristic made of plain integer fields --> {field: value}, None if there is no format"""
+
+
+        rows = cls.formats.get(cls.aliases.get(uuid, uuid))
+        if not rows: return None
+
+        values = {}
+        offset = 0
+
+        for field, size, signed, scale, decimals, unknown in rows:
+
+            if offset + size > len(data): break
+
+            raw     = int.from_bytes(data[offset: offset + size], "little")
+            offset += size
+
+            if raw == unknown: values[field] = None; continue
+            if signed and raw >= 1 << (size * 8 - 1): raw -= 1 << (size * 8)
+
+            values[field] = round(raw * scale, decimals) if scale != 1 else raw
+
+        return values or None
+
+
+    @classmethod
+    def service_data(cls, service_data: dict) -> dict:
+        """{uuid: bytes} --> decoded fields where a format exists, otherwise {service name: hex}"""
+
+
+        if not service_data: return None
+        if cls.services is None: cls.load()
+
+        decoded = {}
+
+        for uuid, data in service_data.items():
+
+            short  = cls.short(uuid)
+            values = cls.payload(short, data)
+
+            if values: decoded.update(values)
+            else:      decoded[cls.services.get(short) or cls.characteristics.get(short) or short] = bytes(data).hex()
+
+        return decoded
+
+
+    @classmethod
+    def decode(cls, record, adv, payload_only: bool = False) -> None:
+        """One advertisement --> record.services / appearance / service_data, unchanged values cost a dict hit"""
+
+
+        if cls.services is None: cls.load()
+
+        if not payload_only:
+
+            record.services = cls.names(record.uuid) if record.uuid else ()
+
+            # BLEAK HAS NO APPEARANCE FIELD --> BlueZ exposes it in the device properties
+            appearance = getattr(adv, "appearance", None)
+
+            if appearance is None:
+                platform   = getattr(adv, "platform_data", None)
+                appearance = platform[1].get("Appearance") if platform and len(platform) > 1 and isinstance(platform[1], dict) else None
+
+            record.appearance = cls.appearance(appearance)
+
+        if adv.service_data: record.service_data = cls.service_data(adv.service_data)
+
+
+
 class DataBase():
     """This will be a database for service uuids"""
 
@@ -22,6 +597,14 @@ class DataBase():
     database = Path(__file__).parent.parent / "database" / "bluetooth_sig" / "assigned_numbers" / "company_identifiers"
     company_ids_path = database / "company_ids.json"
 
+    companies     = None
+    etcs          = None
+    storage       = None
+    company_lock  = threading.Lock()
+
+    # LOOKUP SERVICE ANSWERS --> only the company ids this process has heard, the table stays in the service
+    remote_companies = {}
+
 
 
     @staticmethod
@@ -154,228 +737,179 @@ class DataBase():
         """this will take given services and parse them through known database"""
 
 
-        pass
+        return Sig_Decoder.name(uuid)
     
 
     @classmethod
     def _get_uuids_main(cls, CONSOLE: str, uuid:any, verbose=False) -> any:
-        """Are uuids vulnerable and or mapable"""
+        """Are uuids vulnerable and or mapable --> curated service first, then the SIG tables"""
 
 
+        services = {service["uuid"]: service for service in DataBase._services()}
+        uuids    = [uuid] if isinstance(uuid, str) else list(uuid or [])
 
-        services = DataBase._services()
 
+        for id in uuids:
 
-        if len(uuid) > 1:
+            short   = Sig_Decoder.short(id)
+            service = services.get(short)
 
-            for service in services:
-                for id in uuid:
+            if not service:
+                name    = Sig_Decoder.name(short)
+                service = {"name": name, "uuid": short} if name else None
 
-                    if id == service: 
+            if service:
 
-                        if verbose: CONSOLE.print(f"[bold green][+] Mapped service:[bold yellow] uuid <--> {service} ")
+                if verbose: CONSOLE.print(f"[bold green][+] Mapped service:[bold yellow] {id} <--> {service['name']} ")
 
-                        return service           
+                return service
 
-            return False
-        
 
-        else:
-            
-            for service in service:
+        return False
 
-                if uuid == service: 
-                    if verbose: CONSOLE.print(f"[bold green][+] Mapped service:[bold yellow] uuid <--> {service} ")
 
-                    return service        
 
-            return False
+    @classmethod
+    def _company_ids(cls) -> dict:
+        """Company table keyed by int id, loaded once on first use"""
 
 
+        if cls.companies is not None: return cls.companies
 
-    @classmethod
-    def _get_etc(cls, data: any, verbose=False) -> str:
-        """etc --> model"""
+        with cls.company_lock:
+
+            if cls.companies is not None: return cls.companies
 
-        mapping = DataBase._etcs()
+            Vendor_Index.load()
 
-        for key, value in mapping.items():
+            if Vendor_Index.mapped: companies = Vendor_Index.mapped.companies()
+            else:
+                companies = {int(key): value["company"] for key, value in DataBase._importer(file_path=cls.company_ids_path, verbose=False).items()}
 
-            if data == key:
+            cls.companies = companies
 
-                if verbose: console.print(f"[+] Found: {key} --> {value}")
+        return cls.companies
 
-                return value
-            
 
     @classmethod
-    def _get_manufacturers(cls, manufacturer_hex, verbose=True) -> str:
-        """Manufacturer ID --> Manufacturer / Vendor"""
+    def _remote_companies(cls, company_ids) -> dict:
+        """Manufacturer ids --> the ones not asked yet go to the lookup service in one round trip | returns every answer so far"""
 
- 
-        if not manufacturer_hex: return "N/A"
 
+        known   = cls.remote_companies
+        missing = list({int(company_id) for company_id in company_ids} - known.keys())
 
-        data = {}
-        for key, value in manufacturer_hex.items():
-            id = key; data = DataBase._get_etc(data=value.hex()) or value.hex()
-            
+        if missing: known.update(zip(missing, Vendor_Index.remote.companies(missing)))
 
-        company_ids = DataBase._importer(file_path=cls.company_ids_path, verbose=False)
+        return known
 
 
-        for key, value in company_ids.items():
+    @classmethod
+    def _get_companies(cls, company_ids: list, remote: bool = True) -> list:
+        """[manufacturer id] --> [Company] in one call, through the lookup service when one is configured"""
 
-            if int(key) == int(id):
 
-                manufacturer = value["company"]
+        if cls.companies is not None:        companies = cls.companies
+        elif remote and Vendor_Index.remote: companies = cls._remote_companies(company_ids)
+        else:                                companies = DataBase._company_ids()
 
-                if verbose: console.print(f"[bold green][+] {id} --> {manufacturer}")
-                
-                if data: return f"{manufacturer} | {data}"
-                return manufacturer
-        
-        return False
+        return [companies.get(int(company_id), False) for company_id in company_ids]
 
 
+    @classmethod
+    def _get_etc(cls, data: any, verbose=False) -> str:
+        """etc --> model"""
 
-        pass
+        if cls.etcs is None: cls.etcs = DataBase._etcs()
 
+        value = cls.etcs.get(data)
 
-    @classmethod
-    def _get_vendor(cls, mac: str, verbose=True) -> str:
-        """MAC --> Vendor | lookup"""
-        
-        try:
+        if value and verbose: console.print(f"[+] Found: {data} --> {value}")
 
-            manuf_path = str(Path(__file__).parent.parent / "database" / "manuf_old.txt")
+        return value
 
-            vendor = manuf.MacParser(manuf_path).get_manuf_long(mac=mac)
-            
-            if verbose:
-                console.print(f"Manuf.txt pulled -> {manuf_path}")            
-                console.print(f"[bold green][+] Vendor Lookup:[/bold green] {vendor} -> {mac}")
-            
 
-            return vendor
-                
-        
+    @classmethod
+    @Metrics.timed("manufacturers")
+    def _get_manufacturers(cls, manufacturer_hex, verbose=True) -> str:
+        """Manufacturer ID --> Manufacturer / Vendor"""
 
-        except FileNotFoundError:
-            console.print(f"[bold red][-] Failed to pull manuf.txt:[bold yellow] File not Found!"); exit()
-      
-        
-        except Exception as e:
-            console.print(f"[bold red][-]Exception Error:[bold yellow] {e}"); exit()
-    
+ 
+        if not manufacturer_hex: return "N/A"
 
-    @staticmethod
-    def _get_vendor_new(mac: str, verbose=True) -> str:
-        """MAC Prefixes --> Vendor"""
-        
 
-        try:
+        if cls.companies is not None: company_ids = cls.companies
+        elif Vendor_Index.remote:     company_ids = cls._remote_companies(manufacturer_hex)
+        else:                         company_ids = DataBase._company_ids()
 
-            manuf_path = str(Path(__file__).parent.parent / "database" / "manuf_ring_mast4r.txt")
+        found = []
 
-            mac_prefix = mac.split(':'); prefix = mac_prefix[0] + mac_prefix[1] + mac_prefix[2]
 
+        # ONE ADVERTISEMENT CAN CARRY SEVERAL COMPANY IDS --> keep every one of them
+        for id, value in manufacturer_hex.items():
 
-            with open(manuf_path, "r") as file:
+            manufacturer = company_ids.get(int(id))
+            if not manufacturer: continue
 
-                for line in file:
-                    parts = line.strip().split('\t')
-                    
-                    if parts[0] == prefix:
+            data = value.hex()
+            data = DataBase._get_etc(data=data) or data
 
-                        vendor = parts[1]
+            if verbose: console.print(f"[bold green][+] {id} --> {manufacturer}")
 
-                        if verbose: console.print(f"[bold green][+] {parts[0]} --> {vendor}" )
-                        
-                        return vendor
+            found.append(f"{manufacturer} | {data}" if data else manufacturer)
 
 
-        except FileNotFoundError:
-            console.print(f"[bold red][-] Failed to pull manuf.txt:[bold yellow] File not Found!"); exit()
-      
+        return ", ".join(found) if found else False
 
-        except Exception as e:
-            console.print(f"[bold red][-] Exception Error:[bold yellow] {e}")
-    
 
     @staticmethod
+    @Metrics.timed("vendor")
     def _get_vendor_main(mac: str, verbose=False) -> str:
         """This will use ringmast4r and wireshark vendor database"""
 
 
-        vendor = DataBase._get_vendor(mac=mac, verbose=verbose) or False; c = 1
+        vendor = Vendor_Index.lookup(mac=mac)
 
-        if not vendor: vendor = DataBase._get_vendor_new(mac=mac, verbose=verbose) or False; c = 2 
+        if verbose: console.print(f"[bold green][+] Vendor Lookup:[/bold green] {vendor} -> {mac}")
 
         return vendor
      
     
 
     @classmethod
-    def push_results(cls, devices:any, verbose=True) -> None:
-        """This will save ble wardriving results"""
-        
+    def open_storage(cls, backend: str = "jsonl", verbose=True, reader=False, path=None):
+        """jsonl | sqlite --> persistence backend used by push_results | reader --> another process writes, sqlite stays queryable here | path --> None for the database folder"""
 
-        with LOCK:
 
-            data  = {}
-            num = 0
-            macs = []
-            
-            if False:
-                try:
-                    NAME = "bluehound"
-                    USER_HOME = Path(os.getenv("SUDO_USER") and f"/home/{os.getenv('SUDO_USER')}") or Path.home()
-                    BASE_DIR = USER_HOME / "Documents" / "nsm_tools" / f"{NAME}" / "gui"
+        if backend == "sqlite": cls.storage = SQLite_Storage(path=path, verbose=verbose, reader=reader)
+        elif reader:            cls.storage = None
+        else:                   cls.storage = JSONL_Storage(path=path, verbose=verbose)
 
-                except Exception as e:
-                    BASE_DIR = Path.home() / "Documents" / "nsm_tools" / f"{NAME}" / "gui"
-                
-                BASE_DIR.mkdir(exist_ok=True, parents=True)
+        return cls.storage
 
-            path = Path(__file__).parent.parent / "database" 
-            #console.print(path)
 
-            try:
-
-                drive = path / "database.json"
-    
-    
-                if drive.exists():
-
-                    with open(drive, "r") as file: data = json.load(file)
-
-                    for _, value in data.items(): macs.append(value["addr"]); num+=1
+    @classmethod
+    @Metrics.timed("push_results")
+    def push_results(cls, devices:any, sightings:any = None, verbose=True) -> None:
+        """This will save ble wardriving results"""
+        
 
-                for _, device in devices.items(): 
+        try:
 
-                    if device["addr"] not in macs:
+            if cls.storage is None: DataBase.open_storage(verbose=verbose)
 
-                        num += 1; macs.append(device["addr"]); data[num] = device
-            
+            written = cls.storage.push(devices=devices, sightings=sightings)
 
-                with open(drive, "w") as file: json.dump(data, file, indent=4)
-                if verbose: console.print("[bold green][+] Wardrive pushed!")
-                #console.print(data)
-            
-            except json.JSONDecodeError as e:
-                console.print(f"[bold red][!] JSON Error:[bold yellow] {e}")
-                with open(drive, "w") as file: json.dump(data, file, indent=4)
-                console.print("[bold green][+] json file created!")
+            if verbose: console.print(f"[bold green][+] Wardrive pushed!:[bold yellow] {written} new / changed")
 
-                          
-            except Exception as e:
-                console.print(f"[bold red][!] Exception Error:[bold yellow] {e}")
+                      
+        except Exception as e:
+            Metrics.errors("push_results").inc()
+            console.print(f"[bold red][!] Exception Error:[bold yellow] {e}")
 
 
 
 if __name__ == "__main__":
-    ass = {}
-    DataBase.push_results(data=ass)
-    DataBase._new_get_vendor(mac="")
+    Vendor_Index.load(verbose=True)
+    DataBase._get_vendor_main(mac="00:00:0C:12:34:56", verbose=True)
   #  DataBase._get_manufacturers(manufacturer_hex=2000, verbose=True)
\ No newline at end of file
@@ -0,0 +1,165 @@
+# THIS MODULE WILL HOLD THE COMPACT PER DEVICE RECORD SHARED BY THE SCANNER, STORAGE AND WEB SERVER
+
+
+
+# ETC IMPORTS
+import json
+
+
+
+
+def _extra(name: str) -> property:
+    """Rarely set field --> lives in record.extras, reads None while unset | the dict is replaced, never changed, so war_drive copies can share it"""
+
+
+    def get(self):
+        extras = self.extras
+        return extras.get(name) if extras else None
+
+    def set(self, value):
+
+        extras = self.extras
+
+        if extras is None:
+            if value is None or value is False: return
+            self.extras = {name: value}
+
+        elif extras.get(name) is not value: self.extras = {**extras, name: value}
+
+    return property(get, set)
+
+
+
+class Device():
+    """One record per MAC, updated in place --> same JSON shape as the old 7 key dict"""
+
+
+    # MOST DEVICES SET THESE --> one slot each, the rarely set fields share one optional dict
+    __slots__ = ("addr", "rssi", "manuf", "vendor", "name", "uuid", "up_time", "rssi_filtered", "is_moving", "services", "cluster", "extras")
+
+    adapters     = _extra("adapters")
+    appearance   = _extra("appearance")
+    service_data = _extra("service_data")
+
+
+    # SHARED BY EVERY RECORD --> thousands of Apple devices point at one "Apple, Inc." string
+    strings = {}
+    encoded = {}
+    limit   = 65_536
+
+
+
+    def __init__(self, addr: str, rssi: int, manuf, vendor, name, uuid, up_time: float):
+        """uuid may be any iterable of strings or False"""
+
+
+        self.addr          = addr
+        self.rssi_filtered = None
+        self.is_moving     = None
+        self.services      = None
+        self.cluster       = None
+        self.extras        = None
+
+        self.update(rssi=rssi, manuf=manuf, vendor=vendor, name=name, uuid=uuid, up_time=up_time)
+
+
+    def update(self, rssi: int, manuf, vendor, name, uuid, up_time: float) -> None:
+        """New advertisement from a known MAC --> overwrite the fields, no new object"""
+
+
+        intern = Device.intern
+
+        self.rssi    = rssi
+        self.manuf   = manuf
+        self.vendor  = intern(vendor)
+        self.name    = intern(name)
+        self.uuid    = intern(tuple(uuid)) if uuid else False
+        self.up_time = up_time
+
+
+    @classmethod
+    def intern(cls, value):
+        """Repeated vendor / name / uuid values --> one shared object, table capped at `limit`"""
+
+
+        if not value: return value
+
+        shared = cls.strings.get(value)
+        if shared is not None: return shared
+
+        if len(cls.strings) < cls.limit: cls.strings[value] = value
+
+        return value
+
+
+    @classmethod
+    def _json(cls, value) -> str:
+        """JSON fragment of a shared value, encoded once"""
+
+
+        fragment = cls.encoded.get(value)
+
+        if fragment is None:
+
+            fragment = json.dumps(value, separators=(",", ":"))
+            if len(cls.encoded) < cls.limit: cls.encoded[value] = fragment
+
+        return fragment
+
+
+    def copy(self) -> "Device":
+        """Frozen copy for war_drive --> storage relies on those never changing"""
+
+
+        other = Device.__new__(Device)
+
+        for slot in Device.__slots__: setattr(other, slot, getattr(self, slot))
+
+        # ADAPTERS IS THE ONE VALUE CHANGED IN PLACE --> the copy gets its own, the rest of extras is shared
+        if self.adapters: other.extras = {**self.extras, "adapters": dict(self.adapters)}
+
+        return other
+
+
+    def to_dict(self) -> dict:
+        """Plain dict in the old shape, optional fields only when set"""
+
+
+        data = {"rssi": self.rssi, "addr": self.addr, "manuf": self.manuf, "vendor": self.vendor, "name": self.name, "uuid": list(self.uuid) if self.uuid else False, "up_time": self.up_time}
+
+        if self.adapters is not None:  data["adapters"]      = self.adapters
+        if self.is_moving is not None: data["rssi_filtered"] = self.rssi_filtered; data["is_moving"] = self.is_moving
+        if self.services:              data["services"]      = list(self.services)
+        if self.appearance:            data["appearance"]    = self.appearance
+        if self.service_data:          data["service_data"]  = self.service_data
+        if self.cluster is not None:   data["cluster"]       = self.cluster
+
+        return data
+
+
+    def to_json(self) -> str:
+        """Hand rolled encoder --> shared fragments are cached, only rssi / up_time / manuf are formatted per call"""
+
+
+        encode = Device._json
+
+        body = (
+            f'{{"rssi":{self.rssi if self.rssi is not None else "null"},"addr":"{self.addr}","manuf":{json.dumps(self.manuf)},'
+            f'"vendor":{encode(self.vendor)},"name":{encode(self.name)},"uuid":{encode(self.uuid) if self.uuid else "false"},"up_time":{self.up_time:.3f}'
+        )
+
+        if self.adapters is not None:  body += f',"adapters":{json.dumps(self.adapters, separators=(",", ":"))}'
+        if self.is_moving is not None: body += f',"rssi_filtered":{self.rssi_filtered:.1f},"is_moving":{"true" if self.is_moving else "false"}'
+        if self.services:              body += f',"services":{encode(self.services)}'
+        if self.appearance:            body += f',"appearance":{encode(self.appearance)}'
+        if self.service_data:          body += f',"service_data":{json.dumps(self.service_data, separators=(",", ":"))}'
+        if self.cluster is not None:   body += f',"cluster":{self.cluster}'
+
+        return body + "}"
+
+
+    @staticmethod
+    def encode_map(records: dict) -> str:
+        """{key: Device} --> JSON object text, keys are MACs or war_drive numbers"""
+
+        return "{" + ",".join([f'"{key}":{record.to_json()}' for key, record in records.items()]) + "}"
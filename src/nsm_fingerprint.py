@@ -0,0 +1,288 @@
+# THIS MODULE WILL GROUP ROTATING RANDOM ADDRESSES INTO PHYSICAL DEVICES  -->  payload shape signature + LSH buckets + RSSI handover
+
+
+
+# ETC IMPORTS
+import random, time, zlib
+from collections import OrderedDict
+
+
+# NSM IMPORTS
+from nsm_database import DataBase, Sig_Decoder
+
+
+
+
+class Cluster():
+    """One estimated physical device --> the MAC it uses now and how many it rotated through"""
+
+
+    __slots__ = ("id", "mac", "macs", "keys", "rssi", "last_seen", "switched")
+
+
+    def __init__(self, id: int, mac: str, keys: tuple, rssi: int, seen: float):
+
+        self.id, self.mac, self.keys, self.rssi = id, mac, keys, rssi
+        self.macs      = 1
+        self.last_seen = seen
+        self.switched  = seen
+
+
+
+class Fingerprint_Engine():
+    """New MAC --> MinHash band keys over its payload shape --> linked to a same shape cluster that went quiet just before it appeared, at a close RSSI"""
+
+
+    APPLE = 76
+
+    # MINHASH --> (a * x + b) mod a Mersenne prime, one (a, b) per row of every band
+    PRIME = (1 << 61) - 1
+
+
+
+    def __init__(self, bands: int = 4, rows: int = 2, handover: float = 10, overlap: float = 0.5, settle: float = 3, max_delta: int = 10, probe: int = 8, ttl: float = 60, seed: int = 7):
+        """handover --> max silence between the old and the new address | settle --> a new MAC waits this long before it is linked, so the old one has had time to go quiet
+        | probe --> quiet clusters compared per bucket | ttl --> clusters unheard this long are dropped"""
+
+
+        self.bands     = bands
+        self.rows      = rows
+        self.handover  = handover
+        self.overlap   = overlap
+        self.settle    = settle
+        self.max_delta = max_delta
+        self.probe     = probe
+        self.ttl       = ttl
+
+        rng = random.Random(seed)
+        self.coefficients = [(rng.randrange(1, self.PRIME), rng.randrange(self.PRIME)) for _ in range(bands * rows)]
+
+        # CONTINUITY PREFIXES THE DATABASE ALREADY NAMES --> one more shape token each
+        self.known    = tuple(DataBase._etcs())
+
+        self.clusters = OrderedDict()
+        self.macs     = {}
+        self.buckets  = {}
+        self.pending  = {}
+        self.next_id  = 0
+
+        self.created   = 0
+        self.linked    = 0
+        self.splits    = 0
+        self.update_ms = 0.0
+
+
+    def features(self, adv) -> set:
+        """Advertisement --> tokens that survive an address rotation (no MACs, no payload bytes that change per rotation)"""
+
+
+        tokens = set()
+
+        for company, payload in (adv.manufacturer_data or {}).items():
+
+            tokens.add(f"m{company}")
+            if not payload: continue
+
+            # APPLE CONTINUITY --> type / length of every TLV message, e.g. 10:05 Nearby, 12:02 Find My
+            if company == self.APPLE:
+
+                data = payload.hex()
+                for prefix in self.known:
+                    if data.startswith(prefix): tokens.add(f"k{prefix}")
+
+                i = 0
+                while i + 1 < len(payload): tokens.add(f"a{payload[i]:02x}:{payload[i + 1]}"); i += 2 + payload[i + 1]
+
+            else: tokens.add(f"m{company}:{len(payload)}:{payload[0]:02x}")
+
+
+        for uuid in adv.service_uuids or (): tokens.add(f"s{Sig_Decoder.short(uuid)}")
+        for uuid in adv.service_data or {}:  tokens.add(f"d{Sig_Decoder.short(uuid)}")
+
+        if adv.local_name: tokens.add(f"n{adv.local_name}")
+
+        appearance = getattr(adv, "appearance", None)
+        if appearance: tokens.add(f"p{appearance}")
+
+        return tokens
+
+
+    def keys(self, tokens: set) -> tuple:
+        """Tokens --> one LSH key per band, similar token sets share at least one band with high probability"""
+
+
+        hashes = [zlib.crc32(token.encode()) for token in tokens]
+        mins   = [min((a * x + b) % self.PRIME for x in hashes) for a, b in self.coefficients]
+
+        return tuple(hash((band, *mins[band * self.rows:(band + 1) * self.rows])) for band in range(self.bands))
+
+
+    def _new(self, mac: str, keys: tuple, rssi: int, seen: float) -> Cluster:
+
+        cluster = Cluster(self.next_id, mac, keys, rssi, seen)
+        self.next_id += 1; self.created += 1
+        self.clusters[cluster.id] = cluster
+
+        return cluster
+
+
+    def _link(self, mac: str, adv, first: float, rssi: int) -> Cluster:
+        """New MAC --> best quiet cluster from its buckets, or a new cluster | O(bands * probe), whatever the number of known devices"""
+
+
+        tokens = self.features(adv)
+        if not tokens: return self._new(mac, (), rssi, first)
+
+        keys  = self.keys(tokens)
+        best  = None
+        score = None
+
+        for key in keys:
+
+            bucket = self.buckets.get(key)
+            if not bucket: continue
+
+            # LEAST RECENTLY HEARD FIRST --> anything quiet longer than a handover leaves the bucket until it is heard again
+            while bucket and next(iter(bucket.values())).last_seen < first - self.handover: bucket.popitem(last=False)
+
+            for probed, cluster in enumerate(bucket.values()):
+
+                # STILL HEARD AFTER THIS MAC SHOWED UP --> a different device, and so is everything behind it
+                if probed >= self.probe or cluster.last_seen > first + self.overlap: break
+
+                delta = abs(cluster.rssi - rssi)
+                if delta > self.max_delta: continue
+
+                rank = (sum(k in cluster.keys for k in keys), -delta, cluster.last_seen)
+                if score is None or rank > score: best, score = cluster, rank
+
+
+        if best is None: return self._new(mac, keys, rssi, first)
+
+        self._rekey(best, keys)
+        best.mac = mac; best.macs += 1; best.switched = first
+        self.linked += 1
+
+        return best
+
+
+    def _rekey(self, cluster: Cluster, keys: tuple) -> None:
+        """Cluster moved to a MAC with a different shape --> out of the buckets it no longer matches"""
+
+
+        for key in cluster.keys:
+            if key in keys: continue
+
+            bucket = self.buckets.get(key)
+            if bucket is not None: bucket.pop(cluster.id, None)
+
+        cluster.keys = keys
+
+
+    def _heard(self, cluster: Cluster, seen: float, rssi: int) -> None:
+        """Cluster heard --> to the back of the expiry order and of every bucket it is in"""
+
+
+        cluster.last_seen = max(cluster.last_seen, seen); cluster.rssi = rssi
+        self.clusters.move_to_end(cluster.id)
+
+        for key in cluster.keys:
+
+            bucket = self.buckets.get(key)
+            if bucket is None: bucket = self.buckets[key] = OrderedDict()
+
+            bucket[cluster.id] = cluster; bucket.move_to_end(cluster.id)
+
+
+    def _expire(self, now: float) -> None:
+        """Clusters unheard for ttl --> dropped from the expiry order and their buckets, O(expired)"""
+
+
+        clusters, buckets = self.clusters, self.buckets
+
+        while clusters and next(iter(clusters.values())).last_seen < now - self.ttl:
+
+            _, cluster = clusters.popitem(last=False)
+
+            for key in cluster.keys:
+
+                bucket = buckets.get(key)
+                if bucket is None: continue
+
+                bucket.pop(cluster.id, None)
+                if not bucket: del buckets[key]
+
+
+    def release(self, macs) -> None:
+        """Evicted from the live map --> forget the MAC, its cluster lives on until ttl"""
+
+
+        for mac in macs: self.pending.pop(mac, None); self.macs.pop(mac, None)
+
+
+    def update(self, records: dict, now: float = None) -> int:
+        """Every MAC heard since the last call --> cluster refreshed or, once settled, linked | writes record.cluster"""
+
+
+        if not self.pending: return 0
+
+        start   = time.perf_counter()
+        now     = now or time.time()
+        pending = self.pending; self.pending = {}
+        fresh   = []
+
+
+        # KNOWN MACS FIRST --> a device still advertising is never taken for one that went quiet
+        for mac, (adv, first) in pending.items():
+
+            record  = records.get(mac)
+            if record is None: continue
+
+            cluster = self.macs.get(mac)
+
+            if cluster is None or self.clusters.get(cluster.id) is not cluster: fresh.append((mac, adv, first, record)); continue
+
+            if cluster.mac != mac:
+
+                # A ROTATED ADDRESS NEVER COMES BACK --> the old one talking after the overlap means the link was wrong, the newer MAC gets its own cluster
+                if record.up_time > cluster.switched + self.overlap:
+
+                    other = self._new(cluster.mac, cluster.keys, cluster.rssi, cluster.last_seen)
+                    self.macs[cluster.mac] = other; self._heard(other, other.last_seen, other.rssi)
+                    cluster.mac = mac; cluster.macs -= 1; self.splits += 1
+
+                else: record.cluster = cluster.id; continue
+
+            self._heard(cluster, record.up_time or now, record.rssi)
+            record.cluster = cluster.id
+
+
+        for mac, adv, first, record in fresh:
+
+            # TOO NEW TO TELL --> the address it replaced may not have gone quiet yet
+            if now - first < self.settle: self.pending[mac] = (adv, first); continue
+
+            cluster = self.macs[mac] = self._link(mac, adv, first, record.rssi)
+            self._heard(cluster, record.up_time or now, record.rssi)
+            record.cluster = cluster.id
+
+
+        self._expire(now)
+
+        self.update_ms = (time.perf_counter() - start) * 1000
+        return len(pending)
+
+
+    def physical(self, macs) -> int:
+        """MACs --> estimated physical devices behind them, unlinked MACs count as one each"""
+
+
+        clusters = self.macs
+
+        return len({clusters[mac].id if mac in clusters else mac for mac in macs})
+
+
+    def stats(self) -> dict:
+        """Live clusters vs MACs and link counters"""
+
+        return {"physical": len(self.clusters), "macs": len(self.macs), "created": self.created, "linked": self.linked, "splits": self.splits, "buckets": len(self.buckets), "update_ms": round(self.update_ms, 3)}
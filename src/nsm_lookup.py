@@ -0,0 +1,215 @@
+# THIS MODULE WILL SERVE VENDOR / COMPANY LOOKUPS TO EVERY LOCAL TOOL  -->  python nsm_lookup.py serve
+
+
+
+# UI IMPORTS
+from rich.console import Console
+console = Console()
+
+
+# ETC IMPORTS
+import argparse, json, signal, socket, socketserver, sys, tempfile, threading
+from pathlib import Path
+
+
+# NSM IMPORTS
+from nsm_database import DataBase, Vendor_Index
+
+
+
+
+SOCKET = Path(tempfile.gettempdir()) / "nsm_lookup.sock"
+
+
+
+class Lookup_Server():
+    """One loaded index behind a Unix socket --> newline delimited JSON batches in, batches out"""
+
+
+    # ONE REQUEST LINE CAN NOT PIN THE SERVER
+    max_batch = 65_536
+    server    = None
+
+
+
+    @classmethod
+    def answer(cls, request: dict) -> dict:
+        """{"macs": [...], "companies": [...]} --> {"vendors": [...], "companies": [...]}, same order"""
+
+
+        macs      = request.get("macs") or []
+        companies = request.get("companies") or []
+
+        if not isinstance(macs, list) or not isinstance(companies, list): return {"error": "macs and companies must be lists"}
+        if len(macs) + len(companies) > cls.max_batch: return {"error": f"batch larger than {cls.max_batch}"}
+
+        # CHECKED BEFORE ANY LOOKUP --> a bad element is named, not reported as a broken request
+        for i, mac in enumerate(macs):
+            if not isinstance(mac, str): return {"error": f"macs[{i}] must be a string, got {type(mac).__name__}"}
+
+        for i, company_id in enumerate(companies):
+            if not isinstance(company_id, int) or isinstance(company_id, bool): return {"error": f"companies[{i}] must be an integer, got {type(company_id).__name__}"}
+
+        try: return {"vendors": Vendor_Index.lookup_many(macs, remote=False), "companies": DataBase._get_companies(companies, remote=False)}
+        except (TypeError, ValueError) as e: return {"error": str(e)}
+
+
+    class Handler(socketserver.StreamRequestHandler):
+        """One connection --> any number of request lines"""
+
+
+        def handle(self) -> None:
+
+            for line in self.rfile:
+
+                try: request = json.loads(line)
+                except ValueError: reply = {"error": "request is not valid JSON"}
+                else: reply = Lookup_Server.answer(request) if isinstance(request, dict) else {"error": "request is not a JSON object"}
+
+                self.wfile.write(json.dumps(reply, separators=(",", ":")).encode() + b"\n")
+
+
+    @classmethod
+    def serve(cls, path: Path = SOCKET, verbose=True) -> None:
+        """Load the index once, then answer until interrupted"""
+
+
+        Vendor_Index.load(verbose=verbose); DataBase._company_ids()
+
+        path = Path(path)
+        if path.exists(): path.unlink()
+
+        cls.server = socketserver.ThreadingUnixStreamServer(str(path), cls.Handler)
+        cls.server.daemon_threads = True
+
+        if verbose: console.print(f"[bold green][+] Lookup service listening on:[bold yellow] {path}")
+
+
+        try: cls.server.serve_forever(poll_interval=0.5)
+        except KeyboardInterrupt: pass
+
+        finally:
+            cls.server.server_close()
+            if path.exists(): path.unlink()
+
+
+    @classmethod
+    def stop(cls) -> None:
+        if cls.server: cls.server.shutdown()
+
+
+
+class Lookup_Client():
+    """Batch lookups against a running Lookup_Server --> falls back to an in process index when it is not there"""
+
+
+
+    def __init__(self, path: Path = SOCKET, timeout: float = 2.0, fallback: bool = True):
+        """Connects on first use and keeps the connection"""
+
+
+        self.path     = Path(path)
+        self.timeout  = timeout
+        self.fallback = fallback
+        self.lock     = threading.Lock()
+        self.sock     = None
+        self.file     = None
+
+        self.requests = 0
+        self.local    = 0
+
+
+    def _connect(self) -> None:
+
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(str(self.path))
+        self.file = self.sock.makefile("rwb")
+
+
+    def close(self) -> None:
+        """Drop the connection, the next call reconnects"""
+
+
+        for handle in (self.file, self.sock):
+            try: handle and handle.close()
+            except OSError: pass
+
+        self.sock = self.file = None
+
+
+    def lookup(self, macs: list = (), companies: list = ()) -> dict:
+        """One round trip --> {"vendors": [...], "companies": [...]}"""
+
+
+        request = {"macs": list(macs), "companies": list(companies)}
+
+        with self.lock:
+
+            try:
+
+                if self.file is None: self._connect()
+
+                self.file.write(json.dumps(request, separators=(",", ":")).encode() + b"\n"); self.file.flush()
+                line = self.file.readline()
+
+                if not line: raise ConnectionError("lookup service closed the connection")
+
+                reply = json.loads(line); self.requests += 1
+
+
+            except (OSError, ValueError) as e:
+
+                self.close()
+                if not self.fallback: raise
+
+                # SERVICE DOWN --> same answer from this process, the scanner never stops on it
+                if not self.local: console.print(f"[bold yellow][*] Lookup service unavailable ({e}), resolving in process")
+                self.local += 1
+
+                reply = Lookup_Server.answer(request)
+
+
+        if "error" in reply: raise ValueError(reply["error"])
+
+        return reply
+
+
+    def vendors(self, macs: list) -> list:
+        """[MAC] --> [Vendor]"""
+
+        return self.lookup(macs=macs)["vendors"]
+
+
+    def companies(self, company_ids: list) -> list:
+        """[manufacturer id] --> [Company]"""
+
+        return self.lookup(companies=company_ids)["companies"]
+
+
+
+
+if __name__ == "__main__":
+
+
+    parser = argparse.ArgumentParser(description="Shared vendor / company lookup service")
+    parser.add_argument("command", choices=["serve", "query"], help="serve --> run the service | query --> resolve MACs / company ids")
+    parser.add_argument("macs", nargs="*", help="query: MAC addresses, - reads one per line from stdin")
+    parser.add_argument("--company", type=int, action="append", default=[], help="query: manufacturer id, repeatable")
+    parser.add_argument("--socket", default=str(SOCKET), help="Unix socket path")
+    args = parser.parse_args()
+
+
+    if args.command == "serve":
+
+        # SYSTEMD / KILL --> same clean exit as ctrl+c, the socket file is removed
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        Lookup_Server.serve(path=args.socket)
+
+    else:
+
+        macs  = [line.strip() for line in sys.stdin if line.strip()] if args.macs == ["-"] else args.macs
+        reply = Lookup_Client(path=args.socket).lookup(macs=macs, companies=args.company)
+
+        for mac, vendor in zip(macs, reply["vendors"]): print(f"{mac}\t{vendor or ''}")
+        for company_id, company in zip(args.company, reply["companies"]): print(f"{company_id}\t{company or ''}")
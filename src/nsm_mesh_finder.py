@@ -1,45 +1,159 @@
 # TEST MODULE WILL BE STARTING BLE FRAMEWORK FROM HERE
  
 
-# UI IMPORTS
-from rich.table import Table
-from rich.live import Live
-from rich.panel import Panel
+# UI IMPORTS  -->  rich Live / Table and bleak load where they are first used, --help never pays for them
 from rich.console import Console
 
 
-# HACKING IMPORTS
-from bleak import BleakClient, BleakScanner
-
-
 # ETC IMPORTS
-import asyncio, os, time, random, threading, requests
+import asyncio, os, time, random, threading
+from collections import deque, OrderedDict
 
 
 # Yoda
 from pathlib import Path
-from gtts import gTTS
-import subprocess
+import subprocess, hashlib
 
 
 # NSM IMPORTS
-from nsm_database import DataBase
+from nsm_database import DataBase, Vendor_Index, Enrichment_Cache, Sig_Decoder
+from nsm_scanners import Scanners, Recorder
+from nsm_alerts import Alert_Dispatcher
+from nsm_snapshot import Snapshot, Delta_Feed
+from nsm_motion import Motion_Engine
+from nsm_fingerprint import Fingerprint_Engine
+from nsm_trackers import Tracker_Detector
+from nsm_device import Device
+from nsm_storage import Sighting_Log
+from nsm_metrics import Metrics
 
 
 console = Console()
 LOCK = threading.Lock()
 
 
+class Latency_Tracker():
+    """Rolling advertisement --> /api/devices latency samples, measured when the snapshot that carries the advertisement is built"""
+
+
+    def __init__(self, size: int = 4096, backlog: int = 65_536):
+        """Keep the last `size` samples | backlog --> arrival times held until the next publish, oldest dropped past it"""
+
+        self.samples   = deque(maxlen=size)
+        self.arrivals  = deque(maxlen=backlog)
+        self.count     = 0
+        self.histogram = Metrics.histogram("nsm_advertisement_latency_seconds", "Advertisement heard --> in the /api/devices snapshot")
+
+
+    def heard(self, seen_at: float) -> None:
+        """One advertisement ingested --> O(1), timed once the snapshot is rebuilt"""
+
+        self.arrivals.append(seen_at)
+
+
+    def served(self, now: float) -> None:
+        """Snapshot built --> every advertisement ingested since the last one is now served"""
+
+
+        arrivals, observe = self.arrivals, self.histogram.observe
+
+        while arrivals:
+            seconds = now - arrivals.popleft()
+            self.samples.append(seconds); observe(seconds)
+            self.count += 1
+
+
+    def stats(self) -> dict:
+        """count, mean / p50 / p95 / max in ms over the recent window"""
+
+
+        if not self.samples: return {"count": 0}
+
+        ordered = sorted(self.samples); n = len(ordered)
+
+        return {
+            "count":   self.count,
+            "mean_ms": round(sum(ordered) / n * 1000, 2),
+            "p50_ms":  round(ordered[n // 2] * 1000, 2),
+            "p95_ms":  round(ordered[min(n - 1, int(n * 0.95))] * 1000, 2),
+            "max_ms":  round(ordered[-1] * 1000, 2),
+        }
+
+
+
+class Live_Map(OrderedDict):
+    """MAC --> Device, least recently heard first --> TTL / size eviction only ever looks at the front"""
+
+
+    def __init__(self, ttl: float = 60, max_size: int = 20_000):
+        """ttl = seconds unheard before eviction, max_size = hard cap, 0 disables either"""
+
+        super().__init__()
+        self.ttl      = ttl
+        self.max_size = max_size
+        self.evicted  = 0
+
+
+    def heard(self, mac: str, data: dict) -> None:
+        """Store / refresh a record and move it to the back"""
+
+        self[mac] = data; self.move_to_end(mac)
+
+
+    def evict(self, now: float = None) -> list:
+        """Pop expired + overflow records from the front --> evicted MACs, O(evicted)"""
+
+
+        now     = now or time.time()
+        evicted = []
+
+        while self:
+
+            mac  = next(iter(self))
+            over = self.max_size and len(self) > self.max_size
+            old  = self.ttl and now - (self[mac].up_time or 0) > self.ttl
+
+            if not (over or old): break
+
+            del self[mac]; evicted.append(mac)
+
+        self.evicted += len(evicted)
+
+        return evicted
+
+
+
 class BLE_Sniffer(): 
     """This will be a ble hacking framework"""
 
 
+    snapshot = Snapshot(encode=Device.encode_map)
+    feed     = Delta_Feed(encode=Device.encode_map)
+    history  = None
+    updates  = 0
+
+    # --workers N --> enrichment pool + writer process (nsm_pipeline), 0 keeps everything in this process
+    workers  = 0
+    pipeline = None
+    writer   = None
+    lookup_socket = None
+
+    # --profile --> nsm_profiler, ticked once per scan cycle
+    profiler = None
+
+    # -wv --> nsm_terminal, drawn from the live map on its own timer
+    view     = None
+    view_options = {}
+
+
 
     @classmethod
     async def _ble_discover(cls):
         """This will sniff traffic"""
 
 
+        from bleak import BleakScanner
+
         devices = await BleakScanner.discover(timeout=60, return_adv=True)
 
         return devices
@@ -61,140 +175,502 @@ class BLE_Sniffer():
 
 
     @classmethod
-    async def _ble_printer(cls, war_drive: bool, print: bool = True, server_ip=False) -> None:
-        """Lets enumerate"""
+    def _ingest(cls, mac: str, adv, seen_at: float = None, adapter: str = None, sample: bool = True) -> tuple:
+        """One advertisement --> live_map / war_drive / sighting log | returns (data, new)"""
+
+
+        rssi  = adv.rssi
+        manuf, vendor, hit = Enrichment_Cache.resolve(mac=mac, manufacturer_data=adv.manufacturer_data)
+        up_time = time.time()
+        data  = cls.live_map.get(mac)
+        name, uuids, learned = adv.local_name, adv.service_uuids, False
+                        
+
+        # CACHE HIT ON A KNOWN DEVICE --> only the signal (and sensor service data) changed
+        if hit and data and data.manuf == manuf:
+
+            data.rssi = rssi; data.up_time = up_time
+
+            # SCAN RESPONSE --> name / service uuids often arrive after the first advertisement, the cached vendor is still good
+            if (name and name != data.name) or (uuids and tuple(uuids) != data.uuid):
+                data.update(rssi=rssi, manuf=manuf, vendor=data.vendor, name=name or data.name, uuid=uuids or data.uuid, up_time=up_time)
+                Sig_Decoder.decode(data, adv); learned = True
+
+            elif adv.service_data: Sig_Decoder.decode(data, adv, payload_only=True)
+
+            cls.live_map.move_to_end(mac)
+
+        # KNOWN MAC, NEW PAYLOAD --> same record, fields overwritten in place
+        elif data:
+            data.update(rssi=rssi, manuf=manuf, vendor=vendor, name=adv.local_name or False, uuid=adv.service_uuids, up_time=up_time)
+            Sig_Decoder.decode(data, adv)
+            cls.live_map.move_to_end(mac)
+
+        else:
+            data = Device(addr=mac, rssi=rssi, manuf=manuf, vendor=vendor, name=adv.local_name or False, uuid=adv.service_uuids, up_time=up_time)
+            Sig_Decoder.decode(data, adv)
+            cls.live_map.heard(mac, data)
+
+
+        cls.adapter_counts[adapter or "default"] = cls.adapter_counts.get(adapter or "default", 0) + 1
+        cls.updates += 1
+        if sample and cls.history: cls.history.add(mac, up_time, rssi, adapter)
+        if cls.feed.active: cls.feed.dirty.add(mac)
+
+
+        # SEVERAL CONTROLLERS --> one record per MAC with a per adapter RSSI
+        if adapter:
 
+            if data.adapters is None: data.adapters = {adapter: rssi}
+            heard = cls.last_heard.get(mac)
 
-        c1 = "bold red"
-        c2 = "bold yellow"
-        c3 = "bold green"
-        c4 = "bold red"
-        c5 = "bold blue"
-        table = ""
-        timeout = 10
+            # SAME ADVERTISEMENT FROM ANOTHER CONTROLLER --> merged, strongest reading wins
+            if heard and up_time - heard[0] < cls.dedupe_window and heard[1] != adapter:
+                cls.duplicates += 1; data.rssi = max(rssi, heard[2])
+
+            data.adapters[adapter] = rssi
+            cls.last_heard[mac] = (up_time, adapter, rssi)
+
+
+        # LATEST READING THIS CYCLE --> one motion sample per device per publish
+        if cls.motion.enabled: cls.motion.pending[mac] = data.rssi
+
+        # FIRST ADVERTISEMENT SINCE THE LAST PUBLISH --> fingerprinted there, once per device, not per advertisement
+        if mac not in cls.fingerprints.pending: cls.fingerprints.pending[mac] = (adv, seen_at or up_time)
+
+
+        # ADVERTISEMENT HEARD --> timed when publish() puts it into /api/devices
+        if seen_at: cls.latency.heard(seen_at)
+
+
+        new = mac not in cls.seen
+
+        if new:
+            cls.devices.append(mac); cls.seen[mac] = len(cls.devices)
+            cls.war_drive[len(cls.devices)] = data.copy()
+
+        # NAME / UUIDS LEARNED LATER --> fresh war_drive copy so storage writes them too
+        elif learned: cls.war_drive[cls.seen[mac]] = data.copy()
+
+        return data, new
+
+
+    @classmethod
+    @Metrics.timed("publish")
+    def publish(cls) -> bool:
+        """Evict stale devices, run the motion engine, flush the sighting log, then live_map --> /api/devices bytes + /api/stream batch, snapshot first so it is never older than the feed"""
+
+
+        evicted = cls.live_map.evict()
+        for mac in evicted: cls.last_heard.pop(mac, None)
+        cls.motion.release(evicted)
+        cls.fingerprints.release(evicted)
+
+        # SMOOTHED RSSI + MOVEMENT + CLUSTER ID --> written into the records before they are serialised
+        pending = cls.fingerprints.pending
+        cls.motion.update(cls.live_map)
+        cls.fingerprints.update(cls.live_map)
+
+        # SAME FIRST ADVERTISEMENT PER MAC THE FINGERPRINTS USED --> trackers pay nothing per advertisement
+        for tracker in cls.trackers.update(pending, cls.live_map): Extensions.Follower(tracker=tracker)
+
+        # QUIET DEVICES' BUCKETS ARE FINAL --> appended to the sighting log
+        if cls.history: cls.history.flush()
+
+        # EVICTIONS CHANGE THE PAYLOAD TOO --> new snapshot version
+        if evicted: cls.updates += 1
+
+        published = cls.snapshot.publish(data=cls.live_map, version=cls.updates)
+        cls.latency.served(time.time())
+        cls.feed.publish(data=cls.live_map, evicted=evicted)
+
+        return published
+
+
+    @classmethod
+    def adapter_rates(cls) -> dict:
+        """Advertisements per second per controller since start"""
+
+
+        elapsed = max(time.time() - cls.started, 1e-6)
+
+        return {adapter: round(count / elapsed, 1) for adapter, count in cls.adapter_counts.items()}
+
+
+    @classmethod
+    def _show(cls, data: dict, war_drive: bool, print: bool) -> None:
+        """New device --> console line in -w mode, -wv shows it through the terminal view instead"""
+
+
+        # -wv --> nothing per device, the view redraws from the live map
+        if print or not war_drive: return
+
+        rssi, mac, manuf, vendor, name, uuid = data.rssi, data.addr, data.manuf, data.vendor, data.name, list(data.uuid) if data.uuid else False
+
+        console.print(f"{len(cls.devices)}", rssi, mac, manuf, vendor, name, uuid)
+
+
+    @classmethod
+    def _alert(cls, current_count: int, server_ip: str) -> None:
+        """Extensions under the global lock"""
+
+
+        with LOCK:
+            Extensions.Controller(current_count=current_count, server_ip=server_ip)
+
+
+    @classmethod
+    async def _ble_cycles(cls, war_drive: bool, print: bool, server_ip=False) -> None:
+        """start --> sleep 5 --> stop --> process everything that piled up"""
+
+
+        # FIRST ARRIVAL PER MAC THIS CYCLE --> latency baseline for the streaming mode
+        arrivals = {}
+
+        # EVERY ADVERTISEMENT GOES TO THE SIGHTING LOG HERE, THE CYCLE ONLY KEEPS THE LAST ONE PER MAC
+        def receiver(adapter):
+
+            def callback(device, adv):
+                now = time.time(); arrivals.setdefault(device.address, now); cls.received += 1
+                if cls.history: cls.history.add(device.address, now, adv.rssi, adapter)
+
+            return callback
+
+        scanners = {adapter: Scanners.create(backend=cls.backend, adapter=adapter, detection_callback=receiver(adapter), **cls.backend_options) for adapter in cls.adapters}
+
+        # LAST SEEN IS THE CYCLE'S PROCESSING TIME HERE --> an address that rotated mid cycle is still allowed to overlap its successor
+        cls.fingerprints.overlap = max(cls.fingerprints.overlap, 5)
+
+        cycle  = Metrics.histogram("nsm_cycle_seconds", "Scan cycle processing after the radio window --> ingest, publish, persist, alerts", buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+        timer  = Metrics.stage("ingest")
+
+        while True:
+            
+
+            arrivals.clear()
+            for scanner in scanners.values(): await scanner.start()
+            await asyncio.sleep(5)
+            for scanner in scanners.values(): await scanner.stop()
+
+            heard = set()
+            start = time.perf_counter()
+
+
+            # WHOLE CYCLE'S MACS --> one batch vendor lookup before the per device work
+            Enrichment_Cache.prefetch([(mac, adv.manufacturer_data) for scanner in scanners.values() for mac, (device, adv) in scanner.discovered_devices_and_advertisement_data.items()])
+
+
+            for adapter, scanner in scanners.items():
+
+                devices = scanner.discovered_devices_and_advertisement_data
+            
+                for mac, (device, adv) in devices.items():
 
-        if print:
-            table = Table(title="BLE Sniffer" if not war_drive else "BLE Driving", title_style="bold red", border_style="bold purple", style="bold purple", header_style="bold red")
-            table.add_column("#"); table.add_column("RSSI", style=c2); table.add_column("Mac", style=c3); table.add_column("Manufacturer", style=c5); table.add_column("Local_name"); table.add_column("UUID", style=c3)
+                    data, new = cls._ingest(mac=mac, adv=adv, seen_at=arrivals.get(mac), adapter=adapter, sample=False)
+                    heard.add(mac)
+
+                    if new: cls._show(data=data, war_drive=war_drive, print=print)
+
+            timer.observe(time.perf_counter() - start)
+
+
+            if not heard: return
+
+            cls.publish()
+            cls.persist()
+            cls._alert(current_count=cls.fingerprints.physical(heard), server_ip=server_ip)
+
+            cycle.observe(time.perf_counter() - start)
+            if cls.profiler: cls.profiler.tick()
+
+
+    @classmethod
+    async def _every(cls, interval: float, func, *args) -> None:
+        """Run func on its own timer until cancelled"""
+
+
+        while True:
+
+            await asyncio.sleep(interval)
+
+            try: await func(*args) if asyncio.iscoroutinefunction(func) else func(*args)
+            except Exception as e: Metrics.errors("timer").inc(); console.print(f"[bold red]Timer Exception Error:[bold yellow] {e}")
+
+
+    @classmethod
+    async def _ble_stream(cls, war_drive: bool, print: bool, server_ip=False, interval: float = 5, publish: float = 1) -> None:
+        """detection_callback --> asyncio.Queue --> enrich per advertisement, snapshot on a timer"""
+
+
+        queue  = asyncio.Queue(maxsize=10_000)
+        window = set()
+        loop   = asyncio.get_running_loop()
+
+
+        def receiver(adapter):
+
+            def callback(device, adv):
+                cls.received += 1
+                try: queue.put_nowait((time.time(), device.address, adv, adapter))
+                except asyncio.QueueFull: cls.dropped += 1
+
+            return callback
+
+
+        # ROTATING ADDRESSES WOULD INFLATE THE BASELINE --> estimated physical devices go to the alerts
+        async def alert():
+            count = cls.fingerprints.physical(window); window.clear()
+            await loop.run_in_executor(None, cls._alert, count, server_ip)
+
+
+        # PERSISTENCE + ALERTING + SNAPSHOTS ON THEIR OWN TIMERS --> the receive path never waits on them
+        timers = [
+            asyncio.create_task(cls._every(publish, cls.publish)),
+            asyncio.create_task(cls._every(interval, cls.persist)),
+            asyncio.create_task(cls._every(interval, alert)),
+        ]
+
+        # NO CYCLES WHEN STREAMING --> the persist interval counts as one for the profiler
+        if cls.profiler: timers.append(asyncio.create_task(cls._every(interval, cls.profiler.tick)))
+
+        # STAGED --> the pool enriches batches on the other cores, this loop only receives and ingests
+        if cls.workers:
+
+            from nsm_pipeline import Enrich_Pool
+
+            cls.pipeline = Enrich_Pool(workers=cls.workers, lookup_socket=cls.lookup_socket)
+            receiver     = cls.pipeline.receiver
+
+            def ingest(seen_at, mac, adv, adapter):
+                data, new = cls._ingest(mac=mac, adv=adv, seen_at=seen_at, adapter=adapter)
+                window.add(mac)
+                if new: cls._show(data=data, war_drive=war_drive, print=print)
+
+
+        # ONE SCANNER PER CONTROLLER, ALL FEEDING THE SAME QUEUE
+        scanners = [Scanners.create(backend=cls.backend, adapter=adapter, detection_callback=receiver(adapter), **cls.backend_options) for adapter in cls.adapters]
+        for scanner in scanners: await scanner.start()
 
 
         try:
 
-            scanner = BleakScanner()
-
-            with Live(table, console=console, refresh_per_second=4):
-                while 0 < timeout:
-                    
-
-                    await scanner.start()
-                    await asyncio.sleep(5)
-                    await scanner.stop()
-                    devices = scanner.discovered_devices_and_advertisement_data
-
-
-                    if not devices: return
-                    
-                    
-                    for mac, (device, adv) in devices.items():
-
-                        name  = adv.local_name or False
-                        rssi  = adv.rssi
-                        uuid  = adv.service_uuids or False
-                        manuf = DataBase._get_manufacturers(manufacturer_hex=adv.manufacturer_data, verbose=False) 
-                        vendor = DataBase._get_vendor_main(mac=mac, verbose=False) 
-                        up_time = time.time()
-                                        
-
-                        data = {
-                            "rssi": rssi,
-                            "addr": mac,
-                            "manuf": manuf,
-                            "vendor": vendor,
-                            "name": name,
-                            "uuid": uuid,
-                            "up_time": up_time
-                        }
-
-
-                        cls.live_map[mac] = data
-
-                        if mac not in cls.devices:
-                            
-                            cls.devices.append(mac); cls.num += 1
-                            cls.war_drive[len(cls.devices)] = data
-                            
-                            if print:
-                                if uuid: table.add_section()
-                            
-                                p1 = c3; p2 = "white" 
-                                table.add_row(f"{len(cls.devices)}", f"{rssi}", f"{mac}", f"{manuf}", f"{name}",   f"{uuid}")
-
-                                if uuid: table.add_section()
-                            
-
-                            elif war_drive:
-                                console.print(f"{len(cls.devices)}", rssi, mac, manuf, vendor, name, uuid)
-                
-
-
-                            #if vendor_lookup:  console.print(f"[{c2}][+][/{c2}] [{p1}]Addr:[{p2}] {mac} - [{p1}]RSSI:[{p2}] {rssi} - [{p1}]Local_name:[{p2}] {name} - [{p1}]Manufacturer:[{p2}] {manuf} - [{p1}]UUID:[{p2}] {uuid}") 
-                            #else: console.print(f"[{c2wq   }][+][/{c2}] [{p1}]Addr:[{p2}] {mac} - [{p1}]RSSI:[{p2}] {rssi} - [{p1}]Local_name:[{p2}] {name} - [{p1}]Manufacturer:[{p2}] {manuf} - [{p1}]UUID:[{p2}] {uuid}")
-                        
-                        if print and cls.num > 50:
-                                cls.num = 0
-                                console.print(table)
-                                table = Table(title="BLE Sniffer", title_style="bold red", border_style="bold purple", style="bold purple", header_style="bold red")
-                                table.add_column("#"); table.add_column("RSSI", style=c2); table.add_column("Mac", style=c3); table.add_column("Manufacturer", style=c5); table.add_column("Local_name"); table.add_column("UUID", style=c3)
+            if cls.pipeline: await cls.pipeline.run(ingest)
 
- 
-                    DataBase.push_results(devices=cls.war_drive, verbose=False)
-                    with LOCK: 
-                        Extensions.Controller(current_count=len(devices), server_ip=server_ip)
+            timer = Metrics.stage("ingest")
 
+            while True:
+
+                # EVERYTHING QUEUED SO FAR --> one batch vendor lookup, then ingest in arrival order
+                batch = [await queue.get()]
+                while not queue.empty() and len(batch) < 1024: batch.append(queue.get_nowait())
+
+                start = time.perf_counter()
+                Enrichment_Cache.prefetch([(mac, adv.manufacturer_data) for _, mac, adv, _ in batch])
+
+                for seen_at, mac, adv, adapter in batch:
+
+                    data, new = cls._ingest(mac=mac, adv=adv, seen_at=seen_at, adapter=adapter)
+                    window.add(mac)
+
+                    if new: cls._show(data=data, war_drive=war_drive, print=print)
+
+                # ONE OBSERVE PER BATCH --> the per advertisement cost stays on the latency histogram only
+                timer.observe(time.perf_counter() - start)
+
+
+        finally:
+            for timer in timers: timer.cancel()
+            for scanner in scanners: await scanner.stop()
+            if cls.pipeline: cls.pipeline.close()
+
+
+    @classmethod
+    async def _ble_printer(cls, war_drive: bool, print: bool = True, server_ip=False, stream=False) -> None:
+        """Lets enumerate"""
+
+
+        scan = cls._ble_stream if stream or cls.workers else cls._ble_cycles
+
+
+        try:
+
+            if print:
+
+                from nsm_terminal import Terminal_View
+
+                # REDRAWS + TOTALS ON THEIR OWN TIMERS --> terminal cost is capped by fps and rows, not by the scan rate
+                with Terminal_View(war_drive=war_drive, **cls.view_options) as cls.view:
+
+                    timers = [asyncio.create_task(cls._every(cls.view.period, cls.view.refresh, cls)), asyncio.create_task(cls._every(cls.view.interval, cls.view.totals, cls))]
+
+                    try: await scan(war_drive=war_drive, print=print, server_ip=server_ip)
+                    finally:
+                        for timer in timers: timer.cancel()
+
+            else: await scan(war_drive=war_drive, print=print, server_ip=server_ip)
 
-                        
 
             console.print(f"\n[bold green][+] Found a total of:[bold yellow] {len(cls.devices)} devices")
 
 
         except KeyboardInterrupt:  
-            if war_drive: DataBase.push_results(devices=cls.war_drive, verbose=False)
+            if war_drive: cls.persist()
             return KeyboardInterrupt
 
         except Exception as e: 
+            Metrics.errors("sniffer").inc()
             console.print(f"[bold red]Sniffer Exception Error:[bold yellow] {e}") 
-            if war_drive: DataBase.push_results(devices=cls.war_drive, verbose=False)
+            if war_drive: cls.persist()
 
 
+    @classmethod
+    def persist(cls) -> None:
+        """New / changed records --> the writer process when there is one, storage in this process otherwise"""
+
+
+        if cls.writer: cls.writer.submit(devices=cls.war_drive, sightings=cls.live_map)
+        else:          DataBase.push_results(devices=cls.war_drive, sightings=cls.live_map, verbose=False)
+
 
-        
     @classmethod
-    def main(cls, war_drive=False, print=False, server_ip=False):
-        """Run from here"""
+    def pipeline_stats(cls) -> dict:
+        """Per stage throughput / busy share / queue depth --> /api/pipeline"""
+
+
+        stages = {name: metrics.stats() for name, metrics in cls.pipeline.metrics.items()} if cls.pipeline else {}
+
+        if cls.writer: stages["persist"] = cls.writer.stats()
+
+        return {"workers": cls.workers, "dropped": cls.dropped, "stages": stages, "publish_ms": round(cls.snapshot.build_ms, 3), "motion_ms": round(cls.motion.update_ms, 3), "trackers_ms": round(cls.trackers.update_ms, 3)}
+
+
+    @classmethod
+    def metrics(cls) -> list:
+        """Live scanner state --> /metrics rows, read at scrape time so the receive path pays nothing for them"""
+
+
+        if not hasattr(cls, "live_map"): return []
+
+        stages   = cls.pipeline_stats()["stages"]
+        receive  = stages.get("receive", {})
+        storage  = stages["persist"]["bytes"] if "persist" in stages else getattr(DataBase.storage, "bytes", 0)
+        cache    = Enrichment_Cache.stats()
+
+        rows = [
+            ("nsm_advertisements_received_total", "counter", "Advertisements handed over by the radio callbacks", cls.received + receive.get("items", 0), None),
+            ("nsm_advertisements_dropped_total",  "counter", "Advertisements dropped on a full receive queue",   cls.dropped + receive.get("dropped", 0), None),
+            ("nsm_live_devices",                  "gauge",   "Devices in the live map",                          len(cls.live_map), None),
+            ("nsm_live_evicted_total",            "counter", "Devices evicted from the live map",                cls.live_map.evicted, None),
+            ("nsm_devices_seen_total",            "counter", "Distinct MACs seen this run",                      len(cls.seen), None),
+            ("nsm_devices_physical",              "gauge",   "Estimated physical devices heard within the live ttl", len(cls.fingerprints.clusters), None),
+            ("nsm_clusters_created_total",        "counter", "Fingerprint clusters created",                     cls.fingerprints.created, None),
+            ("nsm_cluster_links_total",           "counter", "Rotated addresses linked to an existing cluster",  cls.fingerprints.linked, None),
+            ("nsm_cluster_splits_total",          "counter", "Links undone because the old address kept advertising", cls.fingerprints.splits, None),
+            ("nsm_trackers",                      "gauge",   "Trackers (Tile, Find My) held by the follower detector", len(cls.trackers.trackers), None),
+            ("nsm_trackers_following",            "gauge",   "Trackers heard in more than the threshold of distinct windows", len(cls.trackers.following()), None),
+            ("nsm_tracker_alerts_total",          "counter", "Follower alerts raised",                           cls.trackers.alerts, None),
+            ("nsm_duplicates_total",              "counter", "Cross adapter duplicates merged",                  cls.duplicates, None),
+            ("nsm_snapshot_builds_total",         "counter", "/api/devices snapshots built",                     cls.snapshot.builds, None),
+            ("nsm_snapshot_build_seconds",        "gauge",   "Last /api/devices snapshot build",                 cls.snapshot.build_ms / 1000, None),
+            ("nsm_cache_hits_total",              "counter", "Enrichment cache hits",                            cache["hits"], None),
+            ("nsm_cache_misses_total",            "counter", "Enrichment cache misses",                          cache["misses"], None),
+            ("nsm_cache_entries",                 "gauge",   "Enrichment cache entries",                         cache["size"], None),
+            ("nsm_database_write_bytes_total",    "counter", "Bytes written by the device storage backend",      storage, None),
+            ("nsm_sighting_log_bytes_total",      "counter", "Bytes appended to the sighting log",               cls.history.bytes if cls.history else 0, None),
+        ]
+
+        rates = cls.adapter_rates()
+
+        for adapter, count in cls.adapter_counts.items():
+            rows.append(("nsm_advertisements_total",      "counter", "Advertisements ingested per controller",            count, {"adapter": adapter}))
+            rows.append(("nsm_advertisements_per_second", "gauge",   "Advertisements ingested per second since start",    rates[adapter], {"adapter": adapter}))
+
+        for stage, stats in stages.items():
+            rows.append(("nsm_pipeline_items_total", "counter", "Items through a pipeline stage",               stats["items"], {"stage": stage}))
+            rows.append(("nsm_pipeline_busy_ratio",  "gauge",   "Share of wall time a pipeline stage was busy", stats["busy"], {"stage": stage}))
+            rows.append(("nsm_pipeline_queue_depth", "gauge",   "Queue length feeding a pipeline stage",        stats["depth"], {"stage": stage}))
+
+        for sink, stats in Alert_Dispatcher.stats().items():
+            for key in ("sent", "failed", "dropped"): rows.append((f"nsm_alerts_{key}_total", "counter", f"Alerts {key} per sink", stats[key], {"sink": sink}))
+
+        return rows
+
+
+
         
+    @classmethod
+    def _reset(cls, adapters=None, backend="bleak", backend_options=None, live_ttl=60, live_max=20_000) -> None:
+        """Fresh scanner state --> main() and the benchmarks start from here"""
+
         cls.war_drive = {}
         cls.devices = []
-        cls.live_map = {}
-        cls.num =0
-        if war_drive: timeout = 30 * 60; vendor_lookup = True
+        cls.seen = {}
+        cls.live_map = Live_Map(ttl=live_ttl, max_size=live_max)
+        cls.motion = Motion_Engine()
+        cls.fingerprints = Fingerprint_Engine(ttl=live_ttl or 600)
+        cls.trackers = Tracker_Detector()
+        cls.history = None
+        cls.dropped = 0
+        cls.received = 0
+        cls.latency = Latency_Tracker()
+        cls.backend = backend
+        cls.backend_options = backend_options or {}
+        cls.adapters = adapters or [None]
+        cls.adapter_counts = {}
+        cls.last_heard = {}
+        cls.duplicates = 0
+        cls.dedupe_window = 1.0
+        cls.started = time.time()
+
+
+    @classmethod
+    def main(cls, war_drive=False, print=False, server_ip=False, cache_size=4096, cache_ttl=300, storage="jsonl", stream=False, adapters=None, backend="bleak", backend_options=None, record=None, live_ttl=60, live_max=20_000, history_bucket=10, lookup_socket=None, workers=0, profile=None, view=None, trackers=None, speak_every=60):
+        """Run from here"""
+        
+        BLE_Sniffer._reset(adapters=adapters, backend=backend, backend_options=backend_options, live_ttl=live_ttl, live_max=live_max)
+        if trackers: cls.trackers = Tracker_Detector(**trackers)
+        Extensions.speak_every = speak_every
+        cls.workers, cls.lookup_socket, cls.view_options = workers, lookup_socket, view or {}
+        if history_bucket: cls.history = Sighting_Log(bucket=history_bucket)
+        if record: Scanners.recorder = Recorder(path=record)
+        if profile: from nsm_profiler import Profiler; cls.profiler = Profiler(**profile)
 
 
         try:
             
+            if lookup_socket: from nsm_lookup import Lookup_Client; Vendor_Index.remote = Lookup_Client(path=lookup_socket)
+            else: Vendor_Index.load(verbose=True)
+
+            Sig_Decoder.load(verbose=True)
+            Enrichment_Cache.configure(size=cache_size, ttl=cache_ttl)
+
+            # ONE WRITER PROCESS OWNS THE FILES --> sqlite stays open read only here for /api/wardriving
+            if workers: from nsm_pipeline import Persist_Writer; cls.writer = Persist_Writer(backend=storage)
+            DataBase.open_storage(backend=storage, reader=bool(workers))
             
             if war_drive or print: from nsm_server import Web_Server; threading.Thread(target=Web_Server.start, args=(console, ), daemon=True).start(); time.sleep(1)
-            asyncio.run(BLE_Sniffer._ble_printer(war_drive=war_drive, print=print, server_ip=server_ip))
-            #threading.Thread(target=asyncio.run(BLE_Sniffer._ble_printer), args=(timeout, vendor_lookup, war_drive, print), daemon=True).start()
+            asyncio.run(BLE_Sniffer._ble_printer(war_drive=war_drive, print=print, server_ip=server_ip, stream=stream))
             while True: time.sleep(1)
         
         
         except KeyboardInterrupt:
             console.print("\n[bold red]Stopping....")
-            if war_drive: DataBase.push_results(devices=cls.war_drive, verbose=False)
+            console.print(f"[bold green][+] Enrichment cache:[bold yellow] {Enrichment_Cache.stats()}")
+            console.print(f"[bold green][+] Advertisement --> /api/devices latency:[bold yellow] {cls.latency.stats()}")
+            console.print(f"[bold green][+] Live map:[bold yellow] {len(cls.live_map)} live, {cls.live_map.evicted} evicted")
+            console.print(f"[bold green][+] Physical devices (estimated):[bold yellow] {len(cls.fingerprints.clusters)} live, {cls.fingerprints.created} this run from {len(cls.seen)} MACs")
+            console.print(f"[bold green][+] Trackers:[bold yellow] {len(cls.trackers.trackers)} heard, {len(cls.trackers.following())} following, {cls.trackers.alerts} alerts")
+            if cls.adapter_counts: console.print(f"[bold green][+] Adapters:[bold yellow] {cls.adapter_rates()} adv/s, {cls.duplicates} cross adapter duplicates merged")
+            if cls.workers: console.print(f"[bold green][+] Pipeline:[bold yellow] {cls.pipeline_stats()['stages']}")
+            if cls.writer: cls.writer.close(devices=cls.war_drive, sightings=cls.live_map)
+            elif war_drive: DataBase.push_results(devices=cls.war_drive, sightings=cls.live_map, verbose=False); DataBase.storage.close()
+            if Scanners.recorder: Scanners.recorder.close()
+            if cls.history: cls.history.close()
+            if cls.profiler: cls.profiler.close()
         
         except Exception as e:
             console.print(f"[bold red]Sniffer Exception Error:[bold yellow] {e}")
-            if war_drive: DataBase.push_results(devices=cls.war_drive, verbose=False)
+            if war_drive: cls.persist()
 
 
 
@@ -207,6 +683,13 @@ class Extensions():
     last_count  = 0
     last_color  = False
     drive_error = False
+    last_led    = False
+    session     = None
+    audio_cache = Path(__file__).parent / "audio_cache"
+    audio_limit = 256
+    last_spoken = None
+    speak_every = 60
+    speak_gap   = 15
 
 
     @classmethod
@@ -224,6 +707,26 @@ class Extensions():
 
         
 
+    @classmethod
+    def _post_color(cls, payload, timeout=3):
+        """LED worker --> http POST to the ESP32 over one pooled session"""
+
+
+        if cls.session is None:
+
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            cls.session = requests.Session()
+            cls.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0))
+
+
+        server_ip, color = payload
+        url = f"http://{server_ip}/color?={color}"
+
+        cls.session.post(url=url, timeout=timeout).raise_for_status()
+
+
     @classmethod
     def _change_color(cls, current_count, average_ratio, server_ip, timeout=3):
         """This will send push a http --> ESP32"""
@@ -257,12 +760,10 @@ class Extensions():
         else:                       color = "purple"
         
 
-        try:
-
-            url = f"http://{server_ip}/color?={color}"
-           # requests.post(url=url, timeout=timeout)
-        
-        except Exception as e: console.print(f"[bold red]Exception Error:[bold yellow] {e}")
+        # QUEUED FOR THE LED WORKER --> only the latest colour is ever sent
+        if server_ip and color != cls.last_led:
+            Alert_Dispatcher.register("led", cls._post_color, coalesce=True, retries=2)
+            Alert_Dispatcher.dispatch("led", (server_ip, color)); cls.last_led = color
 
         
         data = [current_count, average_ratio, color]
@@ -270,6 +771,33 @@ class Extensions():
         
 
 
+    @classmethod
+    def _speak(cls, phrase, timeout=30):
+        """TTS worker --> synthesise once per distinct phrase, then --> Yoda Audio player"""
+
+
+        cls.audio_cache.mkdir(exist_ok=True)
+        path = cls.audio_cache / f"{hashlib.sha1(phrase.encode()).hexdigest()}.mp3"
+
+
+        # CACHE MISS --> the only time gTTS goes out to the network
+        if not path.exists():
+
+            from gtts import gTTS
+
+            tmp = path.with_suffix(".tmp")
+            gTTS(phrase).save(str(tmp))
+            os.replace(tmp, path)
+
+            cached = sorted(cls.audio_cache.glob("*.mp3"), key=lambda file: file.stat().st_mtime)
+            for old in cached[:-cls.audio_limit]: old.unlink(missing_ok=True)
+
+
+        try: subprocess.run(["yoda-audio", str(path)], check=False, timeout=timeout)
+
+        # NO PLAYER ON THIS BOX --> stop announcing for the rest of the drive
+        except FileNotFoundError: cls.drive_error = True; raise
+
 
     @classmethod
     def _tts_google(cls, data=False, verbose=True):
@@ -296,30 +824,50 @@ class Extensions():
             if verbose: console.print(say)
             console.print(f"{cls.last_color} --> {color}")
             console.print(f"{cls.last_count} --> {current_count}")
+
+            # COUNTS MOVE EVERY CYCLE WHILE DRIVING --> spoken on a colour change (no more than every speak_gap s), otherwise once per speak_every s
+            now = time.monotonic()
+            gap = now - cls.last_spoken if cls.last_spoken is not None else float("inf")
+            due = (color != cls.last_color and gap >= cls.speak_gap) or gap >= cls.speak_every
         
             cls.last_color = color
             cls.last_count = current_count
 
-            if not cls.drive_error:
-                
-                try:
+            if due and not cls.drive_error:
 
-                    tts = gTTS(say)
-                    path = str(Path(__file__).parent / "output.mp3")
-                    tts.save(path)
+                cls.last_spoken = now
 
-                    if not os.path.exists(path=path): console.print(f"[bold red]File NOT Found Error!!!")
+                # QUEUED FOR THE TTS WORKER --> only the latest announcement is spoken, markup stripped
+                phrase = say.split("] ", 1)[-1]
 
-                    subprocess.run(["yoda-audio", path], check=False)
-                    if verbose: console.print("[bold green]File --> yoda-audio!")
-                
+                Alert_Dispatcher.register("tts", cls._speak, coalesce=True, retries=1)
+                Alert_Dispatcher.dispatch("tts", phrase)
 
-                except Exception as e: console.print(f"[bold red]Exception Error:[bold yellow] {e}")
-                cls.drive_error = True
+                if verbose: console.print("[bold green]Announcement --> yoda-audio!")
         
 
 
     @classmethod
+    def Follower(cls, tracker, verbose=True):
+        """Tracker heard in too many windows --> console + its own TTS queue, never coalesced away by the device count"""
+
+
+        minutes = (tracker.last_seen - tracker.first_seen) / 60
+        say     = f"[bold red][FOLLOW] ATTENTION, {tracker.kind} tracker has been with you for {minutes:.0f} minutes, heard in {len(tracker.windows)} separate windows. last seen at {tracker.rssi} dBm!"
+
+        if verbose: console.print(say)
+        console.print(f"[bold yellow]{tracker.mac} --> {tracker.macs} address(es) so far")
+
+
+        if not cls.drive_error:
+
+            Alert_Dispatcher.register("follower", cls._speak, coalesce=False, maxsize=16, retries=1)
+            Alert_Dispatcher.dispatch("follower", say.split("] ", 1)[-1])
+
+
+
+    @classmethod
+    @Metrics.timed("alerts")
     def Controller(cls, current_count: int, server_ip: str):
         """This one method will be responbile for calling and handling all methods within this class <--"""
 
@@ -328,3 +876,7 @@ class Extensions():
         data  = Extensions._change_color(current_count=current_count, average_ratio=average, server_ip=server_ip)
         Extensions._tts_google(data=data)
 
+
+
+# SCRAPED BY nsm_server /metrics
+Metrics.collector(BLE_Sniffer.metrics)
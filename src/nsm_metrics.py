@@ -0,0 +1,208 @@
+# THIS MODULE WILL HOLD LOW OVERHEAD COUNTERS / HISTOGRAMS  -->  Prometheus text at /metrics
+
+
+
+# ETC IMPORTS
+import bisect, functools, threading, time
+
+
+
+
+# SECONDS --> 50 us ... 10 s, wide enough for a vendor lookup and a scan cycle alike
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+
+class Counter():
+    """Monotonic total"""
+
+
+    kind = "counter"
+
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+
+        self.name, self.help, self.labels = name, help, labels
+        self.value = 0
+        self.lock  = threading.Lock()
+
+
+    def inc(self, amount: float = 1) -> None:
+
+        with self.lock: self.value += amount
+
+
+    def samples(self) -> list:
+        return [(self.name, self.labels, self.value)]
+
+
+
+class Histogram():
+    """Fixed buckets --> observe() is one bisect and two adds"""
+
+
+    kind = "histogram"
+
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = BUCKETS, threaded: bool = False):
+        """threaded --> observed from several threads (web server), otherwise only the scanner thread writes"""
+
+
+        self.name, self.help, self.labels = name, help, labels
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum    = 0.0
+        self.lock   = threading.Lock() if threaded else None
+
+
+    def observe(self, value: float) -> None:
+
+        i = bisect.bisect_left(self.bounds, value)
+
+        if self.lock:
+            with self.lock: self.counts[i] += 1; self.sum += value
+        else:
+            self.counts[i] += 1; self.sum += value
+
+
+    def samples(self) -> list:
+        """Cumulative buckets, +Inf, sum, count"""
+
+
+        counts, total = list(self.counts), self.sum
+        out, running  = [], 0
+
+        for bound, count in zip(self.bounds + ("+Inf", ), counts):
+            running += count
+            out.append((self.name + "_bucket", self.labels + (("le", str(bound)), ), running))
+
+        out.append((self.name + "_sum", self.labels, total))
+        out.append((self.name + "_count", self.labels, running))
+
+        return out
+
+
+
+class Metrics():
+    """Process wide registry --> instruments created once, collectors read live state at scrape time"""
+
+
+    instruments = {}
+    collectors  = []
+    lock        = threading.Lock()
+
+
+
+    @classmethod
+    def _get(cls, kind, name: str, help: str, labels: dict = None, **kwargs):
+        """Same name + labels --> same instrument"""
+
+
+        labels = tuple(sorted((labels or {}).items()))
+        key    = (name, labels)
+
+        metric = cls.instruments.get(key)
+        if metric is not None: return metric
+
+        with cls.lock: return cls.instruments.setdefault(key, kind(name, help, labels, **kwargs))
+
+
+    @classmethod
+    def counter(cls, name: str, help: str, labels: dict = None) -> Counter:
+        return cls._get(Counter, name, help, labels)
+
+
+    @classmethod
+    def histogram(cls, name: str, help: str, labels: dict = None, buckets: tuple = BUCKETS, threaded: bool = False) -> Histogram:
+        return cls._get(Histogram, name, help, labels, buckets=buckets, threaded=threaded)
+
+
+    @classmethod
+    def stage(cls, stage: str, threaded: bool = False) -> Histogram:
+        """nsm_stage_seconds{stage} --> for stages timed by hand (one observe per batch, not per advertisement)"""
+
+        return cls.histogram("nsm_stage_seconds", "Time spent per call in a scanner stage", {"stage": stage}, threaded=threaded)
+
+
+    @classmethod
+    def errors(cls, stage: str) -> Counter:
+        return cls.counter("nsm_stage_errors_total", "Exceptions raised by a scanner stage", {"stage": stage})
+
+
+    @classmethod
+    def timed(cls, stage: str, threaded: bool = False):
+        """Decorator --> nsm_stage_seconds{stage} per call, nsm_stage_errors_total{stage} when it raises"""
+
+
+        histogram = cls.stage(stage, threaded=threaded)
+        errors    = cls.errors(stage)
+
+        def wrap(func):
+
+            @functools.wraps(func)
+            def timer(*args, **kwargs):
+
+                start = time.perf_counter()
+
+                try: return func(*args, **kwargs)
+                except Exception: errors.inc(); raise
+                finally: histogram.observe(time.perf_counter() - start)
+
+            return timer
+
+        return wrap
+
+
+    @classmethod
+    def collector(cls, func):
+        """func() --> [(name, "gauge" | "counter", help, value, {labels})], read on every scrape"""
+
+        cls.collectors.append(func)
+        return func
+
+
+    @staticmethod
+    def _labels(labels) -> str:
+        """((key, value), ...) --> {key="value",...} with \\, " and newlines escaped"""
+
+
+        if not labels: return ""
+
+        escape = lambda value: str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+        return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels) + "}"
+
+
+    @classmethod
+    def render(cls) -> str:
+        """Prometheus text exposition format 0.0.4"""
+
+
+        families = {}
+
+        for metric in list(cls.instruments.values()):
+            family = families.setdefault(metric.name, [metric.kind, metric.help, []])
+            family[2].extend(metric.samples())
+
+
+        for collect in cls.collectors:
+
+            try: rows = collect()
+            except Exception: continue
+
+            for name, kind, help, value, labels in rows:
+                family = families.setdefault(name, [kind, help, []])
+                family[2].append((name, tuple(sorted((labels or {}).items())), value))
+
+
+        lines = []
+
+        for name, (kind, help, samples) in families.items():
+
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+
+            for sample, labels, value in samples:
+                lines.append(f"{sample}{cls._labels(labels)} {value:.10g}" if isinstance(value, float) else f"{sample}{cls._labels(labels)} {int(value)}")
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,158 @@
+# THIS MODULE WILL SMOOTH RSSI AND DETECT MOVING DEVICES FOR EVERY DEVICE AT ONCE  -->  one numpy pass per cycle
+
+
+
+# ETC IMPORTS
+import time
+from importlib.util import find_spec
+
+
+
+
+class Motion_Engine():
+    """Per device Kalman filter + rolling variance + rate of change, same maths as the old gui/app.js detectMovement"""
+
+
+
+    def __init__(self, window: int = 15, capacity: int = 1024, R: float = 0.008, Q: float = 4, min_samples: int = 8, recent: int = 5, max_std: float = 3, max_change: float = 1.5):
+        """One preallocated (slots x window) ring buffer, slots are recycled when devices are evicted"""
+
+
+        self.window      = window
+        self.R           = R
+        self.Q           = Q
+        self.min_samples = min_samples
+        self.recent      = recent
+        self.max_std     = max_std
+        self.max_change  = max_change
+
+        # OPTIONAL --> without numpy the GUI falls back to its own per tab detection, with it numpy loads on the first cycle
+        self.enabled     = find_spec("numpy") is not None
+        self.np          = None
+        self.capacity    = capacity
+        self.slots       = {}
+        self.free        = []
+        self.pending     = {}
+
+        self.cycles      = 0
+        self.update_ms   = 0.0
+
+
+    def _allocate(self, capacity: int) -> None:
+        """(Re)size every per slot array, existing rows are kept"""
+
+
+        np       = self.np
+        used     = len(self.history) if hasattr(self, "history") else 0
+
+        history  = np.zeros((capacity, self.window), dtype=np.float32)
+        state    = np.zeros(capacity, dtype=np.float32)
+        error    = np.ones(capacity, dtype=np.float32)
+        count    = np.zeros(capacity, dtype=np.int64)
+
+        if used:
+            history[:used] = self.history; state[:used] = self.state; error[:used] = self.error; count[:used] = self.count
+
+        self.history, self.state, self.error, self.count = history, state, error, count
+        self.free.extend(range(capacity - 1, used - 1, -1))
+
+
+    def _slot(self, mac: str) -> int:
+        """MAC --> row, doubling the arrays when every row is taken"""
+
+
+        slot = self.slots.get(mac)
+        if slot is not None: return slot
+
+        if not self.free: self._allocate(len(self.history) * 2)
+
+        slot = self.slots[mac] = self.free.pop()
+        return slot
+
+
+    def release(self, macs) -> None:
+        """Evicted devices --> their rows go back to the free list, reset"""
+
+
+        if not self.enabled: return
+
+        for mac in macs:
+
+            self.pending.pop(mac, None)
+
+            slot = self.slots.pop(mac, None)
+            if slot is None: continue
+
+            self.count[slot] = 0; self.error[slot] = 1
+            self.free.append(slot)
+
+
+    def update(self, records: dict) -> int:
+        """One sample per device heard since the last cycle --> writes rssi_filtered / is_moving into its record"""
+
+
+        if not self.enabled or not self.pending: return 0
+
+        if self.np is None:
+            import numpy
+            self.np = numpy; self._allocate(self.capacity)
+
+        np      = self.np
+        start   = time.perf_counter()
+        pending = self.pending; self.pending = {}
+
+        # PENDING IS ALWAYS A SUBSET OF THE LIVE MAP --> release() drops evicted MACs from it
+        macs    = list(pending)
+        get     = self.slots.get
+        slots   = [get(mac) for mac in macs]
+
+        if None in slots: slots = [self._slot(mac) if slot is None else slot for mac, slot in zip(macs, slots)]
+
+        slots   = np.array(slots, dtype=np.int64)
+        rssi    = np.array(list(pending.values()), dtype=np.float32)
+        count   = self.count[slots]
+
+
+        # KALMAN --> first sample seeds the state, afterwards predict + update
+        first   = count == 0
+        x, P    = self.state[slots], self.error[slots]
+        P_pred  = P + self.R
+        K       = P_pred / (P_pred + self.Q)
+
+        x       = np.where(first, rssi, x + K * (rssi - x))
+        P       = np.where(first, P, (1 - K) * P_pred)
+
+        self.state[slots], self.error[slots] = x, P
+
+
+        # RING BUFFER --> sample n lands in column n % window
+        self.history[slots, count % self.window] = x
+        count  += 1; self.count[slots] = count
+
+        n       = np.minimum(count, self.window)
+        rows    = self.history[slots]
+
+
+        # ROLLING VARIANCE --> masked so half filled rows only count their own samples
+        valid   = np.arange(self.window) < n[:, None]
+        mean    = (rows * valid).sum(axis=1) / n
+        std     = np.sqrt((((rows - mean[:, None]) * valid) ** 2).sum(axis=1) / n)
+
+
+        # RATE OF CHANGE --> mean absolute step over the last `recent` filtered samples, oldest first
+        columns = (count[:, None] - self.recent + np.arange(self.recent)) % self.window
+        recent  = np.take_along_axis(rows, columns, axis=1)
+        change  = np.abs(np.diff(recent, axis=1)).mean(axis=1)
+
+        moving  = (n >= self.min_samples) & ((std > self.max_std) | (change > self.max_change))
+
+
+        for mac, filtered, is_moving in zip(macs, np.round(x.astype(np.float64), 1).tolist(), moving.tolist()):
+
+            record = records.get(mac)
+            if record is not None: record.rssi_filtered = filtered; record.is_moving = is_moving
+
+
+        self.cycles += 1; self.update_ms = (time.perf_counter() - start) * 1000
+        return len(macs)
+
@@ -0,0 +1,331 @@
+# THIS MODULE WILL SPREAD THE SCANNER OVER EVERY CORE  -->  radio loop | enrichment pool | single writer process
+
+
+
+# UI IMPORTS
+from rich.console import Console
+console = Console()
+
+
+# ETC IMPORTS
+import asyncio, multiprocessing, queue, signal, time
+from concurrent.futures import ProcessPoolExecutor
+
+
+# NSM IMPORTS
+from nsm_database import DataBase, Vendor_Index, Enrichment_Cache
+from nsm_metrics import Metrics
+
+
+
+
+# SPAWN --> workers never inherit the web server / alert threads or their locks
+CONTEXT = multiprocessing.get_context("spawn")
+
+
+
+class Stage_Metrics():
+    """Per stage counters --> throughput, busy share, queue depth"""
+
+
+
+    def __init__(self, name: str, depth=None):
+        """depth() --> current queue length feeding this stage"""
+
+
+        self.name      = name
+        self.depth     = depth
+        self.started   = time.monotonic()
+
+        self.items     = 0
+        self.batches   = 0
+        self.busy      = 0.0
+        self.dropped   = 0
+        self.max_depth = 0
+
+
+    def add(self, items: int, seconds: float = 0.0) -> None:
+        """One batch done"""
+
+        self.items += items; self.batches += 1; self.busy += seconds
+        self.sample()
+
+
+    def sample(self) -> int:
+        """Current depth, the high water mark is kept"""
+
+
+        try: depth = self.depth() if self.depth else 0
+        except NotImplementedError: depth = 0
+
+        if depth > self.max_depth: self.max_depth = depth
+
+        return depth
+
+
+    def stats(self) -> dict:
+        """items/s and busy are averaged since the stage started"""
+
+
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+
+        return {
+            "items": self.items, "batches": self.batches, "per_second": round(self.items / elapsed, 1), "busy": round(self.busy / elapsed, 3),
+            "depth": self.sample(), "max_depth": self.max_depth, "dropped": self.dropped,
+        }
+
+
+
+def _init_worker(lookup_socket: str = None) -> None:
+    """Pool worker start --> map the lookup tables once, or only talk to the lookup service"""
+
+
+    # CTRL-C REACHES THE WHOLE PROCESS GROUP --> workers leave on pool shutdown, not mid batch
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # LOOKUP SERVICE --> the tables stay in the service, a worker only loads them if it has to fall back
+    if lookup_socket: from nsm_lookup import Lookup_Client; Vendor_Index.remote = Lookup_Client(path=lookup_socket)
+    else: Vendor_Index.load(); DataBase._company_ids()
+
+
+def _enrich(items: list) -> tuple:
+    """Runs in a pool worker --> ([(manuf, vendor)], seconds spent)"""
+
+
+    start = time.perf_counter()
+
+    return Enrichment_Cache.enrich(items), time.perf_counter() - start
+
+
+def _writer(backend: str, path, jobs, items, busy, batches, written) -> None:
+    """Runs in the writer process --> the only one touching the storage files, leaves on the None sentinel only"""
+
+
+    # CTRL-C REACHES THE WHOLE PROCESS GROUP --> the scanner's last push still needs this process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    DataBase.open_storage(backend=backend, verbose=False, path=path)
+
+    try:
+
+        while True:
+
+            job = jobs.get()
+            if job is None: break
+
+            start = time.perf_counter()
+            DataBase.storage.push(devices=job[0], sightings=job[1])
+
+            with items.get_lock():   items.value   += len(job[0]) + len(job[1])
+            with busy.get_lock():    busy.value    += time.perf_counter() - start
+            with batches.get_lock(): batches.value += 1
+            with written.get_lock(): written.value = DataBase.storage.bytes
+
+
+    finally: DataBase.storage.close()
+
+
+
+class Enrich_Pool():
+    """Receive queue --> batches of cache misses to a process pool --> ingest in arrival order"""
+
+
+
+    def __init__(self, workers: int = 3, batch: int = 512, inflight: int = None, receive: int = 10_000, lookup_socket: str = None):
+        """inflight --> batches handed to the pool but not ingested yet, the backpressure bound"""
+
+
+        self.workers  = workers
+        self.batch    = batch
+        self.pool     = ProcessPoolExecutor(max_workers=workers, mp_context=CONTEXT, initializer=_init_worker, initargs=(lookup_socket, ))
+
+        self.received = asyncio.Queue(maxsize=receive)
+        self.enriched = asyncio.Queue(maxsize=inflight or workers * 2)
+
+        self.metrics  = {
+            "receive": Stage_Metrics("receive", depth=self.received.qsize),
+            "enrich":  Stage_Metrics("enrich",  depth=self.enriched.qsize),
+            "ingest":  Stage_Metrics("ingest"),
+        }
+
+
+    def receiver(self, adapter: str):
+        """detection_callback for one controller --> never blocks the radio, full queue = counted drop"""
+
+
+        received, metrics = self.received, self.metrics["receive"]
+
+        def callback(device, adv):
+
+            try: received.put_nowait((time.time(), device.address, adv, adapter)); metrics.items += 1
+            except asyncio.QueueFull: metrics.dropped += 1
+
+        return callback
+
+
+    async def _batcher(self) -> None:
+        """Drain the receive queue, ship the misses, wait when `inflight` batches are already out"""
+
+
+        loop = asyncio.get_running_loop()
+
+        while True:
+
+            batch = [await self.received.get()]
+            while not self.received.empty() and len(batch) < self.batch: batch.append(self.received.get_nowait())
+
+            misses = Enrichment_Cache.missing([(mac, adv.manufacturer_data) for _, mac, adv, _ in batch])
+            future = loop.run_in_executor(self.pool, _enrich, list(misses.values())) if misses else None
+
+            # BACKPRESSURE --> a full pool stops this loop, then the receive queue fills and the radio callback starts dropping
+            await self.enriched.put((batch, misses, future))
+            self.metrics["receive"].sample()
+
+
+    async def _ingester(self, ingest) -> None:
+        """Batches in the order they were received --> ingest(seen_at, mac, adv, adapter) per advertisement"""
+
+
+        timer = Metrics.stage("ingest")
+
+        while True:
+
+            batch, misses, future = await self.enriched.get()
+
+            if future:
+                results, seconds = await future
+                Enrichment_Cache.store(misses, results)
+                self.metrics["enrich"].add(len(misses), seconds)
+
+            start = time.perf_counter()
+
+            for seen_at, mac, adv, adapter in batch: ingest(seen_at, mac, adv, adapter)
+
+            seconds = time.perf_counter() - start
+            self.metrics["ingest"].add(len(batch), seconds); timer.observe(seconds)
+
+
+    async def run(self, ingest) -> None:
+        """Both stages until cancelled"""
+
+
+        tasks = [asyncio.create_task(self._batcher()), asyncio.create_task(self._ingester(ingest))]
+
+        try: await asyncio.gather(*tasks)
+        finally:
+            for task in tasks: task.cancel()
+
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+
+class Persist_Writer():
+    """Single writer process --> only new / changed records cross over, merged while its queue is full"""
+
+
+
+    def __init__(self, backend: str = "jsonl", maxsize: int = 4, path=None):
+        """maxsize --> pushes waiting for the writer before the scanner starts merging them | path --> None for the database folder"""
+
+
+        self.jobs     = CONTEXT.Queue(maxsize=maxsize)
+        self.items    = CONTEXT.Value("q", 0)
+        self.busy     = CONTEXT.Value("d", 0.0)
+        self.batches  = CONTEXT.Value("q", 0)
+        self.written  = CONTEXT.Value("q", 0)
+        self.process  = CONTEXT.Process(target=_writer, args=(backend, path, self.jobs, self.items, self.busy, self.batches, self.written), name="nsm-writer", daemon=True)
+        self.process.start()
+
+        # WAR_DRIVE COPIES NEVER CHANGE --> identity says whether one was sent already
+        self.sent     = {}
+        self.since    = 0.0
+        self.devices  = {}
+        self.seen     = {}
+
+        self.deferred = 0
+        self.queued   = 0
+        self.metrics  = Stage_Metrics("persist", depth=self.jobs.qsize)
+
+
+    def _collect(self, devices: dict, sightings: dict = None) -> None:
+        """Merge everything new since the last call into the pending push"""
+
+
+        for key, device in list(devices.items()):
+            if self.sent.get(key) is not device: self.sent[key] = device; self.devices[key] = device
+
+        newest = self.since
+
+        # LIVE RECORDS ARE MUTATED IN PLACE --> copied before another process pickles them
+        for mac, device in list((sightings or {}).items()):
+
+            up_time = device.up_time or 0
+            if up_time <= self.since: continue
+
+            self.seen[mac] = device.copy(); newest = max(newest, up_time)
+
+        self.since = newest
+
+
+    def submit(self, devices: dict, sightings: dict = None) -> int:
+        """Queue everything new since the last call --> number of records queued, 0 while the writer is behind"""
+
+
+        self._collect(devices, sightings)
+        if not self.devices and not self.seen: return 0
+
+
+        try: self.jobs.put_nowait((self.devices, self.seen))
+
+        # WRITER BEHIND --> keep merging, the latest state per MAC wins, memory stays bounded by the device count
+        except queue.Full: self.deferred += 1; return 0
+
+        count = len(self.devices) + len(self.seen)
+        self.devices, self.seen = {}, {}
+        self.queued += count
+
+        return count
+
+
+    def stats(self) -> dict:
+        """Counters from the writer process + this side's queue"""
+
+
+        self.metrics.items, self.metrics.batches, self.metrics.busy, self.metrics.dropped = self.items.value, self.batches.value, self.busy.value, self.deferred
+
+        return {**self.metrics.stats(), "pending": len(self.devices) + len(self.seen), "bytes": self.written.value}
+
+
+    def close(self, devices: dict = None, sightings: dict = None, timeout: float = 30) -> int:
+        """Last push, waiting for queue space this time, then let the writer finish --> records that never reached the storage"""
+
+
+        self._collect(devices or {}, sightings)
+
+        deadline = time.monotonic() + timeout
+        last     = (self.devices, self.seen) if self.devices or self.seen else None
+        count    = len(self.devices) + len(self.seen)
+
+        for job in (last, None) if last else (None, ):
+
+            # WRITER GONE OR STUCK --> never block on a pipe nobody reads
+            if not self.process.is_alive(): break
+
+            try: self.jobs.put(job, timeout=max(0.1, deadline - time.monotonic()))
+            except queue.Full: break
+
+            if job is not None: self.queued += count; self.devices, self.seen = {}, {}
+
+
+        self.process.join(max(0, deadline - time.monotonic()))
+        if self.process.is_alive(): self.process.terminate(); self.process.join(1)
+
+        # A DEAD READER LEAVES THE QUEUE'S FEEDER THREAD BLOCKED --> do not let it hold the interpreter at exit
+        if self.process.exitcode != 0: self.jobs.cancel_join_thread()
+
+        lost = max(0, self.queued - self.items.value) + len(self.devices) + len(self.seen)
+        if lost: console.print(f"[bold red][!] Writer process exited with {lost} records not stored (exit code {self.process.exitcode})")
+
+        return lost
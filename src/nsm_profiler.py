@@ -0,0 +1,167 @@
+# THIS MODULE WILL PROFILE THE SCANNER WHILE IT RUNS  -->  one cycle under cProfile every N + a tracemalloc diff, last few kept on disk
+
+
+
+# UI IMPORTS
+from rich.console import Console
+console = Console()
+
+
+# ETC IMPORTS
+import cProfile, io, pstats, threading, time, tracemalloc
+from collections import deque
+from pathlib import Path
+
+
+
+
+class Profiler():
+    """Every `every` scan cycles (or on request) --> the next cycle runs under cProfile, then .prof + .txt report with the allocation growth since the last dump"""
+
+
+    path = Path(__file__).parent.parent / "database" / "profiles"
+
+
+
+    def __init__(self, every: int = 12, keep: int = 5, top: int = 25, frames: int = 1, path: Path = None):
+        """every=0 --> only /debug/profile captures | frames --> tracemalloc traceback depth, 1 keeps tracing cheap"""
+
+
+        self.every    = every
+        self.keep     = keep
+        self.top      = top
+        self.path     = Path(path or self.path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self.cycles    = 0
+        self.captures  = 0
+        self.active    = None
+        self.window    = None
+        self.requested = False
+        self.dumps     = deque(maxlen=keep)
+        self.ready     = threading.Condition()
+
+        # ALLOCATIONS ARE TRACED THE WHOLE RUN --> every dump is diffed against the one before it
+        if not tracemalloc.is_tracing(): tracemalloc.start(frames)
+        self.previous = self._snapshot()
+
+
+    @staticmethod
+    def _snapshot():
+        """tracemalloc snapshot without the profiler's own bookkeeping"""
+
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+
+    def request(self, timeout: float = None) -> dict:
+        """Capture the next full cycle --> its summary once dumped, None when timeout runs out first"""
+
+
+        with self.ready:
+
+            # A CAPTURE ALREADY RUNNING STARTED MID REQUEST --> wait for the one after it
+            target = self.captures + (2 if self.active else 1)
+            self.requested = True
+
+            self.ready.wait_for(lambda: self.captures >= target, timeout)
+
+            return self.dumps[-1] if self.captures >= target else None
+
+
+    def tick(self) -> None:
+        """End of a scan cycle, scanner thread only --> finish a running capture, start the next one when due"""
+
+
+        self.cycles += 1
+
+        if self.active: self._dump()
+
+        with self.ready:
+            due = self.requested or (self.every and self.cycles % self.every == 0)
+            self.requested = False
+
+        if not due: return
+
+        self.window = (self.cycles + 1, time.time(), time.perf_counter())
+        self.active = cProfile.Profile(); self.active.enable()
+
+
+    def _dump(self) -> None:
+        """Running capture --> <stamp>.prof (pstats / snakeviz) + <stamp>.txt, oldest files beyond `keep` removed"""
+
+
+        profile, self.active = self.active, None
+        profile.disable()
+
+        cycle, started, start = self.window
+        seconds = time.perf_counter() - start
+        name    = f"profile_{time.strftime('%Y%m%d-%H%M%S', time.localtime(started))}_c{cycle}"
+
+        profile.dump_stats(self.path / f"{name}.prof")
+
+
+        # SLOWEST CALL TREES --> cumulative time per function over the captured cycle
+        report = io.StringIO()
+        stats  = pstats.Stats(profile, stream=report).sort_stats("cumulative")
+        stats.print_stats(self.top)
+
+        ranked    = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top]
+        functions = [
+            {"function": f"{Path(file).name}:{line}({func})", "calls": calls, "total_ms": round(total * 1000, 3), "cumulative_ms": round(cumulative * 1000, 3)}
+            for (file, line, func), (_, calls, total, cumulative, _) in ranked
+        ]
+
+
+        # GROWTH SINCE THE LAST DUMP --> what keeps allocating as the drive goes on
+        snapshot      = self._snapshot()
+        growth        = snapshot.compare_to(self.previous, "lineno")[:self.top]
+        self.previous = snapshot
+        traced, peak  = tracemalloc.get_traced_memory()
+
+        allocations = [
+            {"line": str(stat.traceback[0]), "size_kb": round(stat.size / 1024, 1), "growth_kb": round(stat.size_diff / 1024, 1), "count": stat.count, "count_growth": stat.count_diff}
+            for stat in growth
+        ]
+
+
+        with open(self.path / f"{name}.txt", "w") as file:
+            file.write(f"cycle {cycle}, {seconds:.3f} s profiled, traced {traced / 1024:.0f} KiB (peak {peak / 1024:.0f} KiB)\n\n")
+            file.write(report.getvalue())
+            file.write(f"\nTop {self.top} allocation growth since the previous dump\n\n")
+            for stat in growth: file.write(f"{stat}\n")
+
+
+        summary = {
+            "cycle": cycle, "at": started, "seconds": round(seconds, 3), "file": str(self.path / f"{name}.prof"),
+            "traced_kb": round(traced / 1024, 1), "peak_kb": round(peak / 1024, 1), "functions": functions, "allocations": allocations,
+        }
+
+        self._rotate()
+
+        with self.ready:
+            self.dumps.append(summary); self.captures += 1
+            self.ready.notify_all()
+
+        console.print(f"[bold green][+] Profile written:[bold yellow] {name}.prof / .txt ({seconds:.2f} s, {traced / 1024:.0f} KiB traced)")
+
+
+    def _rotate(self) -> None:
+        """Rolling window --> only the newest `keep` dumps stay on disk"""
+
+
+        for old in sorted(self.path.glob("profile_*.prof"))[:-self.keep or None]:
+            old.unlink(missing_ok=True); old.with_suffix(".txt").unlink(missing_ok=True)
+
+
+    def close(self) -> None:
+        """Drop a capture still running, stop tracing, wake anyone waiting on /debug/profile"""
+
+
+        if self.active: self.active.disable(); self.active = None
+        if tracemalloc.is_tracing(): tracemalloc.stop()
+
+        with self.ready: self.ready.notify_all()
@@ -0,0 +1,404 @@
+# THIS MODULE WILL HOLD THE SCANNER BACKENDS  -->  real radios (bleak) or a fake one for testing without hardware
+
+
+
+# ETC IMPORTS
+import asyncio, json, random, time, zlib
+from pathlib import Path
+
+
+
+
+class Fake_Device():
+    """Stand in for bleak's BLEDevice"""
+
+
+    __slots__ = ("address", "name")
+
+    def __init__(self, address: str, name: str = None):
+        self.address = address; self.name = name
+
+
+
+class Fake_Advertisement():
+    """Stand in for bleak's AdvertisementData"""
+
+
+    __slots__ = ("local_name", "rssi", "manufacturer_data", "service_uuids", "service_data", "tx_power", "appearance")
+
+    def __init__(self, rssi: int, manufacturer_data: dict = None, local_name: str = None, service_uuids: list = None, service_data: dict = None, tx_power: int = None, appearance: int = None):
+        self.rssi              = rssi
+        self.local_name        = local_name
+        self.manufacturer_data = manufacturer_data or {}
+        self.service_uuids     = service_uuids or []
+        self.service_data      = service_data or {}
+        self.tx_power          = tx_power
+        self.appearance        = appearance
+
+
+
+class Fake_Scanner():
+    """Hardware free BleakScanner --> same seeded population on every adapter, RSSI differs per adapter"""
+
+
+    # REAL OUIS + COMPANY IDS SO THE ENRICHMENT PATH DOES REAL WORK
+    profiles = (
+        ("F4:0F:24", {76: bytes.fromhex("10063b1d0a0b0c")},  None,          ["0000fd6f-0000-1000-8000-00805f9b34fb"]),
+        ("AC:BC:32", {76: bytes.fromhex("12020002")},        None,          []),
+        ("00:1B:C5", {6:  bytes.fromhex("0109200211")},      "Surface Pen", []),
+        ("8C:F5:A3", {117: bytes.fromhex("4204010166")},     "Galaxy Buds", []),
+        ("F4:EA:B5", {},                                     None,          ["0000fe9f-0000-1000-8000-00805f9b34fb"]),
+        ("C0:28:8D", {343: bytes.fromhex("0101")},           "Mi Band",     ["0000fe95-0000-1000-8000-00805f9b34fb"]),
+    )
+
+
+    def __init__(self, detection_callback=None, adapter: str = None, devices: int = 60, rate: float = 2.0, seed: int = 1337, **kwargs):
+        """devices --> population size | rate --> advertisements per device per second"""
+
+
+        self.callback = detection_callback
+        self.adapter  = adapter
+        self.rate     = rate
+        self.task     = None
+        self.offset   = zlib.crc32(str(adapter).encode()) % 15
+        self.random   = random.Random(f"{seed}-{adapter}")
+        self.discovered_devices_and_advertisement_data = {}
+
+        population = random.Random(seed)
+        self.population = []
+
+        for i in range(devices):
+
+            prefix, manuf, name, uuids = population.choice(self.profiles)
+            mac  = prefix + "".join(f":{population.randrange(256):02X}" for _ in range(3))
+
+            self.population.append((mac, manuf, name, uuids, population.randint(-95, -40)))
+
+
+    def _advertise(self, mac: str, manuf: dict, name: str, uuids: list, rssi: int) -> None:
+        """One advertisement --> discovered dict + detection_callback, like bleak does"""
+
+
+        device = Fake_Device(address=mac, name=name)
+        adv    = Fake_Advertisement(rssi=rssi - self.offset + self.random.randint(-4, 4), manufacturer_data=manuf, local_name=name, service_uuids=uuids)
+
+        self.discovered_devices_and_advertisement_data[mac] = (device, adv)
+        if self.callback: self.callback(device, adv)
+
+
+    async def _run(self, tick: float = 0.1) -> None:
+        """Emit advertisements until stopped"""
+
+
+        while True:
+
+            for mac, manuf, name, uuids, rssi in self.population:
+                if self.random.random() < self.rate * tick: self._advertise(mac, manuf, name, uuids, rssi)
+
+            await asyncio.sleep(tick)
+
+
+    async def start(self) -> None:
+        self.discovered_devices_and_advertisement_data = {}
+        self.task = asyncio.ensure_future(self._run())
+
+
+    async def stop(self) -> None:
+        if self.task: self.task.cancel(); self.task = None
+
+
+
+class Synthetic_Scanner():
+    """Load generator --> configurable population, churn, random MACs / payloads, RSSI random walk"""
+
+
+    # (company id, payload builder) --> realistic manufacturer data shapes
+    payloads = (
+        (76,  lambda r: bytes([0x10, 0x05]) + r.randbytes(5)),          # Apple Nearby
+        (76,  lambda r: bytes([0x12, 0x02, 0x00, r.choice((0, 2, 3))])), # Apple Find My / setup
+        (6,   lambda r: bytes([0x01, 0x09, 0x20, 0x02]) + r.randbytes(4)),
+        (117, lambda r: bytes([0x42, 0x04]) + r.randbytes(6)),
+        (224, lambda r: r.randbytes(8)),
+        (89,  lambda r: r.randbytes(4)),
+        (None, None),
+    )
+
+    names = ("iPhone", "Galaxy S24", "Pixel 8", "JBL Flip 6", "Tile", "Mi Band 7", "LE-Bose QC45", "Fitbit Charge")
+    ouis  = ("F4:0F:24", "AC:BC:32", "00:1B:C5", "8C:F5:A3", "F4:EA:B5", "C0:28:8D", "3C:5A:B4", "D8:A3:5C")
+    uuids = ("0000fd6f-0000-1000-8000-00805f9b34fb", "0000fe9f-0000-1000-8000-00805f9b34fb", "0000fdc0-0000-1000-8000-00805f9b34fb", "0000180f-0000-1000-8000-00805f9b34fb")
+
+    # (appearance, service data builder) --> watches / tags / sensors that put readings in the advertisement
+    sensors = (
+        (0x0C1, lambda r: {"0000180f-0000-1000-8000-00805f9b34fb": bytes([r.randint(5, 100)])}),
+        (0x540, lambda r: {"00002a6e-0000-1000-8000-00805f9b34fb": r.randint(-500, 3500).to_bytes(2, "little", signed=True)}),
+        (0x941, lambda r: {"0000fe9f-0000-1000-8000-00805f9b34fb": r.randbytes(6)}),
+    )
+
+
+
+    def __init__(self, detection_callback=None, adapter: str = None, devices: int = 1000, rate: float = 1.0, churn: float = 0.01, rotate: float = 0, seed: int = 1337, **kwargs):
+        """devices --> live population | rate --> adv per device per second | churn --> fraction of the population replaced per second
+        | rotate --> seconds between address rotations of the private random MACs (0 = never), same device, new address"""
+
+
+        self.callback = detection_callback
+        self.adapter  = adapter
+        self.rate     = rate
+        self.churn    = churn
+        self.rotate   = rotate
+        self.rotated  = 0.0
+        self.task     = None
+        self.random   = random.Random(f"{seed}-{adapter}")
+        self.offset   = zlib.crc32(str(adapter).encode()) % 10
+        self.born     = 0.0
+        self.emitted  = 0
+        self.discovered_devices_and_advertisement_data = {}
+
+        # SAME SEED ON EVERY ADAPTER --> every controller hears the same population
+        self.world      = random.Random(seed)
+        self.population = [self._spawn() for _ in range(devices)]
+
+
+    def _spawn(self) -> list:
+        """New device --> [mac, manufacturer data, name, uuids, rssi, appearance, service data builder]"""
+
+
+        r = self.world
+
+        # MOSTLY PRIVATE RANDOM ADDRESSES LIKE REAL PHONES, SOME PUBLIC OUIS
+        if r.random() < 0.6: mac = self._private()
+        else:                mac = r.choice(self.ouis) + "".join(f":{r.randrange(256):02X}" for _ in range(3))
+
+        company, build = r.choice(self.payloads)
+        manuf = {company: build(r)} if company is not None else {}
+        name  = r.choice(self.names) if r.random() < 0.2 else None
+        uuids = [r.choice(self.uuids)] if r.random() < 0.3 else []
+        appearance, sensor = r.choice(self.sensors) if r.random() < 0.1 else (None, None)
+
+        return [mac, manuf, name, uuids, r.randint(-95, -40), appearance, sensor]
+
+
+    def _private(self) -> str:
+        """Resolvable private address --> top bits 01"""
+
+        return ":".join(f"{b:02X}" for b in bytes([0x40 | self.world.randrange(0x40)]) + self.world.randbytes(5))
+
+
+    def emit(self, count: int) -> list:
+        """count advertisements from random live devices, RSSI walks one step each time"""
+
+
+        out = []
+        r   = self.random
+
+        for device in r.choices(self.population, k=count):
+
+            device[4] = min(-30, max(-100, device[4] + r.randint(-3, 3)))
+
+            mac, manuf, name, uuids, rssi, appearance, sensor = device
+            dev = Fake_Device(address=mac, name=name)
+            adv = Fake_Advertisement(rssi=rssi - self.offset, manufacturer_data=manuf, local_name=name, service_uuids=uuids, service_data=sensor(r) if sensor else None, appearance=appearance)
+
+            self.discovered_devices_and_advertisement_data[mac] = (dev, adv)
+            out.append((dev, adv))
+
+        self.emitted += count
+
+        return out
+
+
+    def turnover(self, seconds: float) -> int:
+        """Replace churn * population * seconds devices --> returns how many"""
+
+
+        self.born += self.churn * len(self.population) * seconds
+        count, self.born = int(self.born), self.born - int(self.born)
+
+        for _ in range(count): self.population[self.world.randrange(len(self.population))] = self._spawn()
+
+
+        # ROTATION --> on average every private address changes once per `rotate` seconds, payload shape and RSSI stay
+        if self.rotate:
+
+            self.rotated += len(self.population) * seconds / self.rotate
+            due, self.rotated = int(self.rotated), self.rotated - int(self.rotated)
+
+            for _ in range(due):
+                device = self.population[self.world.randrange(len(self.population))]
+                if int(device[0][:2], 16) & 0xC0 == 0x40: device[0] = self._private()
+
+        return count
+
+
+    async def _run(self, tick: float = 0.1) -> None:
+        """Emit advertisements until stopped"""
+
+
+        owed = 0.0
+
+        while True:
+
+            self.turnover(tick)
+
+            owed += self.rate * len(self.population) * tick
+            count, owed = int(owed), owed - int(owed)
+
+            for device, adv in self.emit(count):
+                if self.callback: self.callback(device, adv)
+
+            await asyncio.sleep(tick)
+
+
+    async def start(self) -> None:
+        self.discovered_devices_and_advertisement_data = {}
+        self.task = asyncio.ensure_future(self._run())
+
+
+    async def stop(self) -> None:
+        if self.task: self.task.cancel(); self.task = None
+
+
+
+class Replay_Scanner():
+    """Replays a recorded session --> Recorder .jsonl files or a --db sqlite session"""
+
+
+    def __init__(self, detection_callback=None, adapter: str = None, replay: str = None, speed: float = 1.0, session: int = None, **kwargs):
+        """speed --> 1.0 real time, 0 as fast as possible"""
+
+
+        if not replay: raise ValueError("replay backend needs a recording, use --replay FILE")
+
+        self.callback = detection_callback
+        self.adapter  = adapter
+        self.path     = Path(replay)
+        self.speed    = speed
+        self.session  = session
+        self.task     = None
+        self.done     = False
+        self.discovered_devices_and_advertisement_data = {}
+
+
+    def _records(self):
+        """--> (ts, mac, rssi, manufacturer data, name, uuids, adapter, service data)"""
+
+
+        if self.path.suffix in (".sqlite3", ".sqlite", ".db"):
+
+            import sqlite3
+            conn = sqlite3.connect(str(self.path))
+            session = self.session or conn.execute("SELECT MAX(id) FROM sessions").fetchone()[0]
+            rows = conn.execute("SELECT s.ts, s.mac, s.rssi, d.name, d.uuid FROM sightings s LEFT JOIN devices d ON d.mac = s.mac WHERE s.session_id = ? ORDER BY s.ts", (session, ))
+
+            for ts, mac, rssi, name, uuid in rows: yield ts, mac, rssi, {}, name, json.loads(uuid) if uuid else [], None, {}
+
+            conn.close(); return
+
+
+        with open(self.path, "r") as file:
+
+            for line in file:
+
+                try: record = json.loads(line)
+                except json.JSONDecodeError: continue
+
+                manuf   = {int(key): bytes.fromhex(value) for key, value in (record.get("manuf") or {}).items()}
+                service = {key: bytes.fromhex(value) for key, value in (record.get("service_data") or {}).items()}
+                yield record["ts"], record["addr"], record["rssi"], manuf, record.get("name"), record.get("uuids") or [], record.get("adapter"), service
+
+
+    async def _run(self) -> None:
+        """Emit the recording with its original spacing divided by speed"""
+
+
+        first = None; start = time.monotonic(); n = 0
+
+        for ts, mac, rssi, manuf, name, uuids, adapter, service in self._records():
+
+            # RECORDED WITH SEVERAL CONTROLLERS --> each scanner replays its own
+            if self.adapter and adapter and adapter != self.adapter: continue
+
+            first = ts if first is None else first
+
+            if self.speed:
+                wait = (ts - first) / self.speed - (time.monotonic() - start)
+                if wait > 0: await asyncio.sleep(wait)
+
+            elif n % 1000 == 0: await asyncio.sleep(0)
+
+            device = Fake_Device(address=mac, name=name)
+            adv    = Fake_Advertisement(rssi=rssi, manufacturer_data=manuf, local_name=name, service_uuids=uuids, service_data=service)
+
+            self.discovered_devices_and_advertisement_data[mac] = (device, adv)
+            if self.callback: self.callback(device, adv)
+            n += 1
+
+        self.done = True
+
+
+    async def start(self) -> None:
+        self.discovered_devices_and_advertisement_data = {}
+        if self.task is None: self.task = asyncio.ensure_future(self._run())
+
+
+    async def stop(self) -> None:
+        # A CYCLE ENDING DOES NOT REWIND THE TAPE --> only cancel once the session is over
+        if self.task and self.done: self.task.cancel()
+
+
+
+class Recorder():
+    """Writes every advertisement to a .jsonl file the replay backend can read back"""
+
+
+    def __init__(self, path: str):
+        self.file = open(path, "a", buffering=1 << 16)
+
+
+    def wrap(self, adapter: str, callback):
+        """detection_callback --> same callback that also records"""
+
+
+        def recorder(device, adv):
+
+            self.file.write(json.dumps({
+                "ts": time.time(), "addr": device.address, "rssi": adv.rssi, "adapter": adapter, "name": adv.local_name,
+                "manuf": {str(key): value.hex() for key, value in (adv.manufacturer_data or {}).items()}, "uuids": list(adv.service_uuids or []),
+                "service_data": {key: bytes(value).hex() for key, value in (adv.service_data or {}).items()},
+            }) + "\n")
+
+            if callback: callback(device, adv)
+
+        return recorder
+
+
+    def close(self) -> None:
+        self.file.close()
+
+
+
+class Scanners():
+    """Backend name --> scanner instance"""
+
+
+    backends = ("bleak", "fake", "synthetic", "replay")
+    recorder = None
+
+
+
+    @classmethod
+    def create(cls, backend: str = "bleak", adapter: str = None, detection_callback=None, **kwargs):
+        """One scanner for one controller"""
+
+
+        if cls.recorder: detection_callback = cls.recorder.wrap(adapter, detection_callback)
+
+        if backend == "fake":      return Fake_Scanner(detection_callback=detection_callback, adapter=adapter, **kwargs)
+        if backend == "synthetic": return Synthetic_Scanner(detection_callback=detection_callback, adapter=adapter, **kwargs)
+        if backend == "replay":    return Replay_Scanner(detection_callback=detection_callback, adapter=adapter, **kwargs)
+
+
+        from bleak import BleakScanner
+
+        if adapter: return BleakScanner(detection_callback=detection_callback, adapter=adapter)
+        return BleakScanner(detection_callback=detection_callback)
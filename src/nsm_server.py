@@ -7,12 +7,17 @@ console = Console()
 
 
 # ETC IMPORTS
-from http.server import HTTPServer, SimpleHTTPRequestHandler
-import json, os; from pathlib import Path
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+import json, os, time; from pathlib import Path
+from urllib.parse import urlsplit, parse_qs, unquote
 
 
 # NSM IMPORTS
 from nsm_mesh_finder import BLE_Sniffer
+from nsm_database import DataBase
+from nsm_storage import SQLite_Storage
+from nsm_device import Device
+from nsm_metrics import Metrics
 
 
 
@@ -20,34 +25,217 @@ class HTTP_Handler(SimpleHTTPRequestHandler):
     """This class will handle/server http traffic"""
 
 
+    # KEEP ALIVE --> polling clients reuse one connection instead of a handshake per second
+    protocol_version = "HTTP/1.1"
+
+    # /metrics LABELS --> every other path (gui files, typos, scanners) collapses into "static"
+    routes = ("/api/devices", "/api/pipeline", "/api/trackers", "/api/wardriving", "/metrics", "/debug/profile")
+
 
     def log_message(self, fmt, *args):
         """Silence HTTP server logs"""
         pass
 
     def do_GET(self) -> None:
+        """Every request timed per route --> nsm_http_request_seconds{route}, event streams only counted"""
+
+
+        url = urlsplit(self.path)
+
+        if url.path == "/api/stream":
+            Metrics.counter("nsm_http_streams_total", "/api/stream connections opened").inc()
+            return self._route(url)
+
+        if url.path in self.routes: route = url.path
+        elif url.path.startswith("/api/devices/") and url.path.endswith("/history"): route = "/api/devices/{mac}/history"
+        else: route = "static"
+
+        start = time.perf_counter()
+
+        try: self._route(url)
+        finally: Metrics.histogram("nsm_http_request_seconds", "HTTP request handling time per route", {"route": route}, threaded=True).observe(time.perf_counter() - start)
+
+
+    def _route(self, url) -> None:
         """This will handle basic web server requests"""
 
 
-        if self.path == "/api/devices":
+        query = {key: value[0] for key, value in parse_qs(url.query).items()}
 
-            self.send_response(200)
-            self.send_header("content-type", "application/json")
-            self.send_header("Access-Control-Allow-Origin", '*')
-            self.end_headers()
 
-            self.wfile.write(json.dumps(BLE_Sniffer.live_map).encode())
+        if url.path == "/api/devices": self._send_snapshot(BLE_Sniffer.snapshot)
+
+        elif url.path.startswith("/api/devices/") and url.path.endswith("/history"): self._send_history(url.path, query)
+
+        elif url.path == "/api/stream": self._send_stream(BLE_Sniffer.feed, BLE_Sniffer.snapshot, last_id=self.headers.get("Last-Event-ID") or query.get("since"))
+
+        elif url.path == "/api/pipeline": self._send_json(json.dumps(BLE_Sniffer.pipeline_stats()).encode())
+
+        elif url.path == "/api/trackers": self._send_json(json.dumps(BLE_Sniffer.trackers.snapshot()).encode())
+
+        elif url.path == "/metrics": self._send_metrics()
+
+        elif url.path == "/debug/profile": self._send_profile(query)
+
+        elif url.path == "/api/wardriving":
+
+            # SQLITE BACKEND --> indexed query instead of dumping the whole session
+            if isinstance(DataBase.storage, SQLite_Storage):
+
+                try:
+                    filters = {key: query[key] for key in ("mac", "vendor", "manuf", "since", "until", "limit") if key in query}
+                    data    = DataBase.storage.query(**filters)
+
+                except ValueError as e: self.send_error(400, str(e)); return
+
+                self._send_json(json.dumps(data).encode())
+
+            # COPY FIRST --> the scanner keeps adding to war_drive while we encode
+            else: self._send_json(Device.encode_map(dict(BLE_Sniffer.war_drive)).encode())
+
+        else: super().do_GET()
+
+
+    def _send_history(self, path: str, query: dict) -> None:
+        """/api/devices/<mac>/history?since=&until= --> downsampled RSSI curve"""
+
+
+        if not BLE_Sniffer.history: self.send_error(404, "Sighting log disabled"); return
+
+        mac = unquote(path[len("/api/devices/"):-len("/history")]).upper()
+
+        try: data = BLE_Sniffer.history.history(mac=mac, since=query.get("since"), until=query.get("until"))
+        except ValueError as e: self.send_error(400, str(e)); return
+
+        self._send_json(json.dumps(data, separators=(",", ":")).encode())
+
+
+    def _accepts_gzip(self) -> bool:
+        """Accept-Encoding negotiation --> gzip unless the client says q=0"""
+
+
+        for coding in self.headers.get("Accept-Encoding", "").split(","):
+
+            name, _, params = coding.partition(";")
+            if name.strip().lower() not in ("gzip", "*"): continue
+
+            try: return float(params.strip().partition("=")[2] or 1) > 0
+            except ValueError: return True
+
+        return False
+
+
+    def _send_json(self, body: bytes, etag: str = None, encoding: str = None) -> None:
+        """200 with an explicit length --> required for keep alive"""
+
+
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("Access-Control-Allow-Origin", '*')
+        self.send_header("Content-Length", str(len(body)))
+
+        if etag:     self.send_header("ETag", etag); self.send_header("Cache-Control", "no-cache")
+        if encoding: self.send_header("Content-Encoding", encoding)
+        if etag or encoding: self.send_header("Vary", "Accept-Encoding")
+
+        self.end_headers()
+        self.wfile.write(body)
+
 
-        elif self.path == "/api/wardriving":
+    def _send_profile(self, query: dict) -> None:
+        """/debug/profile?wait=30 --> profile the next scan cycle, its summary once dumped (wait=0 only schedules it)"""
 
-            self.send_response(200)
-            self.send_header("content-type", "application/json")
+
+        if not BLE_Sniffer.profiler: self.send_error(404, "Profiling disabled, start with --profile"); return
+
+        try: wait = min(max(float(query.get("wait", 30)), 0), 300)
+        except ValueError as e: self.send_error(400, str(e)); return
+
+        capture = BLE_Sniffer.profiler.request(timeout=wait)
+
+        self._send_json(json.dumps({"capture": capture, "recent": [dump["file"] for dump in BLE_Sniffer.profiler.dumps]}).encode())
+
+
+    def _send_metrics(self) -> None:
+        """Prometheus text format, rendered per scrape"""
+
+
+        body = Metrics.render().encode()
+
+        self.send_response(200)
+        self.send_header("content-type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def _send_snapshot(self, snapshot) -> None:
+        """Shared pre serialised bytes --> 304 when the client already has this version"""
+
+
+        gzipped    = self._accepts_gzip()
+        body, etag = snapshot.read(gzipped=gzipped)
+
+
+        # UNCHANGED SINCE THE LAST POLL --> headers only
+        if etag in (tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")):
+
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
             self.send_header("Access-Control-Allow-Origin", '*')
             self.end_headers()
+            return
 
-            self.wfile.write(json.dumps(BLE_Sniffer.war_drive).encode())
+        self._send_json(body, etag=etag, encoding="gzip" if gzipped else None)
 
-        else: super().do_GET()
+
+    def _send_stream(self, feed, snapshot, last_id: str = None, keepalive: float = 15) -> None:
+        """text/event-stream --> snapshot (or missed batches) then every new batch until the client leaves"""
+
+
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", '*')
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        self.close_connection = True
+
+
+        with feed.ready: backlog, seq = feed.since(last_id), feed.seq
+
+
+        try:
+
+            # RESUME IF WE STILL HOLD EVERYTHING THEY MISSED --> otherwise start them over from the full map
+            self.wfile.write(b"retry: 2000\n\n")
+
+            if backlog is None: self.wfile.write(feed.snapshot(body=snapshot.read()[0], seq=seq))
+            else:
+                for batch in backlog: self.wfile.write(batch)
+
+            self.wfile.flush()
+
+
+            while True:
+
+                with feed.ready:
+                    feed.ready.wait_for(lambda: feed.seq > seq, timeout=keepalive)
+                    backlog, latest = feed.since(f"{feed.token}:{seq}"), feed.seq
+
+
+                # FELL OUT OF THE HISTORY WHILE WE WERE WRITING --> full map again
+                if backlog is None: self.wfile.write(feed.snapshot(body=snapshot.read()[0], seq=latest))
+                elif backlog:
+                    for batch in backlog: self.wfile.write(batch)
+                else: self.wfile.write(b": keepalive\n\n")
+
+                self.wfile.flush(); seq = latest
+
+
+        except (BrokenPipeError, ConnectionResetError): return
 
 
 
@@ -58,16 +246,30 @@ class Web_Server():
 
 
     @staticmethod
-    def start(CONSOLE, address:str="0.0.0.0", port:int=8000) -> None:
-        """This method will start the web server"""
+    def create(address:str="0.0.0.0", port:int=8000) -> ThreadingHTTPServer:
+        """Server bound to address / port, gui/ as the document root, one thread per connection"""
 
         gui_path = str(Path(__file__).parent.parent / "gui" )
         os.chdir(gui_path)
 
-        server = HTTPServer(server_address=(address,port), RequestHandlerClass=HTTP_Handler) 
+        # SOMEONE IS LISTENING --> the scanner starts serialising snapshots + deltas
+        BLE_Sniffer.snapshot.active = True
+        BLE_Sniffer.feed.active     = True
+
+        server = ThreadingHTTPServer(server_address=(address,port), RequestHandlerClass=HTTP_Handler)
+        server.daemon_threads = True
+
+        return server
+
+
+    @staticmethod
+    def start(CONSOLE, address:str="0.0.0.0", port:int=8000) -> None:
+        """This method will start the web server"""
+
+        server = Web_Server.create(address=address, port=port)
         
         CONSOLE.print(f"[bold green][+] Successfully Launched web server")
         CONSOLE.print(f"[bold green][+] Starting Web_Server on:[bold yellow] http://localhost:{port}")
-        server.serve_forever(poll_interval=2)
+        server.serve_forever(poll_interval=0.5)
     
 
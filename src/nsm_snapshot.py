@@ -0,0 +1,167 @@
+# THIS MODULE WILL HOLD PRE SERIALISED SNAPSHOTS + DELTAS SHARED BY EVERY WEB CLIENT
+
+
+
+# ETC IMPORTS
+import gzip, json, os, threading, time
+from collections import OrderedDict, deque
+
+
+
+
+class Snapshot():
+    """Immutable JSON bytes of one dict --> built once per update, read by any number of server threads"""
+
+
+
+    def __init__(self, encode=None, empty: bytes = b"{}"):
+        """encode(data) --> JSON text, nothing is serialised until a web server asks for it"""
+
+
+        self.encode    = encode or (lambda data: json.dumps(dict(data), separators=(",", ":")))
+        self.lock      = threading.Lock()
+        self.zip_lock  = threading.Lock()
+        self.active    = False
+        self.version   = 0
+        self.body      = empty
+        self.gzipped   = None
+        self.published = 0.0
+
+        # PER PROCESS TOKEN --> a restarted scanner never matches a stale browser ETag
+        self.token     = os.urandom(4).hex()
+        self.etag      = f'"{self.token}-0"'
+
+        self.builds    = 0
+        self.build_ms  = 0.0
+
+
+    def publish(self, data: dict, version: int) -> bool:
+        """Called by the thread that mutates data --> serialise only if something changed since the last build"""
+
+
+        if not self.active or version == self.version: return False
+
+        start = time.perf_counter()
+        body  = self.encode(data).encode()
+
+
+        # ONE REFERENCE SWAP --> readers see either the old (body, etag) or the new one, never half
+        with self.lock:
+            self.body, self.gzipped, self.version = body, None, version
+            self.etag      = f'"{self.token}-{version}"'
+            self.published = time.time()
+
+        self.builds += 1; self.build_ms = (time.perf_counter() - start) * 1000
+        return True
+
+
+    def read(self, gzipped: bool = False) -> tuple:
+        """(body, etag) --> gzip is compressed at most once per version, by whichever client asks first"""
+
+
+        if not gzipped:
+            with self.lock: return self.body, self.etag
+
+
+        # COMPRESSION OFF THE MAIN LOCK --> plain readers and the publisher never wait on gzip
+        with self.zip_lock:
+
+            with self.lock: body, etag, packed, version = self.body, self.etag, self.gzipped, self.version
+
+            if packed is None:
+
+                packed = gzip.compress(body, compresslevel=5)
+
+                with self.lock:
+                    if self.version == version: self.gzipped = packed
+
+        # OWN VALIDATOR PER REPRESENTATION --> a gzip ETag never revalidates an identity body
+        return packed, etag[:-1] + '-gz"'
+
+
+
+
+class Delta_Feed():
+    """Server-Sent Events --> one batch of upserts / expiries per scan update, numbered so clients can resume"""
+
+
+
+    def __init__(self, encode=None, history: int = 256, expire: float = 10.0):
+        """encode(records) --> JSON text, history = batches kept for resuming clients, expire = seconds unheard before a device is expired"""
+
+
+        self.encode  = encode or (lambda data: json.dumps(data, separators=(",", ":")))
+        self.ready   = threading.Condition()
+        self.active  = False
+        self.expire  = expire
+
+        self.seq     = 0
+        self.batches = deque(maxlen=history)
+        self.token   = os.urandom(4).hex()
+
+        # MARKED BY THE SCANNER PER ADVERTISEMENT, DRAINED PER UPDATE
+        self.dirty   = set()
+
+        # MAC --> LAST PUBLISHED, OLDEST FIRST --> expiry only looks at the front
+        self.alive   = OrderedDict()
+
+
+    def publish(self, data: dict, now: float = None, evicted: list = ()) -> bool:
+        """Called by the thread that mutates data --> serialise one batch, wake every stream | O(dirty + expired), not O(live devices)"""
+
+
+        if not self.active: return False
+
+        now          = now or time.time()
+        dirty        = self.dirty; self.dirty = set()
+        upsert       = {mac: data[mac] for mac in dirty if mac in data}
+        alive        = self.alive
+
+        # STAMPED WITH THIS PUBLISH --> keeps the order exact, an expiry is at most one publish interval late
+        for mac in upsert: alive[mac] = now; alive.move_to_end(mac)
+
+        # LEFT THE LIVE MAP --> expired right away
+        expire = [mac for mac in evicted if alive.pop(mac, None) is not None]
+
+        # UNHEARD FOR `expire` SECONDS --> popped off the front until the first device heard since
+        while alive:
+
+            mac, heard = next(iter(alive.items()))
+            if now - heard <= self.expire: break
+
+            alive.popitem(last=False); expire.append(mac)
+
+        if not upsert and not expire: return False
+
+
+        with self.ready:
+
+            self.seq += 1
+            body = f'{{"seq":{self.seq},"upsert":{self.encode(upsert)},"expire":{json.dumps(expire)}}}'
+            self.batches.append((self.seq, f"id: {self.token}:{self.seq}\nevent: delta\ndata: {body}\n\n".encode()))
+
+            self.ready.notify_all()
+
+        return True
+
+
+    def since(self, last_id: str):
+        """Batches after a Last-Event-ID --> None when the client has to start over from a snapshot"""
+
+
+        token, _, seq = (last_id or "").partition(":")
+
+        if token != self.token or not seq.isdigit(): return None
+
+        seq = int(seq)
+
+        if seq == self.seq: return []
+        if seq > self.seq or not self.batches or self.batches[0][0] > seq + 1: return None
+
+        return [batch for number, batch in self.batches if number > seq]
+
+
+    def snapshot(self, body: bytes, seq: int) -> bytes:
+        """Full map as the first event of a stream --> deltas after seq are idempotent on top of it"""
+
+        return f"id: {self.token}:{seq}\nevent: snapshot\ndata: ".encode() + body + b"\n\n"
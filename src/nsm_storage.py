@@ -0,0 +1,636 @@
+# THIS MODULE WILL HOLD THE PERSISTENCE BACKENDS FOR WARDRIVING RESULTS
+
+
+
+# UI IMPORTS
+from rich.console import Console
+console = Console()
+
+
+# IMPORTS
+import json, os, struct, threading, time
+from array import array
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+
+
+
+
+class JSONL_Storage():
+    """Append only JSON Lines log --> one device record per line, latest line wins"""
+
+
+    database = Path(__file__).parent.parent / "database"
+
+
+
+    def __init__(self, path: Path = None, legacy: Path = None, compact_interval: float = 600, verbose=True):
+        """Load the MAC index once, migrate database.json if this is the first run"""
+
+
+        self.path    = Path(path or self.database / "database.jsonl")
+        self.legacy  = Path(legacy or self.database / "database.json")
+        self.lock    = threading.Lock()
+        self.verbose = verbose
+
+        self.macs    = set()
+        self.written = {}
+        self.pushed  = {}
+        self.lines   = 0
+        self.bytes   = 0
+
+        if not self.path.exists() and self.legacy.exists(): self._migrate()
+        self._load_index()
+
+        self.compact_interval = compact_interval
+        if compact_interval: threading.Thread(target=self._compactor, daemon=True).start()
+
+
+    def _migrate(self) -> None:
+        """database.json (one big dict) --> database.jsonl, runs once"""
+
+
+        try:
+
+            with open(self.legacy, "r") as file: data = json.load(file)
+
+        except json.JSONDecodeError as e:
+            console.print(f"[bold red][!] JSON Error:[bold yellow] {e} --> skipping migration"); return
+
+
+        tmp = self.path.with_suffix(".jsonl.tmp")
+
+        with open(tmp, "w") as file:
+            for _, device in sorted(data.items(), key=lambda item: int(item[0])): file.write(json.dumps(device) + "\n")
+
+        os.replace(tmp, self.path)
+        self.legacy.rename(self.legacy.with_suffix(".json.migrated"))
+
+        if self.verbose: console.print(f"[bold green][+] Migrated {len(data)} devices:[bold yellow] {self.legacy.name} --> {self.path.name}")
+
+
+    def _load_index(self) -> None:
+        """MAC set from the log, a torn last line from a crash is cut off so the next append starts on a line of its own"""
+
+
+        if not self.path.exists(): return
+
+        good = 0
+
+        with open(self.path, "rb") as file:
+
+            for raw in file:
+
+                if not raw.endswith(b"\n"): break
+                good += len(raw)
+
+                try: device = json.loads(raw)
+                except json.JSONDecodeError: continue
+
+                line = raw.decode().rstrip("\n")
+                self.macs.add(device["addr"]); self.written[device["addr"]] = hash(line)
+                self.lines += 1
+
+
+        # HALF WRITTEN RECORD AT THE END --> truncated back to the last full line
+        if good < self.path.stat().st_size:
+            with open(self.path, "r+b") as file: file.truncate(good)
+            if self.verbose: console.print(f"[bold yellow][!] Dropped a torn record at the end of {self.path.name}")
+
+
+    def push(self, devices: dict, sightings: dict = None) -> int:
+        """Append only new or changed records --> number of lines written"""
+
+
+        out = []
+
+        with self.lock:
+
+            for _, device in devices.items():
+
+                mac = device.addr
+
+                # SAME WAR_DRIVE COPY AS LAST CYCLE --> nothing to serialise, those copies are never mutated
+                if self.pushed.get(mac) is device: continue
+                self.pushed[mac] = device
+
+                line = device.to_json()
+                sig  = hash(line)
+
+                if self.written.get(mac) == sig: continue
+
+                self.macs.add(mac); self.written[mac] = sig
+                out.append(line)
+
+
+            if not out: return 0
+
+            chunk = ("\n".join(out) + "\n").encode()
+
+            with open(self.path, "ab") as file: file.write(chunk)
+
+            self.lines += len(out); self.bytes += len(chunk)
+
+        return len(out)
+
+
+    def compact(self) -> None:
+        """Rewrite the log keeping only the latest line per MAC, appends keep going meanwhile"""
+
+
+        if not self.path.exists(): return
+
+        with self.lock: size = self.path.stat().st_size
+
+
+        # HEAVY PART OFF THE LOCK --> everything up to `size` is stable
+        latest = {}
+
+        with open(self.path, "rb") as file:
+
+            for line in file.read(size).splitlines():
+
+                try: latest[json.loads(line)["addr"]] = line
+                except (json.JSONDecodeError, KeyError): continue
+
+
+        tmp = self.path.with_suffix(".jsonl.tmp")
+
+        with open(tmp, "wb") as file:
+            for line in latest.values(): file.write(line + b"\n")
+
+
+        # LINES APPENDED WHILE WE WERE BUSY --> copied over before the swap
+        with self.lock:
+
+            with open(self.path, "rb") as file: file.seek(size); tail = file.read()
+            with open(tmp, "ab") as file: file.write(tail)
+
+            os.replace(tmp, self.path)
+            self.lines = len(latest) + tail.count(b"\n")
+
+        if self.verbose: console.print(f"[bold green][+] Compacted {self.path.name}:[bold yellow] {len(latest)} devices")
+
+
+    def close(self) -> None:
+        """Nothing buffered, every push is already on disk"""
+
+        pass
+
+
+    def _compactor(self) -> None:
+        """Background thread --> compact once the log holds noticeably more lines than devices"""
+
+
+        while True:
+
+            time.sleep(self.compact_interval)
+
+            if self.lines <= len(self.macs) * 1.25 + 100: continue
+
+            try: self.compact()
+            except Exception as e: console.print(f"[bold red][!] Compaction Error:[bold yellow] {e}")
+
+
+
+
+class SQLite_Storage():
+    """SQLite backend --> devices, sightings and sessions, WAL so the web server reads while we write"""
+
+
+    database = Path(__file__).parent.parent / "database"
+
+    # LIKE IS CASE INSENSITIVE --> vendor / company prefix filters only use an index built with NOCASE, manuf carries payload hex so the company name gets its own column
+    schema = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id         INTEGER PRIMARY KEY AUTOINCREMENT,
+            started    REAL NOT NULL,
+            ended      REAL,
+            devices    INTEGER DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS devices (
+            mac        TEXT PRIMARY KEY,
+            vendor     TEXT,
+            manuf      TEXT,
+            company    TEXT,
+            name       TEXT,
+            uuid       TEXT,
+            rssi       INTEGER,
+            first_seen REAL,
+            last_seen  REAL,
+            session_id INTEGER REFERENCES sessions(id)
+        );
+
+        CREATE TABLE IF NOT EXISTS sightings (
+            mac        TEXT NOT NULL,
+            ts         REAL NOT NULL,
+            rssi       INTEGER,
+            session_id INTEGER REFERENCES sessions(id)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_devices_vendor_nocase  ON devices(vendor COLLATE NOCASE);
+        CREATE INDEX IF NOT EXISTS idx_devices_company_nocase ON devices(company COLLATE NOCASE);
+        CREATE INDEX IF NOT EXISTS idx_devices_last_seen      ON devices(last_seen);
+        CREATE INDEX IF NOT EXISTS idx_sightings_mac_ts       ON sightings(mac, ts);
+        CREATE INDEX IF NOT EXISTS idx_sightings_ts           ON sightings(ts);
+    """
+
+    upsert = """
+        INSERT INTO devices (mac, vendor, manuf, company, name, uuid, rssi, first_seen, last_seen, session_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(mac) DO UPDATE SET
+            vendor     = COALESCE(excluded.vendor, devices.vendor),
+            manuf      = COALESCE(excluded.manuf, devices.manuf),
+            company    = COALESCE(excluded.company, devices.company),
+            name       = COALESCE(excluded.name, devices.name),
+            uuid       = COALESCE(excluded.uuid, devices.uuid),
+            rssi       = excluded.rssi,
+            last_seen  = MAX(excluded.last_seen, devices.last_seen),
+            session_id = excluded.session_id
+    """
+
+
+
+    def __init__(self, path: Path = None, verbose=True, reader=False):
+        """Create the schema and open a new session | reader --> queries only, the session belongs to a writer process"""
+
+
+        import sqlite3
+        self.sqlite3 = sqlite3
+
+        self.path    = Path(path or self.database / "database.sqlite3")
+        self.lock    = threading.Lock()
+        self.local   = threading.local()
+        self.verbose = verbose
+
+        self.pushed    = {}
+        self.last_push = 0.0
+        self.bytes     = 0
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.schema)
+
+        self.session = None
+        if reader: return
+
+        with conn: self.session = conn.execute("INSERT INTO sessions (started) VALUES (?)", (time.time(), )).lastrowid
+
+        if verbose: console.print(f"[bold green][+] SQLite storage:[bold yellow] {self.path.name} (session {self.session})")
+
+
+    def _conn(self):
+        """One connection per thread --> scanner writes, web server threads read"""
+
+
+        conn = getattr(self.local, "conn", None)
+
+        if conn is None:
+
+            conn = self.sqlite3.connect(str(self.path), timeout=10)
+            conn.row_factory = self.sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+
+        return conn
+
+
+    @staticmethod
+    def _company(manuf) -> str:
+        """"Apple, Inc. | 10059a..." --> "Apple, Inc.", the first company of the advertisement"""
+
+        if not manuf or manuf == "N/A": return None
+        return manuf.split(" | ", 1)[0]
+
+
+    @staticmethod
+    def _row(device, session: int) -> tuple:
+        """Device record --> devices row"""
+
+        return (
+            device.addr, device.vendor or None, device.manuf or None, SQLite_Storage._company(device.manuf), device.name or None,
+            json.dumps(list(device.uuid)) if device.uuid else None, device.rssi, device.up_time, device.up_time, session
+        )
+
+
+    def push(self, devices: dict, sightings: dict = None) -> int:
+        """One transaction per scan cycle --> new war_drive records + every device heard since the last push"""
+
+
+        rows = {}
+        seen = []
+
+        with self.lock:
+
+            for _, device in devices.items():
+
+                if self.pushed.get(device.addr) is device: continue
+                self.pushed[device.addr] = device; rows[device.addr] = device
+
+
+            since = self.last_push
+
+            for mac, device in (sightings or {}).items():
+
+                up_time = device.up_time or 0
+                if up_time <= since: continue
+
+                rows[mac] = device; seen.append((mac, up_time, device.rssi, self.session))
+                self.last_push = max(self.last_push, up_time)
+
+
+            if not rows and not seen: return 0
+
+            conn = self._conn()
+
+            rows = [self._row(device, self.session) for device in rows.values()]
+
+            with conn:
+                conn.executemany(self.upsert, rows)
+                conn.executemany("INSERT INTO sightings (mac, ts, rssi, session_id) VALUES (?, ?, ?, ?)", seen)
+
+            # ROW PAYLOAD, NOT PAGES --> text as its length, numbers as 8 bytes, good enough for a write rate
+            self.bytes += sum(len(value) if isinstance(value, str) else 8 for row in rows for value in row if value is not None) + len(seen) * 32
+
+        return len(rows)
+
+
+    def query(self, mac: str = None, vendor: str = None, manuf: str = None, since: float = None, until: float = None, limit: int = 500) -> list:
+        """Indexed device query --> list of device records"""
+
+
+        where, args = [], []
+
+        if mac:    where.append("mac = ?");          args.append(mac.upper())
+        if vendor: where.append("vendor LIKE ?");    args.append(f"{vendor}%")
+        if manuf:  where.append("company LIKE ?");   args.append(f"{manuf}%")
+        if since:  where.append("last_seen >= ?");   args.append(float(since))
+        if until:  where.append("last_seen <= ?");   args.append(float(until))
+
+        sql = "SELECT * FROM devices" + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY last_seen DESC LIMIT ?"
+        args.append(int(limit))
+
+        data = []
+
+        for row in self._conn().execute(sql, args):
+
+            data.append({
+                "addr": row["mac"], "rssi": row["rssi"], "manuf": row["manuf"] or False, "vendor": row["vendor"] or False,
+                "name": row["name"] or False, "uuid": json.loads(row["uuid"]) if row["uuid"] else False,
+                "up_time": row["last_seen"], "first_seen": row["first_seen"]
+            })
+
+        return data
+
+
+    def sightings(self, mac: str, since: float = None, until: float = None) -> list:
+        """(ts, rssi) pairs for one device, served from the (mac, ts) index"""
+
+
+        sql  = "SELECT ts, rssi FROM sightings WHERE mac = ? AND ts >= ? AND ts <= ? ORDER BY ts"
+        rows = self._conn().execute(sql, (mac.upper(), float(since or 0), float(until) if until else float("inf")))
+
+        return [(row["ts"], row["rssi"]) for row in rows]
+
+
+    def close(self) -> None:
+        """Close the session row"""
+
+
+        if self.session is None: return
+
+        with self.lock, self._conn() as conn:
+            conn.execute("UPDATE sessions SET ended = ?, devices = ? WHERE id = ?", (time.time(), len(self.pushed), self.session))
+
+
+
+
+class Sighting_Log():
+    """Every advertisement --> per device min / max / mean RSSI buckets, columnar in memory, append only on disk"""
+
+
+    database = Path(__file__).parent.parent / "database"
+
+    # ON DISK --> b"M" / b"A" + u8 length + name defines the next MAC / adapter id, b"B" + BUCKET is one bucket
+    BUCKET   = struct.Struct("<IdbbfHB")
+
+
+
+    def __init__(self, path: Path = None, bucket: float = 10, verbose=True):
+        """Load the existing log into the columns, path=False keeps it in memory only"""
+
+
+        self.path    = None if path is False else Path(path or self.database / "sightings.bin")
+        self.bucket  = bucket
+        self.lock    = threading.Lock()
+        self.verbose = verbose
+
+        # COLUMNS --> row n of every array is one closed bucket
+        self.ts      = array("d")
+        self.low     = array("b")
+        self.high    = array("b")
+        self.mean    = array("f")
+        self.count   = array("H")
+        self.adapter = array("B")
+
+        self.rows     = {}
+        self.open     = {}
+        self.mac_ids  = {}
+        self.adapters = {}
+        self.names    = []
+        self.pending  = bytearray()
+        self.samples  = 0
+        self.bytes    = 0
+
+        if self.path and self.path.exists(): self._load()
+
+
+    def _load(self) -> None:
+        """Replay the log, a torn or dangling record at the end is cut off so new appends follow the last good one"""
+
+
+        with open(self.path, "rb") as file: raw = file.read()
+
+        macs, offset, size = [], 0, self.BUCKET.size
+
+        while offset < len(raw):
+
+            kind = raw[offset:offset + 1]
+
+            if kind == b"B":
+
+                if offset + 1 + size > len(raw): break
+
+                mac_id, ts, low, high, mean, count, adapter = self.BUCKET.unpack_from(raw, offset + 1)
+
+                # IDS NEVER DEFINED --> garbage after a crash, everything from here on is dropped
+                if mac_id >= len(macs) or adapter >= len(self.names): break
+
+                self._append(macs[mac_id], ts, low, high, mean, count, adapter)
+                offset += 1 + size
+
+            elif kind in (b"M", b"A"):
+
+                if offset + 2 > len(raw) or offset + 2 + raw[offset + 1] > len(raw): break
+
+                length = raw[offset + 1]
+                name   = raw[offset + 2:offset + 2 + length].decode()
+
+                if kind == b"M": self.mac_ids[name] = len(macs); macs.append(name)
+                else:            self.adapters[name] = len(self.names); self.names.append(name)
+
+                offset += 2 + length
+
+            else: break
+
+
+        # UNREADABLE TAIL --> truncated back to the last good record
+        if offset < len(raw):
+            with open(self.path, "r+b") as file: file.truncate(offset)
+            if self.verbose: console.print(f"[bold yellow][!] Dropped {len(raw) - offset} torn bytes at the end of {self.path.name}")
+
+        if self.verbose: console.print(f"[bold green][+] Sighting log:[bold yellow] {len(self.ts)} buckets for {len(self.rows)} devices")
+
+
+    def _define(self, kind: bytes, name: str) -> None:
+        """New MAC / adapter --> its id is implied by the order of definitions"""
+
+        raw = name.encode()[:255]
+        self.pending += kind + bytes((len(raw), )) + raw
+
+
+    def _adapter_id(self, adapter: str) -> int:
+        """Adapter name --> u8 id"""
+
+
+        adapter = adapter or "default"
+        index   = self.adapters.get(adapter)
+
+        if index is None:
+            index = self.adapters[adapter] = min(len(self.names), 255); self.names.append(adapter)
+            self._define(b"A", adapter)
+
+        return index
+
+
+    def add(self, mac: str, ts: float, rssi: int, adapter: str = None) -> None:
+        """One advertisement --> O(1), folded into the device's open bucket"""
+
+
+        if rssi is None: return
+
+        self.samples += 1
+        start   = ts - ts % self.bucket
+        current = self.open.get(mac)
+        source  = self.adapters.get(adapter or "default")
+        if source is None: source = self._adapter_id(adapter)
+
+        if current is not None and current[0] == start:
+
+            current[1] += 1; current[4] += rssi
+            if rssi < current[2]: current[2] = rssi
+            if rssi > current[3]: current[3] = rssi; current[5] = source
+            return
+
+
+        # NEXT BUCKET --> the previous one is final
+        if current is not None: self._close(mac, current)
+
+        self.open[mac] = [start, 1, rssi, rssi, rssi, source]
+
+
+    def _append(self, mac: str, ts: float, low: int, high: int, mean: float, count: int, adapter: int) -> None:
+        """One closed bucket --> a row in every column + the device's row index"""
+
+
+        rows = self.rows.get(mac)
+        if rows is None: rows = self.rows[mac] = array("I")
+
+        rows.append(len(self.ts))
+        self.ts.append(ts); self.low.append(low); self.high.append(high); self.mean.append(mean); self.count.append(count); self.adapter.append(adapter)
+
+
+    def _close(self, mac: str, current: list) -> None:
+        """Open bucket --> columns + pending bytes for the next flush"""
+
+
+        start, count, low, high, total, adapter = current
+        mean = total / count
+
+        # INT8 / UINT16 COLUMNS --> clamp the rare out of range reading
+        if low < -128 or high > 127 or count > 0xFFFF: low, high, count = max(-128, min(127, low)), max(-128, min(127, high)), min(count, 0xFFFF)
+
+        with self.lock: self._append(mac, start, low, high, mean, count, adapter)
+
+
+        if not self.path: return
+
+        mac_id = self.mac_ids.get(mac)
+
+        if mac_id is None:
+            mac_id = self.mac_ids[mac] = len(self.mac_ids)
+            self._define(b"M", mac)
+
+        self.pending += b"B" + self.BUCKET.pack(mac_id, start, low, high, mean, count, adapter)
+
+
+    def flush(self, now: float = None) -> int:
+        """Close buckets of devices that went quiet, append everything closed to disk --> bytes written"""
+
+
+        now   = now or time.time()
+        quiet = [mac for mac, current in self.open.items() if current[0] + self.bucket <= now]
+
+        for mac in quiet: self._close(mac, self.open.pop(mac))
+
+        if not self.path or not self.pending: return 0
+
+        chunk = bytes(self.pending); self.pending.clear()
+
+        with open(self.path, "ab") as file: file.write(chunk)
+
+        self.bytes += len(chunk)
+        return len(chunk)
+
+
+    def history(self, mac: str, since: float = None, until: float = None) -> dict:
+        """One device's RSSI curve between since / until --> columns, bisected out of its row index"""
+
+
+        since = float(since) if since else 0.0
+        until = float(until) if until else float("inf")
+
+        with self.lock:
+
+            rows = self.rows.get(mac, ())
+            key  = self.ts.__getitem__
+            rows = rows[bisect_left(rows, since, key=key):bisect_right(rows, until, key=key)]
+
+            data = {
+                "ts":      [self.ts[row] for row in rows],
+                "min":     [self.low[row] for row in rows],
+                "max":     [self.high[row] for row in rows],
+                "mean":    [round(self.mean[row], 1) for row in rows],
+                "count":   [self.count[row] for row in rows],
+                "adapter": [self.names[self.adapter[row]] for row in rows],
+            }
+
+
+        # STILL FILLING --> the live bucket is part of the curve too
+        current = list(self.open.get(mac) or ())
+
+        if current and since <= current[0] <= until:
+
+            start, count, low, high, total, adapter = current
+
+            data["ts"].append(start); data["min"].append(low); data["max"].append(high)
+            data["mean"].append(round(total / count, 1)); data["count"].append(count); data["adapter"].append(self.names[adapter])
+
+        return {"mac": mac, "bucket": self.bucket, **data}
+
+
+    def close(self) -> None:
+        """Everything still open is final now"""
+
+        self.flush(now=float("inf"))
@@ -0,0 +1,103 @@
+# THIS MODULE WILL DRAW THE -wv TERMINAL VIEW  -->  fixed height window of the live map, redrawn only when it changed
+
+
+
+# UI IMPORTS
+from rich.console import Console
+from rich.live import Live
+from rich.table import Table
+console = Console()
+
+
+# ETC IMPORTS
+import heapq, time
+from itertools import islice
+
+
+
+
+class Terminal_View():
+    """Top `rows` live devices by RSSI or most recently heard --> frame cost depends on `rows`, not on how many devices were seen"""
+
+
+
+    def __init__(self, rows: int = 20, sort: str = "rssi", fps: float = 2, interval: float = 10, war_drive: bool = False):
+        """fps --> max redraws per second | interval --> seconds between totals lines"""
+
+
+        self.rows     = rows
+        self.sort     = sort
+        self.period   = 1 / fps
+        self.interval = interval
+        self.title    = "BLE Driving" if war_drive else "BLE Sniffer"
+
+        self.version  = None
+        self.frames   = 0
+        self.skipped  = 0
+        self.frame_ms = 0.0
+        self.last     = (time.monotonic(), 0)
+
+        # NO AUTO REFRESH --> rich never redraws on its own, refresh() decides
+        self.live     = Live(self.table([], 0, 0), console=console, auto_refresh=False)
+
+
+    def __enter__(self):
+        self.live.start(); return self
+
+
+    def __exit__(self, *exc) -> None:
+        self.live.stop()
+
+
+    def _top(self, live_map) -> list:
+        """Live map --> the window's records, O(rows) for recent (the map is kept in heard order), O(n log rows) for rssi"""
+
+
+        if self.sort == "recent": return list(islice(reversed(live_map.values()), self.rows))
+
+        return heapq.nlargest(self.rows, live_map.values(), key=lambda data: data.rssi if data.rssi is not None else -999)
+
+
+    def table(self, devices: list, seen: int, live: int) -> Table:
+        """Window --> rich table, long cells cut to one line so the height never changes"""
+
+
+        now   = time.time()
+        cells = {"no_wrap": True, "overflow": "ellipsis"}
+
+        table = Table(title=f"{self.title} --> {seen:,} seen, {live:,} live, top {self.rows} by {self.sort}", title_style="bold red", border_style="bold purple", style="bold purple", header_style="bold red")
+        table.add_column("#"); table.add_column("RSSI", style="bold yellow"); table.add_column("Mac", style="bold green"); table.add_column("Manufacturer", style="bold blue", max_width=40, **cells)
+        table.add_column("Local_name", max_width=24, **cells); table.add_column("Services", style="bold green", max_width=40, **cells); table.add_column("Heard", justify="right")
+
+        for rank, data in enumerate(devices, 1):
+
+            services = ", ".join(data.services) if data.services else ", ".join(data.uuid) if data.uuid else ""
+            table.add_row(f"{rank}", f"{data.rssi}", data.addr, f"{data.manuf or data.vendor or ''}", f"{data.name or ''}", services, f"{now - (data.up_time or now):.0f}s")
+
+        return table
+
+
+    def refresh(self, sniffer) -> bool:
+        """Scanner timer --> one frame from the live map, skipped while sniffer.updates has not moved"""
+
+
+        if sniffer.updates == self.version: self.skipped += 1; return False
+
+        start = time.perf_counter()
+        self.version = sniffer.updates
+
+        self.live.update(self.table(self._top(sniffer.live_map), len(sniffer.seen), len(sniffer.live_map)), refresh=True)
+
+        self.frames += 1; self.frame_ms = (time.perf_counter() - start) * 1000
+        return True
+
+
+    def totals(self, sniffer) -> None:
+        """Scanner timer --> one summary line above the window"""
+
+
+        now, count = time.monotonic(), sum(sniffer.adapter_counts.values())
+        rate = (count - self.last[1]) / max(now - self.last[0], 1e-6)
+        self.last = (now, count)
+
+        console.print(f"[bold green][+] {len(sniffer.seen):,} seen, {len(sniffer.live_map):,} live (~{len(sniffer.fingerprints.clusters):,} physical),[bold yellow] {rate:,.0f} adv/s[/bold yellow] | {self.frames} frames ({self.skipped} unchanged skipped, last {self.frame_ms:.1f} ms)")
@@ -0,0 +1,197 @@
+# THIS MODULE WILL SPOT TRACKERS THAT STAY WITH US  -->  distinct time windows per fingerprint, alert past K of them
+
+
+
+# ETC IMPORTS
+import time
+from collections import OrderedDict, deque
+
+
+# NSM IMPORTS
+from nsm_database import DataBase, Sig_Decoder
+
+
+
+
+class Tracker():
+    """One tracker across address rotations and live map evictions --> the windows it was heard in"""
+
+
+    __slots__ = ("id", "kind", "mac", "windows", "first_seen", "last_seen", "rssi", "macs", "alerted")
+
+
+    def __init__(self, id: int, kind: str, mac: str, span: int, seen: float):
+
+        self.id, self.kind, self.mac = id, kind, mac
+        self.windows    = deque(maxlen=span)
+        self.first_seen = seen
+        self.last_seen  = seen
+        self.rssi       = None
+        self.macs       = 1
+        self.alerted    = None
+
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "kind": self.kind, "mac": self.mac, "windows": len(self.windows), "first_seen": self.first_seen, "last_seen": self.last_seen, "rssi": self.rssi, "macs": self.macs, "alerted": self.alerted}
+
+
+
+class Tracker_Detector():
+    """Tracker advertisement --> its MAC / fingerprint's window index, heard in more than `threshold` distinct windows within `span` --> follower"""
+
+
+    # SERVICE UUIDS FROM THE CURATED TABLE --> Tile, Apple Find My
+    TRACKERS = ("fe9f", "fdc0")
+
+    # APPLE OFFLINE FINDING, FULL KEY --> what an AirTag sends once it is away from its owner
+    APPLE     = 76
+    FIND_MY   = bytes([0x12, 0x19])
+    SEPARATED = "Find My (separated)"
+
+
+
+    def __init__(self, window: float = 120, threshold: int = 4, span: int = 30, cooldown: float = 900, max_trackers: int = 2048):
+        """window --> seconds per window | span --> windows looked back | cooldown --> seconds before the same tracker alerts again | max_trackers --> least recently heard dropped past it"""
+
+
+        self.window       = window
+        self.threshold    = threshold
+        self.span         = span
+        self.cooldown     = cooldown
+        self.max_trackers = max_trackers
+
+        self.kinds    = {service["uuid"]: service["name"] for service in DataBase._services() if service["uuid"] in self.TRACKERS}
+
+        # BOTH BOUNDED --> trackers by last heard, aliases (MACs and cluster ids) by last use
+        self.trackers = OrderedDict()
+        self.aliases  = OrderedDict()
+        self.next_id  = 0
+
+        self.heard     = 0
+        self.alerts    = 0
+        self.update_ms = 0.0
+
+
+    def kind(self, adv) -> str:
+        """Advertisement --> tracker name, None for everything else | a handful of uuids and one prefix check, no payload parsing"""
+
+
+        payload = (adv.manufacturer_data or {}).get(self.APPLE)
+        if payload and payload.startswith(self.FIND_MY): return self.SEPARATED
+
+        for uuid in adv.service_uuids or ():
+            kind = self.kinds.get(Sig_Decoder.short(uuid))
+            if kind: return kind
+
+        for uuid in adv.service_data or {}:
+            kind = self.kinds.get(Sig_Decoder.short(uuid))
+            if kind: return kind
+
+        return None
+
+
+    def _tracker(self, mac: str, cluster, kind: str, seen: float) -> Tracker:
+        """Known MAC or fingerprint cluster --> same tracker, even after the live map let it go"""
+
+
+        tracker = self.aliases.get(mac)
+        if tracker is None and cluster is not None: tracker = self.aliases.get(cluster)
+
+        if tracker is None or self.trackers.get(tracker.id) is not tracker:
+
+            tracker = Tracker(self.next_id, kind, mac, self.span, seen)
+            self.next_id += 1
+            self.trackers[tracker.id] = tracker
+
+            # PAST THE CAP --> the tracker unheard the longest goes
+            if len(self.trackers) > self.max_trackers: self.trackers.popitem(last=False)
+
+        elif tracker.mac != mac: tracker.mac = mac; tracker.macs += 1
+
+
+        # A FEW ALIASES PER TRACKER --> stale ones fall off the front
+        for alias in (mac, cluster):
+            if alias is None: continue
+            self.aliases[alias] = tracker; self.aliases.move_to_end(alias)
+
+        while len(self.aliases) > 4 * self.max_trackers: self.aliases.popitem(last=False)
+
+        return tracker
+
+
+    def update(self, pending: dict, records: dict, now: float = None) -> list:
+        """Fingerprint engine's pending map (first advertisement per MAC since the last publish) --> trackers that just crossed the threshold"""
+
+
+        if not pending: return []
+
+        start    = time.perf_counter()
+        now      = now or time.time()
+        followed = []
+
+
+        for mac, (adv, _) in pending.items():
+
+            record = records.get(mac)
+            if record is None: continue
+
+            kind = self.kind(adv)
+            if kind is None: continue
+
+            # UUID ONLY TRACKERS LOOK ALIKE AND KEEP THEIR MAC --> only a separated Find My payload follows its fingerprint across a rotation
+            cluster = record.cluster if kind == self.SEPARATED else None
+
+            # NOT LINKED YET --> the fingerprint engine hands it back next publish
+            if kind == self.SEPARATED and cluster is None: continue
+
+            seen    = record.up_time or now
+            tracker = self._tracker(mac, cluster, kind, seen)
+            tracker.last_seen = seen; tracker.rssi = record.rssi
+            self.trackers.move_to_end(tracker.id)
+            self.heard += 1
+
+
+            # ONE ENTRY PER DISTINCT WINDOW --> windows older than the span fall off the front
+            window  = int(seen // self.window)
+            windows = tracker.windows
+
+            if not windows or windows[-1] < window: windows.append(window)
+            while windows[0] <= window - self.span: windows.popleft()
+
+
+            if len(windows) > self.threshold and (tracker.alerted is None or seen - tracker.alerted >= self.cooldown):
+                tracker.alerted = seen; self.alerts += 1
+                followed.append(tracker)
+
+
+        self.update_ms = (time.perf_counter() - start) * 1000
+        return followed
+
+
+    def following(self, now: float = None) -> list:
+        """Trackers past the threshold and heard within the last window, most windows first"""
+
+
+        trackers = list(self.trackers.values())
+        recent   = (now or time.time()) - self.window
+
+        return sorted((tracker for tracker in trackers if len(tracker.windows) > self.threshold and tracker.last_seen >= recent), key=lambda tracker: len(tracker.windows), reverse=True)
+
+
+    def snapshot(self) -> dict:
+        """/api/trackers --> settings, followers and every tracker still held"""
+
+
+        trackers = list(self.trackers.values())
+
+        return {
+            "window": self.window, "threshold": self.threshold, "span": self.span,
+            "following": [tracker.to_dict() for tracker in self.following()],
+            "trackers": [tracker.to_dict() for tracker in reversed(trackers)],
+        }
+
+
+    def stats(self) -> dict:
+        """Trackers held vs following and alert counters"""
+
+        return {"trackers": len(self.trackers), "following": len(self.following()), "aliases": len(self.aliases), "heard": self.heard, "alerts": self.alerts, "update_ms": round(self.update_ms, 3)}